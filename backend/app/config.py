@@ -9,9 +9,74 @@ class Settings(BaseSettings):
     mongodb_url: str = "mongodb://localhost:27017"
     database_name: str = "stock_news"
 
+    # Event listing counts
+    event_count_cap: int = 10000
+    event_count_cache_ttl: int = 60  # seconds
+    event_count_cache_size: int = 1024
+
+    # Dashboard stats: full recount interval for materialized counters
+    stats_reconcile_interval: int = 3600  # seconds
+
+    # Event list/radar cards: length of the content snippet
+    event_snippet_chars: int = 280
+
+    # Opportunity radar: scored snapshots shared by concurrent requests
+    radar_snapshot_ttl: int = 30  # seconds
+    radar_snapshot_max_entries: int = 64
+
+    # Opportunity radar push stream (SSE)
+    radar_stream_poll_interval: float = 2.0  # seconds, used when change streams are unavailable
+    radar_stream_queue_size: int = 100  # per connection; oldest messages are dropped when full
+    radar_stream_heartbeat: int = 15  # seconds
+
+    # Extra weighted sentiment lexicon for radar heuristics (one "term weight" per line)
+    sentiment_lexicon_path: str = ""
+
+    # Event bodies longer than this are compressed into event_contents
+    content_inline_chars: int = 4000
+    content_compress_level: int = 6
+
+    # Event full-text search
+    search_index_content_chars: int = 20000  # content counted for BM25 term frequencies; recall covers the whole body
+    search_max_content_terms: int = 256  # content terms kept in search_tf per event; title terms are always kept
+    search_max_candidates: int = 2000
+
     # Zhipu AI
     zhipu_api_key: str = ""
     ai_model: str = "glm-4.7-flash"
+    ai_base_url: str = "https://open.bigmodel.cn/api/paas/v4"
+    ai_timeout: float = 60.0  # seconds, per request
+    ai_connect_timeout: float = 10.0  # seconds
+    ai_max_connections: int = 100  # shared keep-alive pool
+    ai_batch_size: int = 8  # short events packed into one prompt; 1 disables batching
+    ai_batch_max_chars: int = 800  # title + content length above which an event is analyzed alone
+    ai_rule_tier: bool = True  # rule-based fast path (rule_classifier) for routine exchange notices
+    ai_content_token_budget: int = 1500  # condensed event content per prompt (see content_condenser), 0 disables
+
+    # LLM call governor shared by the API, ingest and batch analysis
+    llm_rpm_limit: int = 600  # requests per minute, 0 disables
+    llm_tpm_limit: int = 1000000  # tokens per minute, 0 disables
+    llm_min_concurrency: int = 1
+    llm_max_concurrency: int = 32
+    llm_initial_concurrency: int = 8
+    llm_latency_target: float = 20.0  # seconds; slower replies shrink the concurrency window, 0 disables
+    llm_max_retries: int = 4  # retries for 429 / 5xx / timeouts / connection errors
+    llm_backoff_base: float = 1.0  # seconds, doubled per attempt with full jitter
+    llm_backoff_max: float = 30.0
+
+    # AI analysis job queue (analysis_jobs collection, see app/services/analysis_queue.py)
+    analysis_queue_enabled: bool = True  # ingest enqueues LLM analysis instead of running it inline
+    analysis_workers: int = 4  # worker coroutines started inside the API process, 0 disables
+    analysis_queue_visibility_timeout: float = 600.0  # seconds before a crashed worker's lease is reclaimed
+    analysis_queue_max_attempts: int = 5
+    analysis_queue_retry_delay: float = 30.0  # seconds, doubled per attempt
+    analysis_queue_poll_interval: float = 2.0  # seconds an idle worker waits before polling again
+    analysis_queue_source_bonus_hours: float = 24.0  # priority head start per unit of source confidence
+
+    # LLM result cache (in-process LRU in front of the llm_cache collection)
+    llm_cache_memory_entries: int = 2048
+    llm_cache_max_entries: int = 200000  # 0 disables the size cap
+    llm_cache_max_age_days: int = 90  # 0 disables age eviction
 
     # API
     api_host: str = "0.0.0.0"
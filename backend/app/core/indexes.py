@@ -0,0 +1,126 @@
+"""
+MongoDB 索引定义与初始化
+
+每个索引对应 services/routers 中的一类真实查询，启动时幂等创建：
+已存在的索引（按名称）直接跳过，单个索引创建失败只打印警告，不阻塞启动。
+"""
+from typing import Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    "events": [
+        # get_events 默认排序 / 游标翻页 / 日期范围
+        IndexModel([("announcement_date", DESCENDING), ("_id", DESCENDING)]),
+        # get_events: category / event_type 过滤 + 时间排序
+        IndexModel([("event_category", ASCENDING), ("announcement_date", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("event_types", ASCENDING), ("announcement_date", DESCENDING), ("_id", DESCENDING)]),
+        # get_events: 影响分区间过滤
+        IndexModel([("ai_analysis.impact_score", ASCENDING), ("announcement_date", DESCENDING)]),
+        # get_events_by_sector / get_events_by_stock
+        IndexModel([("ai_analysis.affected_sectors.code", ASCENDING), ("announcement_date", DESCENDING)]),
+        IndexModel([("ai_analysis.affected_stocks.code", ASCENDING), ("announcement_date", DESCENDING)]),
+        # get_event_by_title_date
+        IndexModel([("title", ASCENDING), ("announcement_date", DESCENDING)]),
+        # 入库去重（历史数据可能缺少该字段）
+        IndexModel(
+            [("dedupe_key", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"dedupe_key": {"$exists": True}},
+        ),
+        # 全文检索候选召回
+        IndexModel([("search_terms", ASCENDING), ("announcement_date", DESCENDING)]),
+        # 雷达推送: 轮询最近写入或更新的事件
+        IndexModel([("updated_at", ASCENDING), ("_id", ASCENDING)]),
+        # 雷达 top-events 计数（min_relevance）: 按静态相关度下界和时间窗口过滤
+        IndexModel([
+            ("radar.version", ASCENDING),
+            ("radar.relevance_base", DESCENDING),
+            ("_id", DESCENDING),
+            ("announcement_date", DESCENDING),
+        ]),
+        # 雷达快照: 按时间窗口扫描已评分事件
+        IndexModel([
+            ("radar.version", ASCENDING),
+            ("announcement_date", DESCENDING),
+            ("radar.sentiment_raw", ASCENDING),
+        ]),
+    ],
+    "llm_cache": [
+        # 按写入时间淘汰
+        IndexModel([("created_at", ASCENDING)]),
+    ],
+    "analysis_jobs": [
+        # lease: 按优先级领取可执行任务（短事件单独一组用于合并提示词）
+        IndexModel([("status", ASCENDING), ("priority", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("batchable", ASCENDING), ("priority", DESCENDING)]),
+        # reclaim_expired: 租约过期的任务
+        IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)]),
+        # stats: 最早可领取任务的等待时间
+        IndexModel([("status", ASCENDING), ("available_at", ASCENDING)]),
+        # 已完成/失败的任务保留 7 天
+        IndexModel([("completed_at", ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "event_rollups": [
+        # 趋势查询: 按维度和键读取一段时间的桶
+        IndexModel([("granularity", ASCENDING), ("dimension", ASCENDING), ("key", ASCENDING), ("bucket", ASCENDING)]),
+        # 板块/股票热度: 按维度读取窗口内全部键的小时桶
+        IndexModel([("granularity", ASCENDING), ("dimension", ASCENDING), ("bucket", ASCENDING)]),
+    ],
+    "sectors": [
+        IndexModel([("code", ASCENDING)], unique=True),
+        IndexModel([("name", ASCENDING)]),
+    ],
+    "stocks": [
+        IndexModel([("code", ASCENDING)], unique=True),
+        IndexModel([("name", ASCENDING)]),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("username", ASCENDING)]),
+        # 手机号/微信登录（未绑定的用户该字段为 null，不做唯一约束）
+        IndexModel([("phone", ASCENDING)]),
+        IndexModel([("wechat_openid", ASCENDING)]),
+    ],
+    "sms_codes": [
+        # send_sms_code / verify_sms_code: 按手机号取最新一条
+        IndexModel([("phone", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "wechat_login_states": [
+        IndexModel([("state", ASCENDING)], unique=True),
+    ],
+    "payment_orders": [
+        IndexModel([("out_trade_no", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+}
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> Dict[str, List[str]]:
+    """
+    幂等创建 INDEX_SPECS 中的全部索引
+
+    Returns:
+        {集合名称: 本次新建的索引名称列表}
+    """
+    created: Dict[str, List[str]] = {}
+    for collection, models in INDEX_SPECS.items():
+        existing = await db[collection].index_information()
+        for model in models:
+            name = model.document["name"]
+            if name in existing:
+                continue
+            try:
+                await db[collection].create_indexes([model])
+                created.setdefault(collection, []).append(name)
+            except OperationFailure as e:
+                # 例如历史数据存在重复值导致唯一索引无法创建
+                print(f"Warning: failed to create index {collection}.{name}: {e}")
+
+    if created:
+        summary = ", ".join(f"{name}({len(names)})" for name, names in created.items())
+        print(f"Database indexes created: {summary}")
+    return created
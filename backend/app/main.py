@@ -1,9 +1,15 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.core.database import connect_to_mongo, close_mongo_connection
-from app.routers import events, sectors, stocks, dashboard, auth, payments, opportunity_radar
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.core.indexes import ensure_indexes
+from app.services.stats_service import stats_service
+from app.services.radar_feed import radar_feed_service
+from app.services.ai_service import close_ai_service
+from app.services.analysis_worker import AnalysisWorkerPool
+from app.routers import events, sectors, stocks, dashboard, auth, payments, opportunity_radar, trends
 import uvicorn
 
 
@@ -11,7 +17,27 @@ import uvicorn
 async def lifespan(app: FastAPI):
     # 启动时连接 MongoDB
     await connect_to_mongo()
+    # 幂等创建索引
+    await ensure_indexes(get_database())
+    # 定期全量校正仪表板统计
+    reconcile_task = asyncio.create_task(
+        stats_service.run_reconcile_loop(settings.stats_reconcile_interval)
+    )
+    # 监听事件写入，推送给雷达 SSE 连接
+    radar_feed_task = asyncio.create_task(radar_feed_service.run())
+    # 消费 AI 分析任务队列
+    analysis_task = None
+    if settings.analysis_queue_enabled and settings.analysis_workers > 0:
+        analysis_task = asyncio.create_task(AnalysisWorkerPool(settings.analysis_workers).run())
     yield
+    reconcile_task.cancel()
+    radar_feed_task.cancel()
+    if analysis_task:
+        analysis_task.cancel()
+        # 等待 worker 把未完成的任务交还队列
+        await asyncio.gather(analysis_task, return_exceptions=True)
+    # 关闭 LLM 连接池
+    await close_ai_service()
     # 关闭时断开 MongoDB 连接
     await close_mongo_connection()
 
@@ -40,6 +66,7 @@ app.include_router(stocks.router)
 app.include_router(dashboard.router)
 app.include_router(payments.router)
 app.include_router(opportunity_radar.router)
+app.include_router(trends.router)
 
 @app.get("/")
 async def root():
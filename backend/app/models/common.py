@@ -1,4 +1,4 @@
-from typing import Generic, TypeVar, List
+from typing import Generic, TypeVar, List, Optional
 from pydantic import BaseModel
 
 T = TypeVar("T")
@@ -6,3 +6,5 @@ T = TypeVar("T")
 class PaginatedResponse(BaseModel, Generic[T]):
     items: List[T]
     total: int
+    next_cursor: Optional[str] = None
+    total_capped: bool = False
@@ -80,6 +80,7 @@ class AIAnalysis(BaseModel):
     confidence_score: Optional[float] = Field(None, ge=0, le=1, description="置信度: 0-1")
     is_hype: Optional[bool] = Field(False, description="是否为炒作")
     impact_reason: Optional[str] = Field(None, description="深度理由")
+    method: Optional[str] = Field(None, description="分析方式: llm（模型分析）/ rule（例行公告规则判定）")
     
     affected_sectors: List[AffectedSector] = Field(default_factory=list, description="影响的板块列表")
     affected_stocks: List[AffectedStock] = Field(default_factory=list, description="影响的股票列表")
@@ -102,6 +103,8 @@ class Event(BaseModel):
     expected_date: Optional[datetime] = Field(None, description="预期发生日期")
     source: Optional[str] = Field(None, description="数据来源")
     original_url: Optional[str] = Field(None, description="原始链接")
+    stock_code: Optional[str] = Field(None, description="公告所属股票代码")
+    bulletin_type: Optional[str] = Field(None, description="交易所公告类型")
 
     # AI 分析数据
     ai_analysis: Optional[AIAnalysis] = Field(None, description="AI 分析结果")
@@ -126,6 +129,8 @@ class EventCreate(BaseModel):
     expected_date: Optional[datetime] = None
     source: Optional[str] = None
     original_url: Optional[str] = None
+    stock_code: Optional[str] = None
+    bulletin_type: Optional[str] = None
     ai_analysis: Optional[AIAnalysis] = None
 
 
@@ -147,12 +152,15 @@ class EventResponse(BaseModel):
     id: str
     title: str
     content: str
+    content_length: Optional[int] = Field(None, description="原文长度，列表视图中 content 为截断摘要")
     event_category: str
     event_types: List[str]
     announcement_date: datetime
     expected_date: Optional[datetime] = None
     source: Optional[str] = None
     original_url: Optional[str] = None
+    stock_code: Optional[str] = None
+    bulletin_type: Optional[str] = None
     ai_analysis: Optional[AIAnalysis] = None
     created_at: datetime
     updated_at: datetime
@@ -1,28 +1,25 @@
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from fastapi import APIRouter, HTTPException, Query
 
+from app.config import settings
 from app.models import EventCreate, EventResponse, EventUpdate, PaginatedResponse
-from app.services.ai_service import get_ai_service
-from app.services.database_service import db_service
+from app.services.ai_service import AIAnalysisError, get_ai_service
+from app.services.analysis_queue import analysis_queue
+from app.services.database_service import EntityBatch, InvalidCursorError, db_service
+from app.services.llm_cache import llm_cache
+from app.services.llm_governor import llm_governor
+from app.services.rule_classifier import rule_classifier
+from app.services.search_service import query_terms
 
 router = APIRouter(prefix="/api/events", tags=["events"])
 
 
 async def _persist_related_entities(ai_analysis) -> None:
-    if ai_analysis.affected_sectors:
-        for sector in ai_analysis.affected_sectors:
-            await db_service.create_or_update_sector(
-                name=sector.name,
-                code=sector.code or f"SECTOR_{sector.name}",
-            )
-    if ai_analysis.affected_stocks:
-        for stock in ai_analysis.affected_stocks:
-            await db_service.create_or_update_stock(
-                name=stock.name,
-                code=stock.code or f"STOCK_{stock.name}",
-            )
+    batch = EntityBatch(db_service)
+    batch.add_analysis(ai_analysis)
+    await batch.flush()
 
 
 @router.get("", response_model=PaginatedResponse[EventResponse])
@@ -31,11 +28,19 @@ async def get_events(
     limit: int = Query(20, ge=1, le=100, description="Records to return"),
     category: Optional[str] = Query(None, description="Filter by event category"),
     event_type: Optional[str] = Query(None, description="Filter by event type"),
-    search: Optional[str] = Query(None, description="Search title/content"),
+    search: Optional[str] = Query(
+        None,
+        description="Full-text search over title/content, ranked by BM25 among the newest "
+        "SEARCH_MAX_CANDIDATES hits; total is capped there (total_capped=true) when more match",
+    ),
     start_date: Optional[str] = Query(None, description="Start date YYYY-MM-DD"),
     end_date: Optional[str] = Query(None, description="End date YYYY-MM-DD"),
     min_impact: Optional[float] = Query(None, description="Min impact score"),
     max_impact: Optional[float] = Query(None, description="Max impact score"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from previous page's next_cursor; overrides skip"),
+    count_mode: Literal["exact", "estimated", "capped", "cached"] = Query(
+        "exact", description="How total is computed: exact, estimated, capped (N+) or cached"
+    ),
 ):
     start_dt = None
     end_dt = None
@@ -50,18 +55,39 @@ async def get_events(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid end_date format. Use YYYY-MM-DD")
 
-    events, total = await db_service.get_events(
-        skip=skip,
-        limit=limit,
-        category=category,
-        event_type=event_type,
-        search=search,
-        start_date=start_dt,
-        end_date=end_dt,
-        min_impact=min_impact,
-        max_impact=max_impact,
+    try:
+        events, total = await db_service.get_events(
+            skip=skip,
+            limit=limit,
+            category=category,
+            event_type=event_type,
+            search=search,
+            start_date=start_dt,
+            end_date=end_dt,
+            min_impact=min_impact,
+            max_impact=max_impact,
+            cursor=cursor,
+            count_mode=count_mode,
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # 检索结果按相关度排序，继续使用 skip 翻页
+    next_cursor = None
+    if not search and len(events) == limit:
+        next_cursor = db_service.encode_event_cursor(events[-1])
+    total_capped = count_mode == "capped" and total >= settings.event_count_cap
+    # 检索只在最新的 SEARCH_MAX_CANDIDATES 个命中中按相关度排序，更旧的命中翻页不可达，
+    # 总数按上限报告为 "N+"
+    if search and query_terms(search) and total > settings.search_max_candidates:
+        total = settings.search_max_candidates
+        total_capped = True
+    return PaginatedResponse(
+        items=events,
+        total=total,
+        next_cursor=next_cursor,
+        total_capped=total_capped,
     )
-    return PaginatedResponse(items=events, total=total)
 
 
 @router.get("/{event_id}", response_model=dict)
@@ -130,6 +156,9 @@ async def analyze_event(event_id: str):
         )
         await _persist_related_entities(ai_analysis)
         return updated_event
+    except AIAnalysisError as exc:
+        await db_service.mark_analysis_failed(event_id, str(exc), retryable=exc.retryable)
+        raise HTTPException(status_code=503 if exc.retryable else 502, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Failed to analyze event: {exc}")
 
@@ -139,24 +168,47 @@ async def analyze_events_batch(
     limit: int = Query(100, ge=1, le=1000, description="Max events to scan"),
     days: Optional[int] = Query(None, ge=1, le=365, description="Only events in latest N days"),
     force: bool = Query(False, description="Reanalyze events that already have ai_analysis"),
+    use_cache: bool = Query(True, description="Reuse cached LLM replies for identical prompts"),
+    use_rules: bool = Query(True, description="Classify routine notices by rules instead of the LLM"),
+    enqueue: bool = Query(False, description="Enqueue analysis jobs for the workers instead of analyzing inline"),
 ):
+    start_date = datetime.utcnow() - timedelta(days=days) if days else None
+    if enqueue:
+        queued = await analysis_queue.enqueue_backlog(limit=limit, start_date=start_date, force=force)
+        return {"enqueued": queued, "analysis_queue": await analysis_queue.stats()}
+
     ai_service = get_ai_service()
     if not ai_service:
         raise HTTPException(status_code=503, detail="AI service not configured: set ZHIPU_API_KEY")
 
-    start_date = datetime.utcnow() - timedelta(days=days) if days else None
-    events, _ = await db_service.get_events(skip=0, limit=limit, start_date=start_date)
-    candidates = events if force else [item for item in events if not item.get("ai_analysis")]
+    events, _ = await db_service.get_events(
+        skip=0, limit=limit, start_date=start_date, count_mode="none", view="full"
+    )
+    candidates = events if force else [
+        item for item in events if not item.get("ai_analysis") and item.get("ai_status") != "failed"
+    ]
 
     analyzed = 0
+    rule_classified = 0
     failed = 0
+    entities = EntityBatch(db_service)
     for event in candidates:
         try:
-            result = await ai_service.analyze_and_classify(
-                event_title=event["title"],
-                event_content=event["content"],
-                needs_classification=True,
-            )
+            result = rule_classifier.classify(
+                event["title"],
+                event["content"],
+                source=event.get("source"),
+                bulletin_type=event.get("bulletin_type"),
+            ) if use_rules and settings.ai_rule_tier else None
+            if result:
+                rule_classified += 1
+            else:
+                result = await ai_service.analyze_and_classify(
+                    event_title=event["title"],
+                    event_content=event["content"],
+                    needs_classification=True,
+                    use_cache=use_cache,
+                )
             ai_analysis = result["ai_analysis"]
             await db_service.update_event(
                 event["id"],
@@ -165,20 +217,41 @@ async def analyze_events_batch(
                     event_category=result.get("event_category"),
                     event_types=result.get("event_types"),
                 ),
+                view="summary",
             )
-            await _persist_related_entities(ai_analysis)
+            entities.add_analysis(ai_analysis)
             analyzed += 1
+        except AIAnalysisError as exc:
+            await db_service.mark_analysis_failed(event["id"], str(exc), retryable=exc.retryable)
+            failed += 1
         except Exception:
             failed += 1
 
+    await entities.flush()
+
     return {
         "scanned": len(events),
         "candidates": len(candidates),
         "analyzed": analyzed,
+        "rule_classified": rule_classified,
         "failed": failed,
+        "llm_cache": llm_cache.stats(),
+        "llm_governor": llm_governor.stats(),
     }
 
 
+@router.get("/analyze/queue-stats", response_model=dict)
+async def get_analysis_queue_stats():
+    """Analysis job counts by status and the wait time of the oldest runnable job."""
+    return await analysis_queue.stats()
+
+
+@router.get("/analyze/cache-stats", response_model=dict)
+async def get_llm_cache_stats():
+    """LLM result cache hit/miss counters for this API process."""
+    return llm_cache.stats()
+
+
 @router.get("/sector/{sector_code}", response_model=List[dict])
 async def get_events_by_sector(
     sector_code: str,
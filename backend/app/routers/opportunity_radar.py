@@ -1,77 +1,49 @@
+import asyncio
+import json
 from datetime import datetime, timedelta
-from typing import Any, Dict, Literal
+from typing import Any, Dict, Literal, Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 
+from app.config import settings
 from app.services.database_service import db_service
-from app.services.radar_scoring import compute_event_scores, compute_market_index
+from app.services.radar_feed import radar_feed_service
+from app.services.radar_snapshot import RANKING_MAX_LIMIT, radar_snapshot_service
+from app.services.rollup_service import rollup_service
 
 router = APIRouter(prefix="/api/opportunity-radar", tags=["opportunity-radar"])
 
 
-def _build_event_card(event: Dict[str, Any], now: datetime) -> Dict[str, Any]:
-    ai = event.get("ai_analysis") or {}
-    sectors = ai.get("affected_sectors") or []
-    stocks = ai.get("affected_stocks") or []
-    scores = compute_event_scores(event, now)
-    return {
-        "id": event.get("id"),
-        "title": event.get("title"),
-        "content": event.get("content"),
-        "event_category": event.get("event_category"),
-        "event_types": event.get("event_types") or [],
-        "announcement_date": event.get("announcement_date"),
-        "source": event.get("source"),
-        "original_url": event.get("original_url"),
-        "impact_reason": ai.get("impact_reason"),
-        "is_hype": bool(ai.get("is_hype", False)),
-        "affected_sector_codes": [item.get("code") for item in sectors if item.get("code")],
-        "affected_stock_codes": [item.get("code") for item in stocks if item.get("code")],
-        **scores,
-    }
+# 旧版 /overview、/signals、/top-events 只读取最新 sample_limit 条事件打分；现在概览由小时桶覆盖窗口内全部事件，
+# 排名在数据库端完成，该参数不再影响结果，仅为兼容旧客户端继续接受（取值范围不变）
+def _sample_limit_query(le: int):
+    return Query(None, ge=20, le=le, deprecated=True, description="已废弃，不再生效：统计覆盖窗口内全部事件")
+
+
+SAMPLE_LIMIT_QUERY = _sample_limit_query(2000)
+TOP_EVENTS_SAMPLE_LIMIT_QUERY = _sample_limit_query(5000)
 
 
 @router.get("/overview")
 async def get_opportunity_radar_overview(
     window_hours: int = Query(72, ge=1, le=720, description="统计窗口（小时）"),
-    sample_limit: int = Query(500, ge=20, le=2000, description="读取样本上限"),
+    sample_limit: Optional[int] = SAMPLE_LIMIT_QUERY,
 ):
     try:
+        # 窗口汇总由事件写入时增量维护的小时桶求和得到，覆盖窗口内全部事件
         now = datetime.utcnow()
-        start_date = now - timedelta(hours=window_hours)
-        events, _ = await db_service.get_events(skip=0, limit=sample_limit, start_date=start_date)
-        cards = [_build_event_card(item, now) for item in events]
-
-        if not cards:
-            return {
-                "window_hours": window_hours,
-                "sample_size": 0,
-                "market_index": 0.0,
-                "avg_confidence": 0.0,
-                "opportunity_count": 0,
-                "risk_count": 0,
-                "neutral_count": 0,
-                "calculation_logic": {
-                    "market_index": "avg(sentiment_score * (0.5 + confidence_score/200))",
-                    "direction_rule": "sentiment>=20 => opportunity; sentiment<=-20 => risk; else neutral",
-                },
-                "updated_at": now,
-            }
-
-        market_index = compute_market_index(cards)
-        opportunity_count = sum(1 for card in cards if card["direction"] == "opportunity")
-        risk_count = sum(1 for card in cards if card["direction"] == "risk")
-        neutral_count = len(cards) - opportunity_count - risk_count
-        avg_confidence = sum(card["confidence_score"] for card in cards) / len(cards)
+        summary = await rollup_service.get_radar_window(now - timedelta(hours=window_hours))
 
         return {
             "window_hours": window_hours,
-            "sample_size": len(cards),
-            "market_index": round(market_index, 2),
-            "avg_confidence": round(avg_confidence, 2),
-            "opportunity_count": opportunity_count,
-            "risk_count": risk_count,
-            "neutral_count": neutral_count,
+            "sample_size": summary["sample_size"],
+            "market_index": round(summary["market_index"], 2),
+            "avg_confidence": round(summary["avg_confidence"], 2),
+            "opportunity_count": summary["opportunity_count"],
+            "risk_count": summary["risk_count"],
+            "neutral_count": summary["neutral_count"],
             "calculation_logic": {
                 "market_index": "avg(sentiment_score * (0.5 + confidence_score/200))",
                 "direction_rule": "sentiment>=20 => opportunity; sentiment<=-20 => risk; else neutral",
@@ -89,26 +61,17 @@ async def get_opportunity_radar_signals(
         "opportunity", description="信号类型：opportunity 或 risk"
     ),
     window_hours: int = Query(72, ge=1, le=720, description="统计窗口（小时）"),
-    limit: int = Query(10, ge=1, le=100, description="返回数量"),
-    sample_limit: int = Query(500, ge=20, le=2000, description="读取样本上限"),
+    limit: int = Query(10, ge=1, le=RANKING_MAX_LIMIT, description="返回数量"),
+    sample_limit: Optional[int] = SAMPLE_LIMIT_QUERY,
 ):
     try:
-        now = datetime.utcnow()
-        start_date = now - timedelta(hours=window_hours)
-        events, _ = await db_service.get_events(skip=0, limit=sample_limit, start_date=start_date)
-        cards = [_build_event_card(item, now) for item in events]
-
-        filtered = [item for item in cards if item["direction"] == signal_type]
-        filtered.sort(
-            key=lambda item: (abs(item["sentiment_score"]), item["relevance_score"]),
-            reverse=True,
-        )
+        snapshot = await radar_snapshot_service.ranking(signal_type, window_hours, limit)
 
         return {
             "signal_type": signal_type,
             "window_hours": window_hours,
-            "total": len(filtered),
-            "items": filtered[:limit],
+            "total": snapshot.total,
+            "items": snapshot.cards,
         }
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Failed to fetch opportunity radar signals: {exc}")
@@ -116,25 +79,110 @@ async def get_opportunity_radar_signals(
 
 @router.get("/top-events")
 async def get_opportunity_radar_top_events(
-    limit: int = Query(20, ge=1, le=100, description="返回数量"),
+    limit: int = Query(20, ge=1, le=RANKING_MAX_LIMIT, description="返回数量"),
     lookback_days: int = Query(30, ge=1, le=365, description="回溯天数"),
     min_relevance: float = Query(0, ge=0, le=100, description="最小相关度"),
-    sample_limit: int = Query(1000, ge=20, le=5000, description="读取样本上限"),
+    sample_limit: Optional[int] = TOP_EVENTS_SAMPLE_LIMIT_QUERY,
 ):
     try:
-        now = datetime.utcnow()
-        start_date = now - timedelta(days=lookback_days)
-        events, _ = await db_service.get_events(skip=0, limit=sample_limit, start_date=start_date)
-        cards = [_build_event_card(item, now) for item in events]
-
-        filtered = [item for item in cards if item["relevance_score"] >= min_relevance]
-        filtered.sort(key=lambda item: item["relevance_score"], reverse=True)
+        snapshot = await radar_snapshot_service.ranking(
+            "relevance", lookback_days * 24, limit, min_relevance=min_relevance
+        )
 
         return {
             "lookback_days": lookback_days,
             "min_relevance": min_relevance,
-            "total": len(filtered),
-            "items": filtered[:limit],
+            "total": snapshot.total,
+            "items": snapshot.cards,
         }
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Failed to fetch opportunity radar top events: {exc}")
+
+
+@router.get("/heat")
+async def get_opportunity_radar_heat(
+    entity_type: Literal["sector", "stock"] = Query("sector", description="实体类型：sector 或 stock"),
+    window_hours: int = Query(72, ge=1, le=720, description="统计窗口（小时）"),
+    sort_by: Literal["relevance_sum", "relevance_avg", "sentiment_sum", "sentiment_avg", "event_count"] = Query(
+        "relevance_sum", description="排序字段"
+    ),
+    order: Literal["desc", "asc"] = Query("desc", description="排序方向（asc 可用于情绪最负面的实体）"),
+    limit: int = Query(20, ge=1, le=RANKING_MAX_LIMIT, description="返回数量"),
+):
+    try:
+        now = datetime.utcnow()
+        items, total = await rollup_service.get_radar_heat(
+            entity_type,
+            now - timedelta(hours=window_hours),
+            now,
+            sort_by=sort_by,
+            ascending=order == "asc",
+            limit=limit,
+        )
+        names = await db_service.get_entity_names(
+            "sectors" if entity_type == "sector" else "stocks", [item["code"] for item in items]
+        )
+        for item in items:
+            item["name"] = names.get(item["code"])
+
+        return {
+            "entity_type": entity_type,
+            "window_hours": window_hours,
+            "sort_by": sort_by,
+            "total": total,
+            "items": items,
+            "updated_at": now,
+        }
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch opportunity radar heat: {exc}")
+
+
+def _sse_message(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}\n\n"
+
+
+@router.get("/stream")
+async def stream_opportunity_radar(
+    request: Request,
+    direction: Optional[Literal["opportunity", "risk", "neutral"]] = Query(
+        None, description="只推送该方向的信号"
+    ),
+    sector: Optional[str] = Query(None, description="只推送影响该板块代码的信号"),
+    min_relevance: float = Query(0, ge=0, le=100, description="最小相关度"),
+    window_hours: int = Query(72, ge=1, le=720, description="概览窗口（小时），也用于过滤信号公告日"),
+):
+    """
+    Server-Sent Events 推送
+
+    连接建立时先推送一次 overview，之后每当有事件写入或重新分析：
+    - event: signal  满足过滤条件的新卡片（结构同 /signals 的 items）
+    - event: overview  窗口概览及相对上一次推送的增量 delta
+    空闲时每 RADAR_STREAM_HEARTBEAT 秒发送一次注释行保活
+    """
+    subscription = radar_feed_service.subscribe(
+        direction=direction, sector=sector, min_relevance=min_relevance, window_hours=window_hours
+    )
+
+    async def messages():
+        try:
+            overview = await radar_feed_service.overview(subscription, datetime.utcnow())
+            yield _sse_message("overview", overview)
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.radar_stream_heartbeat
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse_message(event, data)
+        finally:
+            radar_feed_service.unsubscribe(subscription)
+
+    return StreamingResponse(
+        messages(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
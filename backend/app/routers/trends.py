@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services.rollup_service import rollup_service
+
+router = APIRouter(prefix="/api/trends", tags=["trends"])
+
+
+def _parse_date(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} format. Use YYYY-MM-DD")
+
+
+async def _series(dimension: str, key: str, granularity: str, start_date: Optional[str], end_date: Optional[str]):
+    start_dt = _parse_date(start_date, "start_date")
+    end_dt = _parse_date(end_date, "end_date")
+    if end_dt:
+        # 结束日期包含当天全部小时桶
+        end_dt = end_dt + timedelta(days=1) - timedelta(microseconds=1)
+    series = await rollup_service.get_series(
+        dimension, key, granularity=granularity, start=start_dt, end=end_dt
+    )
+    return {
+        "dimension": dimension,
+        "key": key,
+        "granularity": granularity,
+        "series": series,
+    }
+
+
+@router.get("/events")
+async def get_event_volume_trend(
+    granularity: Literal["hour", "day"] = Query("day", description="Bucket size"),
+    start_date: Optional[str] = Query(None, description="Start date YYYY-MM-DD"),
+    end_date: Optional[str] = Query(None, description="End date YYYY-MM-DD"),
+):
+    """全部事件的数量与平均分走势"""
+    return await _series("all", "all", granularity, start_date, end_date)
+
+
+@router.get("/{dimension}/{key}")
+async def get_trend(
+    dimension: Literal["category", "event_type", "sector", "stock"],
+    key: str,
+    granularity: Literal["hour", "day"] = Query("day", description="Bucket size"),
+    start_date: Optional[str] = Query(None, description="Start date YYYY-MM-DD"),
+    end_date: Optional[str] = Query(None, description="End date YYYY-MM-DD"),
+):
+    """
+    按类别/事件类型/板块代码/股票代码读取时间序列
+
+    每个桶包含事件数和影响分、情绪分、置信度的均值（无 AI 分析时为 null）
+    """
+    return await _series(dimension, key, granularity, start_date, end_date)
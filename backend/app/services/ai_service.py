@@ -1,14 +1,26 @@
 from __future__ import annotations
 
-import asyncio
 import json
 from datetime import datetime
-from typing import Any, Dict, List
-
-from zai import ZhipuAiClient
+from typing import Any, Dict, List, Optional, Union
 
 from app.config import settings
 from app.models import AIAnalysis, AffectedMaterial, AffectedSector, AffectedStock
+from app.services.content_condenser import condense_content
+from app.services.llm_cache import cache_key, llm_cache
+from app.services.llm_client import LLMRequestError, ZhipuChatClient
+from app.services.llm_governor import is_retryable, llm_governor
+
+
+# Bump when the prompt template or the expected response schema changes,
+# so cached responses from the previous prompt are no longer reused.
+PROMPT_VERSION = 1
+
+# Output budget per event in a batched prompt (a single-event call gets 1500).
+BATCH_TOKENS_PER_EVENT = 800
+
+# A batch element missing any of these is treated as unparsed and retried alone.
+_BATCH_REQUIRED_KEYS = ("event_category", "event_types", "impact_score", "sentiment_score", "confidence_score")
 
 
 VALID_EVENT_CATEGORIES = {"global_macro", "policy", "industry", "company"}
@@ -36,6 +48,24 @@ VALID_EVENT_TYPES = {
 }
 
 
+class AIAnalysisError(Exception):
+    """Analysis failed; nothing should be stored for the event.
+
+    retryable is False only for requests the provider rejected outright
+    (4xx other than 429), which will fail the same way next time.
+    """
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _analysis_error(exc: Exception) -> AIAnalysisError:
+    status = exc.status_code if isinstance(exc, LLMRequestError) else None
+    permanent = status is not None and 400 <= status < 500 and status != 429
+    return AIAnalysisError(f"AI analysis failed: {exc}", retryable=not permanent)
+
+
 def _clamp(v: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, v))
 
@@ -49,7 +79,7 @@ def _as_float(v: Any, default: float) -> float:
         return default
 
 
-def _extract_json(text: str) -> Dict[str, Any]:
+def _strip_code_fence(text: str) -> str:
     cleaned = text.strip()
     if cleaned.startswith("```json"):
         cleaned = cleaned[7:]
@@ -57,8 +87,11 @@ def _extract_json(text: str) -> Dict[str, Any]:
         cleaned = cleaned[3:]
     if cleaned.endswith("```"):
         cleaned = cleaned[:-3]
-    cleaned = cleaned.strip()
+    return cleaned.strip()
 
+
+def _extract_json(text: str) -> Dict[str, Any]:
+    cleaned = _strip_code_fence(text)
     start = cleaned.find("{")
     end = cleaned.rfind("}")
     if start == -1 or end == -1 or end <= start:
@@ -66,14 +99,44 @@ def _extract_json(text: str) -> Dict[str, Any]:
     return json.loads(cleaned[start : end + 1])
 
 
+def _extract_json_array(text: str) -> List[Any]:
+    cleaned = _strip_code_fence(text)
+    start = cleaned.find("[")
+    end = cleaned.rfind("]")
+    if start == -1 or end == -1 or end <= start:
+        raise ValueError("No JSON array found in model response")
+    data = json.loads(cleaned[start : end + 1])
+    if not isinstance(data, list):
+        raise ValueError("Model response is not a JSON array")
+    return data
+
+
+def parse_batch_reply(text: str, size: int) -> List[Optional[Dict[str, Any]]]:
+    """Map a batched reply back to input positions; unusable elements stay None."""
+    results: List[Optional[Dict[str, Any]]] = [None] * size
+    for position, item in enumerate(_extract_json_array(text)):
+        if not isinstance(item, dict):
+            continue
+        index = item.get("index", position)
+        if isinstance(index, str) and index.strip().isdigit():
+            index = int(index)
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < size:
+            continue
+        if results[index] is not None or any(key not in item for key in _BATCH_REQUIRED_KEYS):
+            continue
+        results[index] = {key: value for key, value in item.items() if key != "index"}
+    return results
+
+
 class AIService:
     """LLM-based event analyzer with strict schema normalization."""
 
     def __init__(self):
         if not settings.zhipu_api_key or settings.zhipu_api_key == "your-api-key-here":
             raise ValueError("ZHIPU_API_KEY is not configured")
-        self.client = ZhipuAiClient(api_key=settings.zhipu_api_key)
+        self.client = ZhipuChatClient(api_key=settings.zhipu_api_key)
         self.model = getattr(settings, "ai_model", "glm-4.7-flash")
+        self.batch_stats = {"batches": 0, "batched_events": 0, "fallbacks": 0}
 
     def _build_prompt(self, event_title: str, event_content: str, needs_classification: bool) -> str:
         classification_hint = (
@@ -124,15 +187,104 @@ Strict JSON only:
 }}
 """.strip()
 
-    def _call_model(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1,
-            max_tokens=1500,
-            thinking={"type": "disabled"},
+    def _build_batch_prompt(self, events: List[Dict[str, str]], needs_classification: bool) -> str:
+        classification_hint = (
+            "Return both event_category and event_types."
+            if needs_classification
+            else "Still return event_category and event_types, even if not updating category."
+        )
+        blocks = "\n\n".join(
+            f"### Event {index}\nTitle: {event['title']}\nContent: {event['content']}"
+            for index, event in enumerate(events)
+        )
+        return f"""
+You are a senior financial event analyst.
+
+Analyze each of the {len(events)} events below independently.
+For every event:
+1) Extract affected sectors/stocks/materials.
+2) Score the event:
+   - impact_score: 0 to 1
+   - sentiment_score: -1 to 1
+   - confidence_score: 0 to 1
+3) Explain impact_reason briefly.
+4) {classification_hint}
+
+Allowed event_category:
+global_macro, policy, industry, company
+
+Allowed event_types:
+macro_econ, geopolitics, regulatory, liquidity, sentiment, tech_innov, supply_chain,
+price_vol, fin_perf, order_contract, merger_re, capital_action, buyback, holder_change,
+insider_trans, risk_crisis, litigation, info_change, ops_info, other
+
+Events:
+
+{blocks}
+
+Strict JSON array only, one object per event in input order, "index" = the event number:
+[
+  {{
+    "index": 0,
+    "event_category": "company",
+    "event_types": ["other"],
+    "impact_score": 0.0,
+    "sentiment_score": 0.0,
+    "confidence_score": 0.5,
+    "impact_reason": "string",
+    "is_hype": false,
+    "entities": {{
+      "affected_stocks": [{{"name":"", "code":"", "reason":""}}],
+      "affected_sectors": [{{"name":"", "code":"", "reason":""}}],
+      "affected_materials": [{{"name":"", "trend":""}}]
+    }}
+  }}
+]
+""".strip()
+
+    async def _call_model(self, prompt: str, max_tokens: int = 1500) -> str:
+        async def request():
+            content, usage = await self.client.complete(
+                messages=[{"role": "user", "content": prompt}],
+                model=self.model,
+                temperature=0.1,
+                max_tokens=max_tokens,
+                thinking={"type": "disabled"},
+            )
+            return content, usage.get("total_tokens")
+
+        # Rough upper bound until the reply reports real usage: ~2 chars per prompt token.
+        return await llm_governor.call(request, estimated_tokens=len(prompt) // 2 + max_tokens)
+
+    async def _complete_json(self, prompt: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Call the model and parse its JSON reply, reusing cached replies for identical prompts."""
+        key = cache_key(self.model, PROMPT_VERSION, prompt)
+        if use_cache:
+            cached = await llm_cache.get(key)
+            if cached is not None:
+                return cached
+
+        raw_text = await self._call_model(prompt)
+        raw_json = _extract_json(raw_text)
+        # Only parseable replies are cached; failures are retried next time.
+        await llm_cache.set(key, raw_json, self.model)
+        return raw_json
+
+    def _batch_item_key(self, event: Dict[str, str], needs_classification: bool) -> str:
+        # Batched replies are cached per event, so a rerun hits regardless of how events are grouped.
+        return cache_key(
+            self.model,
+            PROMPT_VERSION,
+            f"batch\n{needs_classification}\n{event['title']}\n{event['content']}",
         )
-        return response.choices[0].message.content.strip()
+
+    async def _complete_batch(
+        self, events: List[Dict[str, str]], needs_classification: bool
+    ) -> List[Optional[Dict[str, Any]]]:
+        """One model call for several events; positions the reply does not cover are None."""
+        prompt = self._build_batch_prompt(events, needs_classification)
+        raw_text = await self._call_model(prompt, max_tokens=BATCH_TOKENS_PER_EVENT * len(events))
+        return parse_batch_reply(raw_text, len(events))
 
     def _normalize_result(self, raw: Dict[str, Any]) -> Dict[str, Any]:
         event_category = str(raw.get("event_category") or "company").strip()
@@ -203,51 +355,115 @@ Strict JSON only:
             "affected_materials": materials,
         }
 
+    def _build_result(self, normalized: Dict[str, Any]) -> Dict[str, Any]:
+        ai_analysis = AIAnalysis(
+            impact_score=normalized["impact_score"],
+            sentiment_score=normalized["sentiment_score"],
+            confidence_score=normalized["confidence_score"],
+            is_hype=normalized["is_hype"],
+            impact_reason=normalized["impact_reason"],
+            method="llm",
+            affected_sectors=normalized["affected_sectors"],
+            affected_stocks=normalized["affected_stocks"],
+            affected_materials=normalized["affected_materials"],
+            analyzed_at=datetime.utcnow(),
+        )
+        return {
+            "ai_analysis": ai_analysis,
+            "event_category": normalized["event_category"],
+            "event_types": normalized["event_types"],
+        }
+
     async def analyze_and_classify(
         self,
         event_title: str,
         event_content: str,
         needs_classification: bool = True,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
-        prompt = self._build_prompt(event_title, event_content, needs_classification)
+        """
+        Analyze and classify one event.
+
+        The content is condensed to settings.ai_content_token_budget tokens
+        before it goes into the prompt.
+
+        Raises:
+            AIAnalysisError: the model call failed after the governor's retries,
+                or the reply could not be parsed. Nothing is returned to store.
+        """
+        prompt = self._build_prompt(event_title, condense_content(event_content), needs_classification)
         try:
-            raw_text = await asyncio.to_thread(self._call_model, prompt)
-            raw_json = _extract_json(raw_text)
-            normalized = self._normalize_result(raw_json)
-
-            ai_analysis = AIAnalysis(
-                impact_score=normalized["impact_score"],
-                sentiment_score=normalized["sentiment_score"],
-                confidence_score=normalized["confidence_score"],
-                is_hype=normalized["is_hype"],
-                impact_reason=normalized["impact_reason"],
-                affected_sectors=normalized["affected_sectors"],
-                affected_stocks=normalized["affected_stocks"],
-                affected_materials=normalized["affected_materials"],
-                analyzed_at=datetime.utcnow(),
-            )
-            return {
-                "ai_analysis": ai_analysis,
-                "event_category": normalized["event_category"],
-                "event_types": normalized["event_types"],
-            }
+            raw_json = await self._complete_json(prompt, use_cache=use_cache)
+            return self._build_result(self._normalize_result(raw_json))
         except Exception as exc:
-            # Keep pipeline moving on bad/empty model responses.
-            return {
-                "ai_analysis": AIAnalysis(
-                    impact_score=0.0,
-                    sentiment_score=0.0,
-                    confidence_score=0.0,
-                    is_hype=False,
-                    impact_reason=f"AI analysis failed: {exc}",
-                    affected_sectors=[],
-                    affected_stocks=[],
-                    affected_materials=[],
-                    analyzed_at=datetime.utcnow(),
-                ),
-                "event_category": "company",
-                "event_types": ["other"],
-            }
+            raise _analysis_error(exc) from exc
+
+    async def analyze_batch(
+        self,
+        events: List[Dict[str, str]],
+        needs_classification: bool = True,
+        use_cache: bool = True,
+    ) -> List[Union[Dict[str, Any], AIAnalysisError]]:
+        """
+        Analyze several short events (dicts with title/content) in one prompt.
+
+        Results are returned in input order, shaped like analyze_and_classify;
+        an event that could not be analyzed gets its AIAnalysisError instead.
+        Elements missing from the reply or failing validation fall back to
+        single-event calls, run one after another so a caller's concurrency
+        limit still bounds the number of in-flight requests. If the batch call
+        itself still fails after retries (provider overloaded), the pending
+        events are all returned as retryable errors rather than fanned out.
+        """
+        # The single-event fallback condenses on its own, so it gets the original
+        # content (condense_content is not idempotent).
+        condensed = [{"title": event["title"], "content": condense_content(event["content"])} for event in events]
+        keys = [self._batch_item_key(event, needs_classification) for event in condensed]
+        raws: List[Optional[Dict[str, Any]]] = [None] * len(events)
+        if use_cache:
+            for index, key in enumerate(keys):
+                raws[index] = await llm_cache.get(key)
+
+        pending = [index for index, raw in enumerate(raws) if raw is None]
+        batch_error: Optional[AIAnalysisError] = None
+        if len(pending) > 1:
+            self.batch_stats["batches"] += 1
+            self.batch_stats["batched_events"] += len(pending)
+            try:
+                replies = await self._complete_batch([condensed[index] for index in pending], needs_classification)
+            except Exception as exc:
+                replies = [None] * len(pending)
+                if is_retryable(exc):
+                    batch_error = _analysis_error(exc)
+            for index, raw in zip(pending, replies):
+                if raw is not None:
+                    raws[index] = raw
+                    await llm_cache.set(keys[index], raw, self.model)
+
+        results: List[Union[Dict[str, Any], AIAnalysisError, None]] = [None] * len(events)
+        for index, raw in enumerate(raws):
+            if raw is None:
+                if batch_error is not None:
+                    results[index] = batch_error
+                continue
+            try:
+                results[index] = self._build_result(self._normalize_result(raw))
+            except Exception:
+                results[index] = None
+
+        for index, event in enumerate(events):
+            if results[index] is None:
+                self.batch_stats["fallbacks"] += 1
+                try:
+                    results[index] = await self.analyze_and_classify(
+                        event_title=event["title"],
+                        event_content=event["content"],
+                        needs_classification=needs_classification,
+                        use_cache=use_cache,
+                    )
+                except AIAnalysisError as exc:
+                    results[index] = exc
+        return results
 
     async def analyze_event(self, event_title: str, event_content: str) -> AIAnalysis:
         """Backward-compatible API used by existing routes."""
@@ -272,3 +488,9 @@ def get_ai_service() -> AIService:
             print("AI service will not be available until API key is configured")
             return None
     return ai_service
+
+
+async def close_ai_service() -> None:
+    """Close the shared HTTP connection pool, if the service was created."""
+    if ai_service is not None:
+        await ai_service.client.aclose()
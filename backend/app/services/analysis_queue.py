@@ -0,0 +1,305 @@
+"""
+AI 分析任务队列
+
+analysis_jobs 集合中每个事件至多一个任务（_id 即事件 _id），入库只写任务，
+由任意数量的 worker（API 进程内协程或 spider/analyze/analysis_worker.py 进程）消费：
+- 领取：find_one_and_update 原子地把最高优先级的 queued 任务改为 leased 并设置租约到期时间，
+  同一任务不会被两个 worker 同时领取
+- 可见性超时：worker 崩溃后租约过期的任务由 reclaim_expired 放回队列，进度不丢失
+- 重试：可重试错误按指数退避推迟 available_at，超过最大尝试次数标记为 failed
+- 优先级：事件时间（小时）加来源可信度加成（小时），新鲜、可信来源的事件先分析，
+  积压的旧事件不会挡住刚入库的电报
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.core.database import get_database
+from app.services.radar_scoring import source_confidence
+
+JOB_QUEUED = "queued"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def job_priority(event: Dict[str, Any], now: Optional[datetime] = None) -> float:
+    """
+    任务优先级（越大越先分析）
+
+    事件时间换算为小时数，再加上 来源可信度 * settings.analysis_queue_source_bonus_hours，
+    即可信来源的事件相当于"晚发生"若干小时。未来时间按当前时间计。
+    """
+    now = now or datetime.utcnow()
+    date = event.get("announcement_date") or event.get("created_at")
+    if not isinstance(date, datetime):
+        date = now
+    date = min(date.replace(tzinfo=None), now)
+    hours = (date - _EPOCH).total_seconds() / 3600
+    return round(hours + source_confidence(event.get("source")) * settings.analysis_queue_source_bonus_hours, 3)
+
+
+def is_batchable(event: Dict[str, Any]) -> bool:
+    """短事件可与其他短事件合并到一个提示词（与 analyze_events.py 的分组规则一致）"""
+    # 入库后长正文已外置，content 只剩摘要，按原文长度 content_length 判断
+    length = event.get("content_length")
+    if not isinstance(length, int):
+        length = len(event.get("content") or "")
+    return len(event.get("title") or "") + length <= settings.ai_batch_max_chars
+
+
+class AnalysisQueue:
+    """MongoDB 持久化的分析任务队列"""
+
+    def __init__(
+        self,
+        visibility_timeout: float = 600.0,
+        max_attempts: int = 5,
+        retry_delay: float = 30.0,
+    ):
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def _get_db(self) -> AsyncIOMotorDatabase:
+        """获取数据库实例（延迟加载）"""
+        return get_database()
+
+    async def enqueue(self, events: Iterable[Dict[str, Any]], force: bool = False) -> int:
+        """
+        为事件创建分析任务
+
+        已有任务的事件跳过；force 时已完成或失败的任务重新排队（进行中的任务不受影响）
+
+        Args:
+            events: 含 _id（或 id）的事件字典
+
+        Returns:
+            新建或重新排队的任务数
+        """
+        now = datetime.utcnow()
+        operations = []
+        for event in events:
+            event_id = event.get("_id") or event.get("id")
+            if not event_id:
+                continue
+            job = {
+                "status": JOB_QUEUED,
+                "priority": job_priority(event, now),
+                "batchable": is_batchable(event),
+                "force": force,
+                "attempts": 0,
+                "available_at": now,
+                "updated_at": now,
+            }
+            if force:
+                operations.append(UpdateOne(
+                    {"_id": ObjectId(str(event_id)), "status": {"$ne": JOB_LEASED}},
+                    {
+                        "$set": job,
+                        "$setOnInsert": {"created_at": now},
+                        "$unset": {"last_error": "", "completed_at": ""},
+                    },
+                    upsert=True,
+                ))
+            else:
+                operations.append(UpdateOne(
+                    {"_id": ObjectId(str(event_id))},
+                    {"$setOnInsert": {**job, "created_at": now}},
+                    upsert=True,
+                ))
+        if not operations:
+            return 0
+        try:
+            result = await self._get_db().analysis_jobs.bulk_write(operations, ordered=False)
+            return result.upserted_count + result.modified_count
+        except BulkWriteError as e:
+            # force 时进行中的任务不匹配过滤条件，upsert 撞上 _id 唯一约束，其余写入已生效
+            details = e.details
+            return details.get("nUpserted", 0) + details.get("nModified", 0)
+
+    async def record(self, events: Iterable[Dict[str, Any]]) -> None:
+        """新写入的事件中没有分析结果的入队（队列关闭时不做任何事）"""
+        if not settings.analysis_queue_enabled:
+            return
+        pending = [event for event in events if not event.get("ai_analysis")]
+        if not pending:
+            return
+        try:
+            await self.enqueue(pending)
+        except Exception as e:
+            # 入队失败不影响入库，analyze_events.py 扫描时仍会分析这些事件
+            print(f"Error enqueueing analysis jobs: {str(e)}")
+
+    async def enqueue_backlog(
+        self,
+        limit: int = 1000,
+        start_date: Optional[datetime] = None,
+        force: bool = False,
+    ) -> int:
+        """
+        把库中待分析的事件（无 ai_analysis，且未被服务商拒绝）入队
+
+        在数据库端过滤，force 时入队时间范围内的全部事件
+        """
+        query: Dict[str, Any] = {}
+        if not force:
+            query = {"ai_analysis": None, "ai_status": {"$ne": "failed"}}
+        if start_date:
+            query["announcement_date"] = {"$gte": start_date}
+        projection = {
+            "title": 1, "content": 1, "content_length": 1, "source": 1, "announcement_date": 1, "created_at": 1,
+        }
+        events = await self._get_db().events.find(query, projection).sort(
+            [("announcement_date", -1), ("_id", -1)]
+        ).limit(limit).to_list(limit)
+        return await self.enqueue(events, force=force)
+
+    async def lease(
+        self,
+        worker_id: str,
+        limit: int = 1,
+        batchable_only: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        按优先级领取至多 limit 个任务
+
+        每个任务由一次 find_one_and_update 原子领取；batchable_only 时只领取短事件
+        """
+        jobs: List[Dict[str, Any]] = []
+        for _ in range(limit):
+            now = datetime.utcnow()
+            query: Dict[str, Any] = {"status": JOB_QUEUED, "available_at": {"$lte": now}}
+            if batchable_only:
+                query["batchable"] = True
+            job = await self._get_db().analysis_jobs.find_one_and_update(
+                query,
+                {
+                    "$set": {
+                        "status": JOB_LEASED,
+                        "lease_owner": worker_id,
+                        "lease_expires_at": now + timedelta(seconds=self.visibility_timeout),
+                        "updated_at": now,
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("priority", -1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if job is None:
+                break
+            jobs.append(job)
+        return jobs
+
+    async def ack(self, job: Dict[str, Any]) -> None:
+        """任务完成；租约已被收回并由其他 worker 领取时不覆盖"""
+        now = datetime.utcnow()
+        await self._get_db().analysis_jobs.update_one(
+            {"_id": job["_id"], "status": JOB_LEASED, "lease_owner": job["lease_owner"]},
+            {
+                "$set": {"status": JOB_DONE, "completed_at": now, "updated_at": now},
+                "$unset": {"lease_owner": "", "lease_expires_at": "", "last_error": ""},
+            },
+        )
+
+    async def nack(self, job: Dict[str, Any], error: str, retryable: bool = True) -> Optional[str]:
+        """
+        任务失败：可重试且未超过最大尝试次数时退避后重新排队，否则标记为 failed
+
+        Returns:
+            任务的新状态；任务已确认或租约已被收回时为 None
+        """
+        now = datetime.utcnow()
+        attempts = job.get("attempts", 1)
+        if retryable and attempts < self.max_attempts:
+            status = JOB_QUEUED
+            delay = self.retry_delay * 2 ** (attempts - 1)
+            update = {"status": status, "available_at": now + timedelta(seconds=delay)}
+        else:
+            status = JOB_FAILED
+            update = {"status": status, "completed_at": now}
+        result = await self._get_db().analysis_jobs.update_one(
+            {"_id": job["_id"], "status": JOB_LEASED, "lease_owner": job["lease_owner"]},
+            {
+                "$set": {**update, "last_error": error[:500], "updated_at": now},
+                "$unset": {"lease_owner": "", "lease_expires_at": ""},
+            },
+        )
+        return status if result.matched_count else None
+
+    async def release(self, jobs: Iterable[Dict[str, Any]]) -> None:
+        """worker 停止时交还未处理完的任务，立即重新排队且不计入尝试次数"""
+        now = datetime.utcnow()
+        for job in jobs:
+            await self._get_db().analysis_jobs.update_one(
+                {"_id": job["_id"], "status": JOB_LEASED, "lease_owner": job["lease_owner"]},
+                {
+                    "$set": {"status": JOB_QUEUED, "available_at": now, "updated_at": now},
+                    "$unset": {"lease_owner": "", "lease_expires_at": ""},
+                    "$inc": {"attempts": -1},
+                },
+            )
+
+    async def reclaim_expired(self) -> int:
+        """
+        收回租约过期的任务（worker 崩溃或被终止）
+
+        已用完尝试次数的标记为 failed，其余立即重新排队
+
+        Returns:
+            收回的任务数
+        """
+        now = datetime.utcnow()
+        expired = {"status": JOB_LEASED, "lease_expires_at": {"$lte": now}}
+        unset = {"lease_owner": "", "lease_expires_at": ""}
+        failed = await self._get_db().analysis_jobs.update_many(
+            {**expired, "attempts": {"$gte": self.max_attempts}},
+            {
+                "$set": {
+                    "status": JOB_FAILED,
+                    "last_error": "lease expired",
+                    "completed_at": now,
+                    "updated_at": now,
+                },
+                "$unset": unset,
+            },
+        )
+        requeued = await self._get_db().analysis_jobs.update_many(
+            expired,
+            {"$set": {"status": JOB_QUEUED, "available_at": now, "updated_at": now}, "$unset": unset},
+        )
+        return failed.modified_count + requeued.modified_count
+
+    async def stats(self) -> Dict[str, Any]:
+        """各状态任务数和最早可领取任务的等待时间"""
+        counts = {status: 0 for status in (JOB_QUEUED, JOB_LEASED, JOB_DONE, JOB_FAILED)}
+        async for doc in self._get_db().analysis_jobs.aggregate(
+            [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        ):
+            counts[doc["_id"]] = doc["count"]
+
+        now = datetime.utcnow()
+        oldest = await self._get_db().analysis_jobs.find_one(
+            {"status": JOB_QUEUED, "available_at": {"$lte": now}},
+            {"available_at": 1},
+            sort=[("available_at", 1)],
+        )
+        counts["oldest_wait_seconds"] = (
+            round((now - oldest["available_at"]).total_seconds(), 1) if oldest else 0.0
+        )
+        return counts
+
+
+# 全局分析任务队列实例
+analysis_queue = AnalysisQueue(
+    visibility_timeout=settings.analysis_queue_visibility_timeout,
+    max_attempts=settings.analysis_queue_max_attempts,
+    retry_delay=settings.analysis_queue_retry_delay,
+)
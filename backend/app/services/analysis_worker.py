@@ -0,0 +1,210 @@
+"""
+AI 分析任务消费者
+
+AnalysisWorkerPool 在当前进程中运行若干 worker 协程，从 analysis_queue 领取任务：
+例行公告按规则判定，其余事件调用模型（短事件合并为一个批量提示词），
+成功后确认任务，失败时按错误类型退避重试或标记为 failed。
+API 进程按 settings.analysis_workers 启动一组 worker，
+spider/analyze/analysis_worker.py 可在任意多台机器上再起独立的 worker 进程。
+"""
+import asyncio
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from app.config import settings
+from app.core.database import get_database
+from app.models import EventUpdate
+from app.services.ai_service import AIAnalysisError, get_ai_service
+from app.services.analysis_queue import JOB_QUEUED, analysis_queue
+from app.services.content_store import content_store
+from app.services.database_service import EntityBatch, db_service
+from app.services.rule_classifier import rule_classifier
+
+
+class AnalysisWorkerPool:
+    """同一进程内的一组分析 worker"""
+
+    entity_flush_size = 200
+
+    def __init__(
+        self,
+        workers: int = 4,
+        batch_size: Optional[int] = None,
+        use_cache: bool = True,
+        use_rules: Optional[bool] = None,
+    ):
+        self.workers = max(1, workers)
+        self.batch_size = max(1, settings.ai_batch_size if batch_size is None else batch_size)
+        self.use_cache = use_cache
+        self.use_rules = settings.ai_rule_tier if use_rules is None else use_rules
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self.ai_service = None
+        self.entities = EntityBatch(db_service)
+        self.ok = 0
+        self.rule_hits = 0
+        self.skipped = 0
+        self.retried = 0
+        self.fail = 0
+        self.start_ts = 0.0
+
+    async def run(self, drain: bool = False) -> None:
+        """
+        运行 worker 直到被取消
+
+        Args:
+            drain: 队列中没有可领取的任务时退出（用于一次性处理积压）
+        """
+        self.ai_service = get_ai_service()
+        if not self.ai_service:
+            print("Analysis workers not started: AI service unavailable, set ZHIPU_API_KEY first.")
+            return
+
+        self.start_ts = time.time()
+        await analysis_queue.reclaim_expired()
+        reaper = None if drain else asyncio.create_task(self._reclaim_loop())
+        try:
+            await asyncio.gather(*(self._worker(f"{self.worker_prefix}:{i}", drain) for i in range(self.workers)))
+        finally:
+            if reaper:
+                reaper.cancel()
+            await self.entities.flush()
+
+    async def _reclaim_loop(self) -> None:
+        # 每隔半个可见性超时收回一次崩溃 worker 的任务
+        interval = max(settings.analysis_queue_poll_interval, analysis_queue.visibility_timeout / 2)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                reclaimed = await analysis_queue.reclaim_expired()
+                if reclaimed:
+                    print(f"Analysis queue: reclaimed {reclaimed} expired leases")
+            except Exception as e:
+                print(f"Error reclaiming analysis jobs: {str(e)}")
+
+    async def _worker(self, worker_id: str, drain: bool) -> None:
+        while True:
+            jobs: List[Dict[str, Any]] = []
+            try:
+                jobs = await analysis_queue.lease(worker_id)
+                if jobs and jobs[0].get("batchable") and self.batch_size > 1:
+                    jobs += await analysis_queue.lease(worker_id, self.batch_size - 1, batchable_only=True)
+                if not jobs:
+                    if drain:
+                        return
+                    if len(self.entities):
+                        await self.entities.flush()
+                    await asyncio.sleep(settings.analysis_queue_poll_interval)
+                    continue
+                await self._process(jobs)
+            except asyncio.CancelledError:
+                # 停止时把手上的任务交还队列，不必等租约过期
+                await analysis_queue.release(jobs)
+                raise
+            except Exception as e:
+                print(f"Analysis worker {worker_id} error: {str(e)}")
+                for job in jobs:
+                    await self._fail(job, str(e), retryable=True)
+                await asyncio.sleep(settings.analysis_queue_poll_interval)
+
+    async def _load_events(self, jobs: List[Dict[str, Any]]) -> Dict[ObjectId, Dict[str, Any]]:
+        events = await get_database().events.find({"_id": {"$in": [job["_id"] for job in jobs]}}).to_list(len(jobs))
+        await content_store.hydrate(events)
+        return {event["_id"]: event for event in events}
+
+    async def _process(self, jobs: List[Dict[str, Any]]) -> None:
+        events = await self._load_events(jobs)
+        pending = []
+        for job in jobs:
+            event = events.get(job["_id"])
+            # 事件已删除，或在入队后已由其他途径（analyze_events.py、API）分析
+            if event is None or (event.get("ai_analysis") and not job.get("force")):
+                await analysis_queue.ack(job)
+                self.skipped += 1
+                continue
+            result = rule_classifier.classify(
+                event.get("title") or "",
+                event.get("content") or "",
+                source=event.get("source"),
+                bulletin_type=event.get("bulletin_type"),
+            ) if self.use_rules else None
+            if result:
+                await self._save_result(job, result)
+                self.rule_hits += 1
+                continue
+            pending.append((job, event))
+
+        if len(pending) == 1:
+            job, event = pending[0]
+            try:
+                result = await self.ai_service.analyze_and_classify(
+                    event_title=event["title"],
+                    event_content=event.get("content") or "",
+                    needs_classification=True,
+                    use_cache=self.use_cache,
+                )
+            except AIAnalysisError as exc:
+                await self._fail(job, str(exc), exc.retryable)
+                return
+            await self._save_result(job, result)
+        elif pending:
+            results = await self.ai_service.analyze_batch(
+                [{"title": event["title"], "content": event.get("content") or ""} for _, event in pending],
+                needs_classification=True,
+                use_cache=self.use_cache,
+            )
+            for (job, _), result in zip(pending, results):
+                if isinstance(result, AIAnalysisError):
+                    await self._fail(job, str(result), result.retryable)
+                else:
+                    await self._save_result(job, result)
+
+    async def _save_result(self, job: Dict[str, Any], result: Dict[str, Any]) -> None:
+        ai_analysis = result["ai_analysis"]
+        updated = await db_service.update_event(
+            str(job["_id"]),
+            EventUpdate(
+                ai_analysis=ai_analysis,
+                event_category=result.get("event_category"),
+                event_types=result.get("event_types"),
+            ),
+            view="summary",
+        )
+        if updated is None:
+            # 写库失败时事件仍没有分析结果，不能确认任务
+            await self._fail(job, "failed to save analysis result", retryable=True)
+            return
+        await analysis_queue.ack(job)
+        self.ok += 1
+
+        # 板块/股票在内存中合并，攒够一批或空闲时统一写入
+        self.entities.add_analysis(ai_analysis)
+        if len(self.entities) >= self.entity_flush_size:
+            await self.entities.flush()
+
+    async def _fail(self, job: Dict[str, Any], error: str, retryable: bool) -> None:
+        status = await analysis_queue.nack(job, error, retryable)
+        if status is None:
+            return
+        await db_service.mark_analysis_failed(str(job["_id"]), error, retryable=retryable)
+        if status == JOB_QUEUED:
+            self.retried += 1
+        else:
+            self.fail += 1
+            print(f"Analysis job {job['_id']} failed after {job.get('attempts')} attempts: {error}")
+
+    def stats(self) -> Dict[str, Any]:
+        """worker 统计（当前进程）"""
+        elapsed = time.time() - self.start_ts if self.start_ts else 0.0
+        return {
+            "workers": self.workers,
+            "ok": self.ok,
+            "rule_classified": self.rule_hits,
+            "skipped": self.skipped,
+            "retried": self.retried,
+            "failed": self.fail,
+            "events_per_second": round(self.ok / elapsed, 3) if elapsed else 0.0,
+        }
@@ -0,0 +1,228 @@
+"""
+LLM 输入正文压缩
+
+交易所公告 PDF 的前几千字通常是封面、目录和免责声明，直接截断会把实质内容截掉。
+压缩分三步：
+1. 清理：把 PDF 硬换行拼回段落，去掉页码、目录引导线、证券代码/公告编号抬头、
+   每页重复的页眉页脚、"虚假记载、误导性陈述或者重大遗漏"类声明和落款
+2. 打分：按财务关键词、带单位数字（金额、百分比、股数）、日期和交易对方名称的密度给段落打分，
+   开头几个实质段落（"重要内容提示"、导语）额外加分
+3. 装箱：按分数从高到低选段落装入 token 预算，按原文顺序输出，跳过的位置以省略号标记
+"""
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.services.keyword_matcher import KeywordMatcher
+
+FINANCE_KEYWORDS = [
+    "营业收入", "营收", "净利润", "归母", "扣非", "毛利率", "每股收益", "现金流", "同比", "环比",
+    "增长", "下降", "下滑", "预增", "预减", "扭亏", "亏损", "业绩", "超预期", "低于预期",
+    "合同", "订单", "中标", "签订", "框架协议", "战略合作",
+    "收购", "并购", "重组", "资产购买", "出售", "股权转让", "控制权", "要约",
+    "增发", "定增", "募集资金", "配股", "可转债", "发行", "上市",
+    "回购", "增持", "减持", "质押", "冻结", "解禁", "股权激励",
+    "分红", "派息", "送股", "转增",
+    "担保", "借款", "违约", "逾期", "诉讼", "仲裁", "处罚", "立案", "调查", "问询",
+    "停牌", "复牌", "退市", "风险警示", "破产",
+    "投资", "项目", "产能", "投产", "扩产", "研发", "专利", "获批", "注册", "临床",
+    "降息", "降准", "利率", "关税", "补贴", "政策",
+]
+
+# 带单位的数字：金额、比例、股数等，比裸数字（日期、代码、页码）信息量高
+_FIGURE_RE = re.compile(
+    r"[-+]?\d[\d,，]*(?:\.\d+)?\s*(?:%|％|个百分点|亿元|万元|千元|元|亿股|万股|股|亿|万|倍|吨|千瓦|兆瓦|MW|GW)"
+)
+_FIGURE_WEIGHT = 2.0
+
+# 日期和交易对方（公司、集团名称）：篇幅短、不含财务关键词的段落也可能只承载这类关键事实
+_DATE_RE = re.compile(r"\d{4}\s*年\s*\d{1,2}\s*月(?:\s*\d{1,2}\s*日)?")
+_PARTY_RE = re.compile(r"[\u4e00-\u9fff（）()]{2,30}?(?:有限责任公司|有限公司|集团)")
+_FACT_WEIGHT = 2.0
+
+# 开头实质段落的加分及覆盖段数
+_LEAD_BONUS = 1.0
+_LEAD_PARAGRAPHS = 3
+
+# 打分平滑：短段落的一两个命中不应压过信息密集的长段落
+_LENGTH_SMOOTHING = 40
+
+# 段落剩余预算不足时，只有剩余不少于该 token 数才截取部分句子
+_MIN_CLIP_TOKENS = 60
+
+_GAP_MARKER = "……"
+
+_PAGE_FURNITURE_PATTERNS = [
+    re.compile(r"^[-—\s]*\d{1,4}[-—\s]*$"),  # 页码
+    re.compile(r"^第\s*\d+\s*页(\s*[/，,]?\s*共\s*\d+\s*页)?$"),
+    re.compile(r"^\d+\s*/\s*\d+$"),
+    re.compile(r".*[.．…·]{4,}\s*\d+$"),  # 目录引导线
+    re.compile(r"^目\s*录$"),
+    re.compile(r"^(证券代码|股票代码|证券简称|股票简称|公告编号|债券代码|债券简称)\s*[:：].*"),
+    re.compile(r"^特此公告[。.]?$"),
+    re.compile(r"^.{0,40}董\s*事\s*会$"),
+    re.compile(r"^(二[〇○零0O]\s*\S{1,3}|20\d{2})\s*年\s*\S{1,3}\s*月\s*\S{1,3}\s*日$"),
+]
+
+_DISCLAIMER_TERMS = ("虚假记载", "误导性陈述", "重大遗漏", "法律责任", "连带责任")
+_RISK_NOTICE = "注意投资风险"
+
+_HEADING_RE = re.compile(
+    r"^(第[一二三四五六七八九十百\d]+[章节条部分]|[一二三四五六七八九十]+、|[（(][一二三四五六七八九十\d]+[）)]|\d+[、.．](?!\d)|重要内容提示)"
+)
+_HEADING_MAX_CHARS = 30
+_SENTENCE_END = "。！？；!?;"
+_PARAGRAPH_END = _SENTENCE_END + "：:」”）)"
+_SENTENCE_RE = re.compile(r"[^。！？；!?;]+[。！？；!?;]?")
+_CJK_RE = re.compile("[\u3000-\u303f\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+# 页眉页脚判定：短行在全文出现至少这么多次
+_REPEATED_LINE_MIN = 3
+_REPEATED_LINE_MAX_CHARS = 40
+
+FINANCE_MATCHER = KeywordMatcher((word, 1.0) for word in FINANCE_KEYWORDS)
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略 token 数：中日韩字符和全角标点各算 1，其余非空白字符每 4 个算 1"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    other = len(text) - cjk - sum(1 for ch in text if ch.isspace())
+    return cjk + (max(other, 0) + 3) // 4
+
+
+def _is_furniture(line: str) -> bool:
+    return any(pattern.match(line) for pattern in _PAGE_FURNITURE_PATTERNS)
+
+
+def _needs_space(left: str, right: str) -> bool:
+    # 中文折行和被折断的数字直接拼接，英文单词之间补空格
+    if not (left.isascii() and right.isascii()) or left.isspace() or right.isspace():
+        return False
+    return left.isalpha() or right.isalpha()
+
+
+def _is_boilerplate(paragraph: str) -> bool:
+    if sum(term in paragraph for term in _DISCLAIMER_TERMS) >= 2:
+        return True
+    return len(paragraph) < 60 and _RISK_NOTICE in paragraph
+
+
+def clean_content(text: str) -> List[str]:
+    """去掉页面元素和声明类套话，把 PDF 硬换行拼回段落"""
+    lines = [line.strip() for line in (text or "").splitlines()]
+    repeated = {
+        line
+        for line, count in Counter(line for line in lines if line).items()
+        if count >= _REPEATED_LINE_MIN and len(line) <= _REPEATED_LINE_MAX_CHARS
+    }
+
+    paragraphs: List[str] = []
+    current = ""
+    # 当前段落只有一行短标题时，下一行另起一行接在标题后，标题随首段一起打分和取舍
+    heading_only = False
+    for line in lines:
+        if not line or line in repeated or _is_furniture(line):
+            if not line and current:
+                paragraphs.append(current)
+                current = ""
+            continue
+        if current and not heading_only and (current[-1] in _PARAGRAPH_END or _HEADING_RE.match(line)):
+            paragraphs.append(current)
+            current = ""
+        if heading_only:
+            current += "\n"
+        elif current and _needs_space(current[-1], line[0]):
+            current += " "
+        heading_only = not current and bool(_HEADING_RE.match(line)) and len(line) <= _HEADING_MAX_CHARS
+        current += line
+    if current:
+        paragraphs.append(current)
+    return [paragraph for paragraph in paragraphs if not _is_boilerplate(paragraph)]
+
+
+def score_paragraph(paragraph: str) -> float:
+    """财务关键词、带单位数字、日期和交易对方的密度（每约 100 字的加权命中数）"""
+    hits = sum(FINANCE_MATCHER.counts(paragraph))
+    hits += _FIGURE_WEIGHT * len(_FIGURE_RE.findall(paragraph))
+    hits += _FACT_WEIGHT * (len(_DATE_RE.findall(paragraph)) + len(_PARTY_RE.findall(paragraph)))
+    return hits * 100.0 / (len(paragraph) + _LENGTH_SMOOTHING)
+
+
+def truncate_to_budget(text: str, token_budget: int) -> str:
+    """不超过预算的最长前缀（按字符二分）"""
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= token_budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+def _clip(paragraph: str, token_budget: int) -> str:
+    """按句截取不超过预算的前缀，第一句就放不下时按字符截断"""
+    clipped = ""
+    for sentence in _SENTENCE_RE.findall(paragraph):
+        if estimate_tokens(clipped + sentence) > token_budget:
+            break
+        clipped += sentence
+    return clipped or truncate_to_budget(paragraph, token_budget)
+
+
+def condense_content(text: str, token_budget: Optional[int] = None) -> str:
+    """
+    把正文压缩到 token 预算以内
+
+    Args:
+        token_budget: 预算，默认 settings.ai_content_token_budget；<= 0 时原样返回
+
+    Returns:
+        清理后的正文（放得下时保留全部段落），否则为按信息密度选出的段落，
+        保持原文顺序，跳过的位置以省略号标记
+    """
+    budget = settings.ai_content_token_budget if token_budget is None else token_budget
+    if budget <= 0 or not text:
+        return text or ""
+
+    paragraphs = clean_content(text)
+    costs = [estimate_tokens(paragraph) for paragraph in paragraphs]
+    if sum(costs) + len(paragraphs) <= budget:
+        return "\n".join(paragraphs)
+
+    scores = [score_paragraph(paragraph) for paragraph in paragraphs]
+    substantive = [index for index, score in enumerate(scores) if score > 0][:_LEAD_PARAGRAPHS]
+    for index in substantive:
+        scores[index] += _LEAD_BONUS
+
+    # 没有任何段落命中时退化为按原文顺序装箱
+    candidates = [index for index, score in enumerate(scores) if score > 0] or list(range(len(paragraphs)))
+    gap_cost = estimate_tokens(_GAP_MARKER) + 1
+    chosen: Dict[int, str] = {}
+    remaining = budget
+    for index in sorted(candidates, key=lambda i: (-scores[i], i)):
+        if remaining <= 0:
+            break
+        cost = costs[index] + 1 + gap_cost
+        if cost <= remaining:
+            chosen[index] = paragraphs[index]
+            remaining -= cost
+        elif remaining - gap_cost >= _MIN_CLIP_TOKENS:
+            clipped = _clip(paragraphs[index], remaining - gap_cost - 1)
+            if clipped:
+                chosen[index] = clipped
+                remaining -= estimate_tokens(clipped) + 1 + gap_cost
+
+    parts: List[str] = []
+    previous = -1
+    for index in sorted(chosen):
+        if index != previous + 1:
+            parts.append(_GAP_MARKER)
+        parts.append(chosen[index])
+        previous = index
+    if previous != len(paragraphs) - 1 and parts:
+        parts.append(_GAP_MARKER)
+    return "\n".join(parts)
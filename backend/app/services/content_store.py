@@ -0,0 +1,120 @@
+"""
+事件正文存储
+
+PDF 解析出的正文可达数百 KB，直接放在 events 中会拖累所有列表查询的工作集。
+超过 settings.content_inline_chars 的正文以 zlib 压缩后写入 event_contents 集合
+（_id 为事件 _id），events 中只保留摘要、原文长度和 content_ref 引用，
+详情接口和 AI 分析按需加载。
+"""
+import hashlib
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import Binary, ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+
+from app.config import settings
+from app.core.database import get_database
+
+CODEC = "zlib"
+
+
+def content_hash(text: str) -> str:
+    """正文内容哈希"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _compress(text: str) -> Binary:
+    return Binary(zlib.compress(text.encode("utf-8"), settings.content_compress_level))
+
+
+def _decompress(data: bytes, codec: str) -> str:
+    if codec != CODEC:
+        raise ValueError(f"Unknown content codec: {codec}")
+    return zlib.decompress(data).decode("utf-8")
+
+
+def split_content(event_dict: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    将长正文从事件文档中拆出
+
+    原地修改 event_dict：content 替换为摘要，写入 content_length 和 content_ref。
+    正文不超过内联阈值时不做处理。
+
+    Returns:
+        待写入 event_contents 的文档（缺少 _id，由调用方补充），无需拆分时返回 None
+    """
+    text = event_dict.get("content") or ""
+    event_dict["content_length"] = len(text)
+    if len(text) <= settings.content_inline_chars:
+        event_dict["content_ref"] = None
+        return None
+
+    digest = content_hash(text)
+    event_dict["content"] = text[: settings.event_snippet_chars]
+    event_dict["content_ref"] = {"hash": digest, "codec": CODEC}
+    return {
+        "hash": digest,
+        "codec": CODEC,
+        "length": len(text),
+        "data": _compress(text),
+        "created_at": datetime.utcnow(),
+    }
+
+
+class ContentStore:
+    """压缩正文存储"""
+
+    def _get_db(self) -> AsyncIOMotorDatabase:
+        """获取数据库实例（延迟加载）"""
+        return get_database()
+
+    async def save_many(self, docs: Dict[ObjectId, Dict[str, Any]]) -> None:
+        """写入或覆盖正文 {event _id: split_content 返回的文档}"""
+        if not docs:
+            return
+        operations = [
+            ReplaceOne({"_id": event_id}, {"_id": event_id, **doc}, upsert=True)
+            for event_id, doc in docs.items()
+        ]
+        await self._get_db().event_contents.bulk_write(operations, ordered=False)
+
+    async def delete_many(self, event_ids: Iterable[ObjectId]) -> None:
+        """删除正文"""
+        ids = list(event_ids)
+        if ids:
+            await self._get_db().event_contents.delete_many({"_id": {"$in": ids}})
+
+    async def reset(self) -> None:
+        """清空正文存储"""
+        await self._get_db().event_contents.delete_many({})
+
+    async def load_many(self, event_ids: Iterable[ObjectId]) -> Dict[ObjectId, str]:
+        """批量读取并解压正文（一次 $in 查询）"""
+        ids = list(event_ids)
+        if not ids:
+            return {}
+        contents: Dict[ObjectId, str] = {}
+        async for doc in self._get_db().event_contents.find({"_id": {"$in": ids}}):
+            contents[doc["_id"]] = _decompress(doc["data"], doc.get("codec", CODEC))
+        return contents
+
+    async def hydrate(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        为带 content_ref 的事件补全完整正文（原地修改）
+
+        事件需仍包含 _id（在 ObjectId 转字符串之前调用）
+        """
+        pending = [event for event in events if event.get("content_ref")]
+        contents = await self.load_many(event["_id"] for event in pending)
+        for event in pending:
+            text = contents.get(event["_id"])
+            if text is not None:
+                event["content"] = text
+        return events
+
+
+# 全局正文存储实例
+content_store = ContentStore()
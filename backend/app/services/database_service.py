@@ -1,17 +1,102 @@
+import base64
+import hashlib
+import json
+import re
+import time
+import unicodedata
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.config import settings
 from app.core.database import get_database
+from app.core.indexes import ensure_indexes
 from app.models import Event, EventCreate, EventUpdate, EventResponse
+from app.services.analysis_queue import analysis_queue
+from app.services.content_store import content_store, split_content
+from app.services.radar_scoring import (
+    MAX_FRESHNESS_BONUS,
+    RADAR_SCORE_VERSION,
+    compute_static_scores,
+    has_ai_scores,
+    mongo_rank_fields,
+)
+from app.services.rollup_service import rollup_service
+from app.services.search_service import (
+    SEARCH_FIELDS,
+    build_search_fields,
+    query_terms,
+    search_filter,
+    search_service,
+)
+from app.services.stats_service import stats_service
+
+
+class InvalidCursorError(ValueError):
+    """翻页游标格式错误"""
+
+
+# 检索字段体积较大，读取事件时默认排除
+EVENT_DEFAULT_PROJECTION = {field: 0 for field in SEARCH_FIELDS}
+
+# 事件视图：
+# - full: 完整文档（仅详情接口和 AI 分析使用），外置正文会被加载回 content
+# - summary: 列表卡片，content 截断为摘要，另附 content_length
+# - radar: 同 summary，另附持久化的静态评分 radar；既无 AI 分析也无静态评分的事件
+#   保留完整 content 供启发式打分
+EVENT_VIEWS = ("summary", "radar", "full")
+
+_SUMMARY_FIELDS = (
+    "title",
+    "event_category",
+    "event_types",
+    "announcement_date",
+    "expected_date",
+    "source",
+    "original_url",
+    "stock_code",
+    "bulletin_type",
+    "ai_analysis",
+    "created_at",
+    "updated_at",
+)
+
+# AI 分析失败时记录的重试标记字段
+_AI_FAILURE_FIELDS = ("ai_status", "ai_error", "ai_failed_at", "ai_attempts")
+
+# 去重键的组成字段
+_DEDUPE_FIELDS = {"title", "announcement_date", "stock_code"}
+
+# 影响雷达静态评分的事件字段
+_RADAR_INPUT_FIELDS = {"title", "content", "event_category", "event_types", "source", "ai_analysis"}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def make_dedupe_key(title: str, date: datetime, stock_code: Optional[str] = None) -> str:
+    """
+    生成事件去重键
+
+    由规范化标题（NFKC、去空白、小写）、公告日期（按天）和股票代码哈希得到
+    """
+    normalized = _WHITESPACE_RE.sub("", unicodedata.normalize("NFKC", title or "")).lower()
+    raw = f"{normalized}|{date.strftime('%Y-%m-%d')}|{(stock_code or '').strip()}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
 
 class DatabaseService:
     """数据库服务"""
 
+    # 总数统计策略
+    COUNT_MODES = ("exact", "estimated", "capped", "cached", "none")
+
     def __init__(self):
         """初始化数据库服务"""
-        pass
+        # 事件总数缓存: {规范化查询: (过期时间戳, 总数)}
+        self._count_cache: Dict[str, tuple[float, int]] = {}
 
     def _get_db(self) -> AsyncIOMotorDatabase:
         """获取数据库实例（延迟加载）"""
@@ -23,25 +108,86 @@ class DatabaseService:
             data["id"] = str(data.pop("_id"))
         return data
 
-    async def create_indexes(self):
-        """创建索引"""
-        # 事件集合索引
-        await self._get_db().events.create_index("announcement_date")
-        await self._get_db().events.create_index("event_category")
-        await self._get_db().events.create_index("event_types")
-        await self._get_db().events.create_index("ai_analysis.affected_sectors.code")
-        await self._get_db().events.create_index("ai_analysis.affected_stocks.code")
-        await self._get_db().events.create_index([("announcement_date", -1)])
+    def _event_projection(self, view: str, root: str = "") -> Dict[str, Any]:
+        """
+        根据视图生成事件查询的 projection
+
+        Args:
+            root: 事件文档所在的字段路径前缀，如 change stream 中的 "fullDocument."
+        """
+        if view not in EVENT_VIEWS:
+            raise ValueError(f"Unknown event view: {view}")
+        if view == "full":
+            return {f"{root}{field}": 0 for field in SEARCH_FIELDS}
+
+        content = {"$ifNull": [f"${root}content", ""]}
+        snippet = {"$substrCP": [content, 0, settings.event_snippet_chars]}
+        projection: Dict[str, Any] = {f"{root}{field}": 1 for field in _SUMMARY_FIELDS}
+        if root:
+            # 只有顶层 _id 会被包含式 projection 自动保留
+            projection[f"{root}_id"] = 1
+        # 外置正文的事件 content 只是摘要，原文长度以写入时记录的 content_length 为准
+        projection[f"{root}content_length"] = {"$ifNull": [f"${root}content_length", {"$strLenCP": content}]}
+        if view == "summary":
+            projection[f"{root}content"] = snippet
+        else:
+            scored = {
+                "$or": [
+                    {"$eq": [f"${root}radar.version", RADAR_SCORE_VERSION]},
+                    {
+                        "$and": [
+                            {"$ne": [{"$ifNull": [f"${root}ai_analysis.impact_score", None]}, None]},
+                            {"$ne": [{"$ifNull": [f"${root}ai_analysis.sentiment_score", None]}, None]},
+                        ]
+                    },
+                ]
+            }
+            projection[f"{root}radar"] = 1
+            projection[f"{root}content"] = {"$cond": [scored, snippet, content]}
+            # 仅需要现算启发式评分的事件才加载外置正文
+            projection[f"{root}content_ref"] = {"$cond": [scored, "$$REMOVE", f"${root}content_ref"]}
+        return projection
+
+    def change_stream_projection(self, view: str = "radar") -> Dict[str, Any]:
+        """
+        change stream 的 $project 阶段：fullDocument 只保留视图字段
+
+        检索字段（search_tf、search_terms）和长正文不随变更事件传输；
+        变更事件的 _id 即恢复令牌，由 projection 自动保留
+        """
+        return {"$project": self._event_projection(view, root="fullDocument.")}
+
+    async def _finalize_events(self, events: List[Dict[str, Any]], view: str) -> List[Dict[str, Any]]:
+        """按视图加载外置正文，并将 ObjectId 转换为字符串"""
+        if view != "summary":
+            await content_store.hydrate(events)
+        return [self._convert_objectid_to_str(event) for event in events]
 
-        # 板块集合索引
-        await self._get_db().sectors.create_index("code", unique=True)
-        await self._get_db().sectors.create_index("name")
+    def encode_event_cursor(self, event: Dict[str, Any]) -> str:
+        """
+        根据事件生成翻页游标
 
-        # 股票集合索引
-        await self._get_db().stocks.create_index("code", unique=True)
-        await self._get_db().stocks.create_index("name")
+        游标是 (announcement_date, _id) 的 base64 编码，对客户端不透明
+        """
+        payload = {
+            "d": event["announcement_date"].isoformat(),
+            "i": str(event.get("id") or event.get("_id")),
+        }
+        raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
 
-        print("Database indexes created successfully")
+    def decode_event_cursor(self, cursor: str) -> tuple[datetime, ObjectId]:
+        """解析翻页游标，格式错误时抛出 InvalidCursorError"""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            return datetime.fromisoformat(payload["d"]), ObjectId(payload["i"])
+        except (ValueError, KeyError, TypeError, InvalidId) as e:
+            raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+    async def create_indexes(self):
+        """创建索引（幂等，定义见 app.core.indexes）"""
+        await ensure_indexes(self._get_db())
 
     # ===== 事件相关操作 =====
 
@@ -50,14 +196,29 @@ class DatabaseService:
         event_dict = event_data.model_dump()
         event_dict["created_at"] = datetime.utcnow()
         event_dict["updated_at"] = datetime.utcnow()
+        event_dict["dedupe_key"] = make_dedupe_key(
+            event_dict["title"], event_dict["announcement_date"], event_dict.get("stock_code")
+        )
+        search_fields = build_search_fields(event_dict["title"], event_dict["content"])
+        event_dict.update(search_fields)
+        event_dict["radar"] = compute_static_scores(event_dict)
+        content_doc = split_content(event_dict)
 
         result = await self._get_db().events.insert_one(event_dict)
+        if content_doc:
+            await content_store.save_many({result.inserted_id: content_doc})
+        await search_service.register([search_fields])
+        await stats_service.record([event_dict])
+        await rollup_service.record([event_dict])
+        await analysis_queue.record([event_dict])
         return str(result.inserted_id)
 
     async def create_events_bulk(self, events_data: List[EventCreate]) -> int:
         """
         批量创建事件
 
+        无序写入，依赖 dedupe_key 唯一索引跳过重复事件
+
         Args:
             events_data: 事件数据列表
 
@@ -69,29 +230,51 @@ class DatabaseService:
 
         now = datetime.utcnow()
         events_dict = []
+        content_docs = {}
         for event_data in events_data:
             event_dict = event_data.model_dump()
+            # 预先分配 _id，外置正文以事件 _id 为键
+            event_dict["_id"] = ObjectId()
             event_dict["created_at"] = now
             event_dict["updated_at"] = now
+            event_dict["dedupe_key"] = make_dedupe_key(
+                event_dict["title"], event_dict["announcement_date"], event_dict.get("stock_code")
+            )
+            event_dict.update(build_search_fields(event_dict["title"], event_dict["content"]))
+            event_dict["radar"] = compute_static_scores(event_dict)
+            content_doc = split_content(event_dict)
+            if content_doc:
+                content_docs[event_dict["_id"]] = content_doc
             events_dict.append(event_dict)
 
         try:
             result = await self._get_db().events.insert_many(events_dict, ordered=False)
-            return len(result.inserted_ids)
-        except Exception as e:
-            # 如果遇到重复键错误，部分数据可能已插入
-            # 返回已插入的数量
-            if "bulk write error" in str(e).lower():
-                return len(events_dict) - 1  # 估算，实际可能需要更精确的处理
+            inserted = events_dict
+        except BulkWriteError as e:
+            # 部分文档写入失败（如重复键），其余文档已插入
+            failed = {err["index"] for err in e.details.get("writeErrors", [])}
+            inserted = [doc for i, doc in enumerate(events_dict) if i not in failed]
+        except Exception:
             return 0
 
+        await content_store.save_many(
+            {doc["_id"]: content_docs[doc["_id"]] for doc in inserted if doc["_id"] in content_docs}
+        )
+        await search_service.register(
+            [{field: doc[field] for field in SEARCH_FIELDS} for doc in inserted]
+        )
+        await stats_service.record(inserted)
+        await rollup_service.record(inserted)
+        await analysis_queue.record(inserted)
+        return len(inserted)
+
     async def get_event_by_id(self, event_id: str) -> Optional[Dict[str, Any]]:
         """根据 ID 获取事件"""
         try:
             obj_id = ObjectId(event_id)
-            event = await self._get_db().events.find_one({"_id": obj_id})
+            event = await self._get_db().events.find_one({"_id": obj_id}, EVENT_DEFAULT_PROJECTION)
             if event:
-                return self._convert_objectid_to_str(event)
+                return (await self._finalize_events([event], "full"))[0]
             return None
         except Exception:
             return None
@@ -112,12 +295,29 @@ class DatabaseService:
         if stock_code:
             query["stock_code"] = stock_code
             
-        event = await self._get_db().events.find_one(query)
+        event = await self._get_db().events.find_one(query, self._event_projection("summary"))
         
         if event:
             return self._convert_objectid_to_str(event)
         return None
 
+    async def get_existing_dedupe_keys(self, keys: List[str]) -> set[str]:
+        """
+        批量查询已存在的去重键（一次 $in 查询）
+
+        Args:
+            keys: 去重键列表
+
+        Returns:
+            数据库中已存在的去重键集合
+        """
+        if not keys:
+            return set()
+        cursor = self._get_db().events.find(
+            {"dedupe_key": {"$in": list(set(keys))}}, {"_id": 0, "dedupe_key": 1}
+        )
+        return {doc["dedupe_key"] async for doc in cursor}
+
     async def get_events(
         self,
         skip: int = 0,
@@ -129,11 +329,25 @@ class DatabaseService:
         end_date: Optional[datetime] = None,
         min_impact: Optional[float] = None,
         max_impact: Optional[float] = None,
-    ) -> tuple[List[Dict[str, Any]], int]:
+        cursor: Optional[str] = None,
+        count_mode: str = "exact",
+        view: str = "summary",
+    ) -> tuple[List[Dict[str, Any]], Optional[int]]:
         """
         获取事件列表
         返回 (事件列表, 总数)
+
+        传入 cursor 时使用游标翻页（忽略 skip），从游标位置之后继续读取，
+        深翻页的代价与第一页相同。下一页游标可由 encode_event_cursor 生成。
+
+        传入 search 时按 BM25 相关度排序（与其它过滤条件叠加），此时忽略 cursor。
+
+        count_mode 控制总数的计算方式，见 count_events；为 "none" 时总数为 None。
+
+        view 控制返回字段，见 EVENT_VIEWS；需要完整正文时传入 "full"。
         """
+        projection = self._event_projection(view)
+
         # 构建查询条件
         query = {}
 
@@ -160,33 +374,102 @@ class DatabaseService:
                  impact_query["$lt"] = max_impact
              query["ai_analysis.impact_score"] = impact_query
 
-        if search:
-            query["$or"] = [
-                {"title": {"$regex": search, "$options": "i"}},
-                {"content": {"$regex": search, "$options": "i"}},
-            ]
+        terms = query_terms(search) if search else []
+        if terms:
+            query.update(search_filter(terms))
+        elif search:
+            # 无可检索词项（如纯符号），退化为标题匹配
+            query["title"] = {"$regex": re.escape(search), "$options": "i"}
 
         # 获取总数
-        total = await self._get_db().events.count_documents(query)
+        total = await self.count_events(query, mode=count_mode)
 
         # 获取数据
-        cursor = (
-            self._get_db().events.find(query)
-            .sort("announcement_date", -1)
+        if terms:
+            ranked = await search_service.rank(query, terms, skip=skip, limit=limit)
+            ids = [item[0] for item in ranked]
+            docs = {}
+            async for event in self._get_db().events.find(
+                {"_id": {"$in": ids}}, projection
+            ):
+                docs[event["_id"]] = event
+            events = []
+            scores = []
+            for event_id, score in ranked:
+                if event_id in docs:
+                    events.append(docs[event_id])
+                    scores.append(score)
+            events = await self._finalize_events(events, view)
+            for event, score in zip(events, scores):
+                event["search_score"] = round(score, 4)
+            return events, total
+
+        if cursor:
+            last_date, last_id = self.decode_event_cursor(cursor)
+            query.setdefault("$and", []).append({
+                "$or": [
+                    {"announcement_date": {"$lt": last_date}},
+                    {"announcement_date": last_date, "_id": {"$lt": last_id}},
+                ]
+            })
+            skip = 0
+
+        db_cursor = (
+            self._get_db().events.find(query, projection)
+            .sort([("announcement_date", -1), ("_id", -1)])
             .skip(skip)
             .limit(limit)
         )
 
-        events = []
-        async for event in cursor:
-            events.append(self._convert_objectid_to_str(event))
+        events = [event async for event in db_cursor]
+        return await self._finalize_events(events, view), total
+
+    async def count_events(self, query: Dict[str, Any], mode: str = "exact") -> Optional[int]:
+        """
+        按指定策略统计事件总数
 
-        return events, total
+        - exact: count_documents 精确计数
+        - estimated: 无过滤条件时使用集合元数据 estimated_document_count，否则退化为 exact
+        - capped: 最多数到 settings.event_count_cap，达到上限表示 "N+"
+        - cached: 按规范化查询缓存精确计数，缓存 settings.event_count_cache_ttl 秒
+        - none: 不计数，返回 None
+        """
+        if mode not in self.COUNT_MODES:
+            raise ValueError(f"Unknown count mode: {mode}")
+
+        events = self._get_db().events
+        if mode == "none":
+            return None
+        if mode == "estimated" and not query:
+            return await events.estimated_document_count()
+        if mode == "capped":
+            return await events.count_documents(query, limit=settings.event_count_cap)
+        if mode == "cached":
+            key = json.dumps(query, sort_keys=True, default=str)
+            now = time.monotonic()
+            cached = self._count_cache.get(key)
+            if cached and cached[0] > now:
+                return cached[1]
+            total = await events.count_documents(query)
+            if len(self._count_cache) >= settings.event_count_cache_size:
+                # 淘汰已过期项，仍然满则清空
+                self._count_cache = {k: v for k, v in self._count_cache.items() if v[0] > now}
+                if len(self._count_cache) >= settings.event_count_cache_size:
+                    self._count_cache.clear()
+            self._count_cache[key] = (now + settings.event_count_cache_ttl, total)
+            return total
+        return await events.count_documents(query)
 
     async def update_event(
-        self, event_id: str, event_data: EventUpdate
+        self, event_id: str, event_data: EventUpdate, view: str = "full"
     ) -> Optional[Dict[str, Any]]:
-        """更新事件"""
+        """
+        更新事件
+
+        Args:
+            view: 返回事件的视图；只关心是否写入成功的调用方（如分析 worker）传 summary，
+                不加载外置正文
+        """
         try:
             obj_id = ObjectId(event_id)
             update_dict = {
@@ -194,19 +477,141 @@ class DatabaseService:
             }
             update_dict["updated_at"] = datetime.utcnow()
 
-            await self._get_db().events.update_one({"_id": obj_id}, {"$set": update_dict})
-
-            return await self.get_event_by_id(event_id)
+            old_fields = None
+            existing = None
+            if {
+                "title", "content", "announcement_date", "event_category", "event_types",
+                "source", "ai_analysis",
+            } & update_dict.keys():
+                existing = await self._get_db().events.find_one(
+                    {"_id": obj_id},
+                    {
+                        "title": 1,
+                        "content": 1,
+                        "announcement_date": 1,
+                        "event_category": 1,
+                        "event_types": 1,
+                        "source": 1,
+                        "stock_code": 1,
+                        "ai_analysis": 1,
+                        "radar": 1,
+                        "content_ref": 1,
+                        "search_terms": 1,
+                        "search_len": 1,
+                    },
+                )
+                if existing:
+                    rescore = bool(_RADAR_INPUT_FIELDS & update_dict.keys())
+                    merged = {**existing, **update_dict}
+                    if "content" not in update_dict and (
+                        "title" in update_dict or (rescore and not has_ai_scores(merged))
+                    ):
+                        # 只有重建检索字段或启发式评分时才需要完整正文；写入 AI 评分不加载外置正文
+                        await content_store.hydrate([existing])
+                        merged = {**existing, **update_dict}
+                    if _DEDUPE_FIELDS & update_dict.keys():
+                        # 仅标题、日期或股票代码变化时重算去重键；
+                        # 历史重复事件（backfill_dedupe_keys.py 有意不写键）重新分析时不会撞上唯一索引
+                        update_dict["dedupe_key"] = make_dedupe_key(
+                            merged.get("title", ""), merged["announcement_date"], merged.get("stock_code")
+                        )
+                    if "title" in update_dict or "content" in update_dict:
+                        # 标题或内容变化时重建检索字段
+                        old_fields = existing
+                        update_dict.update(build_search_fields(
+                            merged.get("title", ""), merged.get("content", "")
+                        ))
+                    if rescore:
+                        # 重新分析或评分相关字段变化时重算静态评分
+                        update_dict["radar"] = compute_static_scores(merged)
+
+            content_doc = split_content(update_dict) if "content" in update_dict else None
+            update_ops: Dict[str, Any] = {"$set": update_dict}
+            if "ai_analysis" in update_dict:
+                # 分析成功后清除失败重试标记
+                update_ops["$unset"] = {field: "" for field in _AI_FAILURE_FIELDS}
+            updated = await self._get_db().events.find_one_and_update(
+                {"_id": obj_id},
+                update_ops,
+                projection=self._event_projection(view),
+                return_document=ReturnDocument.AFTER,
+            )
+            if updated is None:
+                return None
+            if content_doc:
+                await content_store.save_many({obj_id: content_doc})
+            elif "content" in update_dict:
+                # 新正文足够短，已内联存储
+                await content_store.delete_many([obj_id])
+
+            if old_fields is not None:
+                await search_service.register([old_fields], sign=-1)
+                await search_service.register([update_dict])
+            if existing:
+                # 类别或公告日变化时移动统计桶，重新分析时更新时间序列汇总
+                await stats_service.move(existing, {**existing, **update_dict})
+                await rollup_service.move(existing, {**existing, **update_dict})
+
+            # 外置正文已写入，按视图加载后返回（不再单独读取一次事件）
+            return (await self._finalize_events([updated], view))[0]
+        except DuplicateKeyError:
+            print(
+                f"Error updating event {event_id}: title/announcement_date/stock_code "
+                "would duplicate another event (dedupe_key unique index)"
+            )
+            return None
         except Exception as e:
             print(f"Error updating event: {str(e)}")
             return None
 
+    async def mark_analysis_failed(self, event_id: str, error: str, retryable: bool = True) -> bool:
+        """
+        记录 AI 分析失败（不写入零分结果）
+
+        ai_status 为 retry 的事件仍没有 ai_analysis，下次批量分析会重试；
+        failed 表示请求被服务商直接拒绝，只在 --force 时重试
+        """
+        try:
+            result = await self._get_db().events.update_one(
+                {"_id": ObjectId(event_id)},
+                {
+                    "$set": {
+                        "ai_status": "retry" if retryable else "failed",
+                        "ai_error": error[:500],
+                        "ai_failed_at": datetime.utcnow(),
+                    },
+                    "$inc": {"ai_attempts": 1},
+                },
+            )
+            return result.matched_count > 0
+        except Exception as e:
+            print(f"Error marking analysis failure: {str(e)}")
+            return False
+
     async def delete_event(self, event_id: str) -> bool:
         """删除事件"""
         try:
             obj_id = ObjectId(event_id)
-            result = await self._get_db().events.delete_one({"_id": obj_id})
-            return result.deleted_count > 0
+            deleted = await self._get_db().events.find_one_and_delete(
+                {"_id": obj_id},
+                projection={
+                    "search_terms": 1,
+                    "search_len": 1,
+                    "event_category": 1,
+                    "event_types": 1,
+                    "announcement_date": 1,
+                    "stock_code": 1,
+                    "ai_analysis": 1,
+                    "radar": 1,
+                },
+            )
+            if deleted is None:
+                return False
+            await content_store.delete_many([obj_id])
+            await search_service.register([deleted], sign=-1)
+            await stats_service.record([deleted], sign=-1)
+            await rollup_service.record([deleted], sign=-1)
+            return True
         except Exception:
             return False
 
@@ -214,40 +619,198 @@ class DatabaseService:
         """删除所有事件"""
         try:
             result = await self._get_db().events.delete_many({})
+            await content_store.reset()
+            await search_service.reset()
+            await stats_service.reset()
+            await rollup_service.reset()
             return result.deleted_count
         except Exception as e:
             print(f"Error deleting all events: {str(e)}")
             return 0
 
-    async def get_events_by_sector(self, sector_code: str, limit: int = 50) -> List[Dict[str, Any]]:
+    async def get_events_by_sector(
+        self, sector_code: str, limit: int = 50, view: str = "summary"
+    ) -> List[Dict[str, Any]]:
         """获取影响指定板块的事件"""
         query = {"ai_analysis.affected_sectors.code": sector_code}
         cursor = (
-            self._get_db().events.find(query)
+            self._get_db().events.find(query, self._event_projection(view))
             .sort("announcement_date", -1)
             .limit(limit)
         )
 
-        events = []
-        async for event in cursor:
-            events.append(self._convert_objectid_to_str(event))
+        events = [event async for event in cursor]
+        return await self._finalize_events(events, view)
 
-        return events
-
-    async def get_events_by_stock(self, stock_code: str, limit: int = 50) -> List[Dict[str, Any]]:
+    async def get_events_by_stock(
+        self, stock_code: str, limit: int = 50, view: str = "summary"
+    ) -> List[Dict[str, Any]]:
         """获取影响指定股票的事件"""
         query = {"ai_analysis.affected_stocks.code": stock_code}
         cursor = (
-            self._get_db().events.find(query)
+            self._get_db().events.find(query, self._event_projection(view))
             .sort("announcement_date", -1)
             .limit(limit)
         )
 
-        events = []
-        async for event in cursor:
-            events.append(self._convert_objectid_to_str(event))
+        events = [event async for event in cursor]
+        return await self._finalize_events(events, view)
+
+    async def get_events_updated_since(
+        self,
+        since: datetime,
+        after_id: Optional[str] = None,
+        limit: int = 500,
+        view: str = "radar",
+    ) -> List[Dict[str, Any]]:
+        """
+        按 (updated_at, _id) 升序读取 since 之后写入或更新的事件（雷达推送轮询）
+
+        after_id 为上一批最后一条事件的 id，与 since 一起构成游标，
+        批量写入时大量事件的 updated_at 相同也能逐批读完
+        """
+        if after_id:
+            query = {
+                "$or": [
+                    {"updated_at": {"$gt": since}},
+                    {"updated_at": since, "_id": {"$gt": ObjectId(after_id)}},
+                ]
+            }
+        else:
+            query = {"updated_at": {"$gt": since}}
+        cursor = (
+            self._get_db().events.find(query, self._event_projection(view))
+            .sort([("updated_at", 1), ("_id", 1)])
+            .limit(limit)
+        )
+        events = [event async for event in cursor]
+        return await self._finalize_events(events, view)
+
+    async def rank_radar_window(
+        self,
+        start_date: datetime,
+        now: datetime,
+        limit: int,
+    ) -> Dict[str, Any]:
+        """
+        在一次聚合管道中按雷达评分排名时间窗口内的事件
+
+        相关度（含 freshness 项）在服务端计算，三种排名共用一次窗口扫描，各返回前 limit 名
+        （摘要视图附 radar 字段）。没有静态评分的历史事件不参与排名，
+        需先运行 scripts/backfill_radar_scores.py
+
+        排名：
+            relevance 按相关度排序；opportunity / risk 先按方向筛选，
+            再按 abs(情绪分)、相关度排序
+
+        Returns:
+            {"items": {排名: 事件列表}, "totals": {排名: 满足条件的事件总数}}
+        """
+        opportunity = {"$gte": ["$_sentiment", 20]}
+        risk = {"$lte": ["$_sentiment", -20]}
+        projection = self._event_projection("summary")
+        projection["radar"] = 1
+        pipeline = [
+            {"$match": {"radar.version": RADAR_SCORE_VERSION, "announcement_date": {"$gte": start_date}}},
+            {"$addFields": mongo_rank_fields(now)},
+            {
+                "$facet": {
+                    "relevance": [
+                        {"$sort": {"_relevance": -1, "_id": -1}},
+                        {"$limit": limit},
+                        {"$project": projection},
+                    ],
+                    "opportunity": [
+                        {"$match": {"$expr": opportunity}},
+                        {"$sort": {"_strength": -1, "_relevance": -1, "_id": -1}},
+                        {"$limit": limit},
+                        {"$project": projection},
+                    ],
+                    "risk": [
+                        {"$match": {"$expr": risk}},
+                        {"$sort": {"_strength": -1, "_relevance": -1, "_id": -1}},
+                        {"$limit": limit},
+                        {"$project": projection},
+                    ],
+                    "totals": [
+                        {
+                            "$group": {
+                                "_id": None,
+                                "relevance": {"$sum": 1},
+                                "opportunity": {"$sum": {"$cond": [opportunity, 1, 0]}},
+                                "risk": {"$sum": {"$cond": [risk, 1, 0]}},
+                            }
+                        }
+                    ],
+                }
+            },
+        ]
+        result = await self._get_db().events.aggregate(pipeline).to_list(1)
+        facet = result[0] if result else {}
+        totals = (facet.get("totals") or [{}])[0]
+        items: Dict[str, List[Dict[str, Any]]] = {}
+        for rank_by in ("relevance", "opportunity", "risk"):
+            items[rank_by] = await self._finalize_events(facet.get(rank_by) or [], "summary")
+        return {
+            "items": items,
+            "totals": {rank_by: totals.get(rank_by, 0) for rank_by in items},
+        }
+
+    async def count_radar_events(self, start_date: datetime, now: datetime, min_relevance: float) -> int:
+        """时间窗口内相关度（两位小数）不低于 min_relevance 的已评分事件数"""
+        pipeline = [
+            {
+                "$match": {
+                    "radar.version": RADAR_SCORE_VERSION,
+                    # 相关度至多比 relevance_base 高 MAX_FRESHNESS_BONUS（0.01 为舍入余量），先用索引排除
+                    "radar.relevance_base": {"$gte": min_relevance - MAX_FRESHNESS_BONUS - 0.01},
+                    "announcement_date": {"$gte": start_date},
+                }
+            },
+            {"$addFields": mongo_rank_fields(now)},
+            {"$match": {"_relevance": {"$gte": min_relevance}}},
+            {"$count": "n"},
+        ]
+        result = await self._get_db().events.aggregate(pipeline).to_list(1)
+        return result[0]["n"] if result else 0
+
+    # ===== 板块/股票批量写入 =====
+
+    async def bulk_upsert_entities(self, collection: str, entities: Dict[str, Dict[str, Any]]) -> int:
+        """
+        按代码批量 upsert 板块或股票（单次 bulk_write）
+
+        Args:
+            collection: 集合名称（sectors 或 stocks）
+            entities: {code: 需要 $set 的字段}
+
+        Returns:
+            新插入或被修改的文档数
+        """
+        if not entities:
+            return 0
 
-        return events
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"code": code},
+                {
+                    "$set": {**fields, "code": code, "updated_at": now},
+                    "$setOnInsert": {"created_at": now},
+                },
+                upsert=True,
+            )
+            for code, fields in entities.items()
+        ]
+        result = await self._get_db()[collection].bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    async def get_entity_names(self, collection: str, codes: List[str]) -> Dict[str, str]:
+        """按代码批量读取板块或股票名称，返回 {code: name}"""
+        if not codes:
+            return {}
+        cursor = self._get_db()[collection].find({"code": {"$in": codes}}, {"code": 1, "name": 1})
+        return {doc["code"]: doc.get("name") async for doc in cursor}
 
     # ===== 板块相关操作 =====
 
@@ -328,35 +891,58 @@ class DatabaseService:
     # ===== 统计相关操作 =====
 
     async def get_dashboard_stats(self) -> Dict[str, Any]:
-        """获取仪表板统计数据"""
-        total_events = await self._get_db().events.count_documents({})
-        total_sectors = await self._get_db().sectors.count_documents({})
-        total_stocks = await self._get_db().stocks.count_documents({})
-
-        # 获取最近 7 天的事件数量
-        from datetime import timedelta
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        recent_events = await self._get_db().events.count_documents({
-            "announcement_date": {"$gte": seven_days_ago}
-        })
-
-        # 按类别统计事件
-        pipeline = [
-            {"$group": {"_id": "$event_category", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}},
-        ]
-        category_stats = []
-        async for doc in self._get_db().events.aggregate(pipeline):
-            category_stats.append({"category": doc["_id"], "count": doc["count"]})
+        """
+        获取仪表板统计数据
+
+        事件计数读取物化的 stats 文档（O(1)），板块/股票总数使用集合元数据估算
+        """
+        stats = await stats_service.get_event_stats()
+        total_sectors = await self._get_db().sectors.estimated_document_count()
+        total_stocks = await self._get_db().stocks.estimated_document_count()
 
         return {
-            "total_events": total_events,
+            "total_events": stats.get("total_events", 0),
             "total_sectors": total_sectors,
             "total_stocks": total_stocks,
-            "recent_events_7days": recent_events,
-            "category_stats": category_stats,
+            "recent_events_7days": stats_service.recent_count(stats, days=7, now=datetime.utcnow()),
+            "category_stats": stats_service.category_stats(stats),
         }
 
 
+class EntityBatch:
+    """
+    批量实体写入器
+
+    收集一批 AI 分析结果中的板块和股票，按代码在内存中去重，
+    flush 时每个集合只发起一次 bulk_write。
+    """
+
+    def __init__(self, service: DatabaseService):
+        self._service = service
+        self.sectors: Dict[str, Dict[str, Any]] = {}
+        self.stocks: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.sectors) + len(self.stocks)
+
+    def add_analysis(self, ai_analysis) -> None:
+        """登记一条 AIAnalysis 中的受影响板块和股票"""
+        if not ai_analysis:
+            return
+        for sector in ai_analysis.affected_sectors or []:
+            self.sectors[sector.code or f"SECTOR_{sector.name}"] = {"name": sector.name}
+        for stock in ai_analysis.affected_stocks or []:
+            self.stocks[stock.code or f"STOCK_{stock.name}"] = {"name": stock.name}
+
+    async def flush(self) -> int:
+        """写入已收集的实体并清空缓冲区，返回写入的文档数"""
+        # 先交换缓冲区，flush 期间新登记的实体留给下一次
+        sectors, self.sectors = self.sectors, {}
+        stocks, self.stocks = self.stocks, {}
+        written = await self._service.bulk_upsert_entities("sectors", sectors)
+        written += await self._service.bulk_upsert_entities("stocks", stocks)
+        return written
+
+
 # 全局数据库服务实例
 db_service = DatabaseService()
@@ -0,0 +1,145 @@
+"""
+多模式关键词匹配（Aho–Corasick）
+
+词条在构建时编译为确定性自动机，匹配时对文本只扫描一遍，
+耗时与文本长度成正比，与词条数量基本无关。
+计数语义与逐词 str.count 一致：同一词条的多次出现互不重叠，不同词条之间可以重叠。
+
+自动机逐字符推进是 Python 层循环，词条很少时逐词 str.count（C 实现）反而更快，
+因此词条数低于 AUTOMATON_MIN_TERMS 时仍逐词计数，两种方式结果完全相同。
+"""
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+# 启用自动机扫描的最小词条数（见 scripts/benchmark_keyword_matcher.py）
+AUTOMATON_MIN_TERMS = 256
+
+
+class KeywordMatcher:
+    """带权重的多模式关键词匹配器（大小写不敏感）"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, float]]):
+        """
+        Args:
+            patterns: (词条, 权重) 列表；同一词条可出现多次，各自独立计数
+        """
+        self.terms: List[str] = []
+        self.weights: List[float] = []
+        for term, weight in patterns:
+            term = term.lower()
+            if term:
+                self.terms.append(term)
+                self.weights.append(float(weight))
+
+        # goto[state] 为完整转移表（已合并失败转移），output[state] 为在该状态结束的词条编号
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[Tuple[int, ...]] = [()]
+        self._build()
+
+        alphabet = sorted({ch for term in self.terms for ch in term})
+        # 词条字符以外的字符必然把自动机带回初始状态，只需扫描由词条字符组成的片段
+        self._segment_re = (
+            re.compile("[" + "".join(re.escape(ch) for ch in alphabet) + "]+") if alphabet else None
+        )
+
+    def _build(self) -> None:
+        trie: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for index, term in enumerate(self.terms):
+            state = 0
+            for ch in term:
+                if ch not in trie[state]:
+                    trie.append({})
+                    outputs.append([])
+                    trie[state][ch] = len(trie) - 1
+                state = trie[state][ch]
+            outputs[state].append(index)
+
+        # 按 BFS 顺序计算失败指针，并把失败状态的转移和输出合并进来
+        fail = [0] * len(trie)
+        goto: List[Dict[str, int]] = [dict(trie[0])]
+        goto.extend({} for _ in range(len(trie) - 1))
+        queue = deque(trie[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state].extend(outputs[fail[state]])
+            goto[state] = {**goto[fail[state]], **trie[state]}
+            for ch, child in trie[state].items():
+                fail[child] = goto[fail[state]].get(ch, 0) if state else 0
+                queue.append(child)
+
+        self._goto = goto
+        self._output = [tuple(sorted(out)) for out in outputs]
+
+    def counts(self, text: str) -> List[int]:
+        """每个词条在文本中的出现次数（下标与 self.terms 对应）"""
+        if len(self.terms) < AUTOMATON_MIN_TERMS:
+            lowered = text.lower()
+            return [lowered.count(term) for term in self.terms]
+        return self.scan(text)
+
+    def scan(self, text: str) -> List[int]:
+        """用自动机单遍扫描计数（结果同 counts）"""
+        counts = [0] * len(self.terms)
+        if self._segment_re is None or not text:
+            return counts
+        lengths = [len(term) for term in self.terms]
+        # next_start[i]: 词条 i 下一次出现允许的最小起始位置（保证同一词条不重叠）
+        next_start = [0] * len(self.terms)
+        goto = self._goto
+        output = self._output
+        for segment in self._segment_re.finditer(text.lower()):
+            state = 0
+            pos = segment.start()
+            for ch in segment.group():
+                pos += 1
+                state = goto[state].get(ch, 0)
+                if output[state]:
+                    for index in output[state]:
+                        if pos - lengths[index] >= next_start[index]:
+                            counts[index] += 1
+                            next_start[index] = pos
+        return counts
+
+    def weighted_counts(self, text: str) -> Tuple[float, float]:
+        """
+        正向与负向加权出现次数
+
+        Returns:
+            (正权重词条的加权次数, 负权重词条的加权次数绝对值)
+        """
+        pos = 0.0
+        neg = 0.0
+        for count, weight in zip(self.counts(text), self.weights):
+            if count:
+                if weight > 0:
+                    pos += count * weight
+                else:
+                    neg -= count * weight
+        return pos, neg
+
+
+def load_lexicon(path: str) -> List[Tuple[str, float]]:
+    """
+    读取词典文件，返回 (词条, 权重) 列表
+
+    文件为 UTF-8 文本，每行一个词条，可在末尾用空白分隔权重（默认 1）；
+    正权重为利好词，负权重为利空词，# 开头的行为注释
+    """
+    patterns: List[Tuple[str, float]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.rsplit(None, 1)
+            weight = 1.0
+            if len(parts) == 2:
+                try:
+                    weight = float(parts[1])
+                    line = parts[0]
+                except ValueError:
+                    pass
+            patterns.append((line, weight))
+    return patterns
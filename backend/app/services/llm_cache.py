@@ -0,0 +1,127 @@
+"""
+LLM 分析结果缓存
+
+以 (模型, 提示词版本, 完整提示词) 的哈希为键，缓存模型返回并解析后的 JSON：
+进程内 LRU 在前，MongoDB llm_cache 集合持久化在后，
+重复分析同一文本（--force 重跑、批量重扫、重复公告、崩溃后重跑）不再调用模型。
+持久化缓存按写入时间淘汰：超过 settings.llm_cache_max_age_days 的条目和超出
+settings.llm_cache_max_entries 的最旧条目在写入时定期清理。
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.config import settings
+from app.core.database import get_database
+from app.services.content_store import content_hash
+
+# 每写入多少条检查一次持久化缓存的淘汰
+_PRUNE_EVERY = 100
+
+
+def cache_key(model: str, prompt_version: int, prompt: str) -> str:
+    return content_hash(f"{model}\n{prompt_version}\n{prompt}")
+
+
+class LLMCache:
+    """两级 LLM 结果缓存"""
+
+    def __init__(self, memory_entries: int = 2048):
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._writes_since_prune = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _get_db(self) -> AsyncIOMotorDatabase:
+        """获取数据库实例（延迟加载）"""
+        return get_database()
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _cutoff(self) -> Optional[datetime]:
+        if settings.llm_cache_max_age_days <= 0:
+            return None
+        return datetime.utcnow() - timedelta(days=settings.llm_cache_max_age_days)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存，未命中返回 None"""
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return value
+
+        query: Dict[str, Any] = {"_id": key}
+        cutoff = self._cutoff()
+        if cutoff:
+            query["created_at"] = {"$gte": cutoff}
+        doc = await self._get_db().llm_cache.find_one(query, {"result": 1})
+        if doc is None:
+            self.misses += 1
+            return None
+        self.db_hits += 1
+        self._remember(key, doc["result"])
+        return doc["result"]
+
+    async def set(self, key: str, value: Dict[str, Any], model: str) -> None:
+        """写入缓存"""
+        self._remember(key, value)
+        await self._get_db().llm_cache.replace_one(
+            {"_id": key},
+            {"_id": key, "model": model, "result": value, "created_at": datetime.utcnow()},
+            upsert=True,
+        )
+        self.writes += 1
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= _PRUNE_EVERY:
+            self._writes_since_prune = 0
+            await self.prune()
+
+    async def prune(self) -> int:
+        """按写入时间淘汰过期和超量的持久化条目，返回删除数"""
+        collection = self._get_db().llm_cache
+        deleted = 0
+        cutoff = self._cutoff()
+        if cutoff:
+            result = await collection.delete_many({"created_at": {"$lt": cutoff}})
+            deleted += result.deleted_count
+
+        max_entries = settings.llm_cache_max_entries
+        if max_entries > 0:
+            excess = await collection.estimated_document_count() - max_entries
+            if excess > 0:
+                # 找到第 excess 旧的写入时间，删除不晚于它的条目
+                oldest = await collection.find({}, {"created_at": 1}).sort("created_at", 1).skip(
+                    excess - 1
+                ).limit(1).to_list(1)
+                if oldest:
+                    result = await collection.delete_many(
+                        {"created_at": {"$lte": oldest[0]["created_at"]}}
+                    )
+                    deleted += result.deleted_count
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计（当前进程）"""
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+# 全局 LLM 缓存实例
+llm_cache = LLMCache(settings.llm_cache_memory_entries)
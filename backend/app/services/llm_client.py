@@ -0,0 +1,116 @@
+"""
+智谱 chat-completions 异步客户端
+
+直接调用 HTTP 接口，所有请求共享一个 httpx.AsyncClient 连接池（keep-alive），
+并发分析不再占用线程池线程；请求可以被 asyncio 取消，超时可按请求覆盖。
+base_url 可指向本地模拟服务（scripts/mock_llm_server.py）用于测试和压测。
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+
+
+class LLMRequestError(Exception):
+    """模型接口返回错误状态码或无法解析的响应"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class ZhipuChatClient:
+    """智谱 chat-completions 异步客户端"""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        max_connections: Optional[int] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = (base_url or settings.ai_base_url).rstrip("/")
+        self.timeout = httpx.Timeout(
+            timeout or settings.ai_timeout,
+            connect=connect_timeout or settings.ai_connect_timeout,
+        )
+        self.max_connections = max_connections or settings.ai_max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """延迟创建连接池（需要在事件循环中创建）"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "x-source-channel": "python-sdk",
+                },
+            )
+        return self._client
+
+    async def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        timeout: Optional[float] = None,
+        **params: Any,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        调用 chat/completions，返回 (第一条回复的文本, usage)
+
+        Args:
+            timeout: 覆盖本次请求的读取超时（秒）
+            params: 透传给接口的其它参数（temperature、max_tokens、thinking 等）
+
+        Raises:
+            LLMRequestError: 非 2xx 状态码或响应格式不符
+            httpx.TimeoutException / httpx.TransportError: 超时或连接失败
+        """
+        response = await self._get_client().post(
+            "/chat/completions",
+            json={"model": model, "messages": messages, **params},
+            timeout=self.timeout if timeout is None else httpx.Timeout(
+                timeout, connect=self.timeout.connect
+            ),
+        )
+        if response.status_code >= 400:
+            retry_after = response.headers.get("retry-after")
+            raise LLMRequestError(
+                f"LLM request failed with status {response.status_code}: {response.text[:200]}",
+                status_code=response.status_code,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        try:
+            body = response.json()
+            content = body["choices"][0]["message"]["content"].strip()
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as exc:
+            raise LLMRequestError(f"Unexpected LLM response: {exc}", status_code=response.status_code)
+        usage = body.get("usage")
+        return content, usage if isinstance(usage, dict) else {}
+
+    async def chat(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        timeout: Optional[float] = None,
+        **params: Any,
+    ) -> str:
+        """调用 chat/completions，只返回回复文本（参数与异常同 complete）"""
+        content, _ = await self.complete(messages, model, timeout=timeout, **params)
+        return content
+
+    async def aclose(self) -> None:
+        """关闭连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
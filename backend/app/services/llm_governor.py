@@ -0,0 +1,236 @@
+"""
+LLM 调用调度器
+
+API、入库分析和批量分析共用一个调度器，使整个进程按服务商的实际上限调用模型：
+- 令牌桶：每分钟请求数（settings.llm_rpm_limit）和 token 数（settings.llm_tpm_limit）
+- AIMD 并发窗口：请求成功且延迟低于目标时加性增大，遇到 429、超时或延迟超标时乘性减小
+- 重试：429、5xx、超时和连接错误按抖动指数退避重试，优先遵循 Retry-After
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+from app.services.llm_client import LLMRequestError
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """限流、服务端错误、超时和连接错误可以重试"""
+    if isinstance(exc, LLMRequestError):
+        return exc.status_code == 429 or (exc.status_code or 0) >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def _is_congestion(exc: BaseException) -> bool:
+    """服务端过载信号：限流或超时"""
+    if isinstance(exc, LLMRequestError):
+        return exc.status_code == 429
+    return isinstance(exc, httpx.TimeoutException)
+
+
+class TokenBucket:
+    """按每分钟速率补充的令牌桶，per_minute <= 0 表示不限速"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """取出 amount 个令牌，不足时等待；等待者按到达顺序排队"""
+        if self.capacity <= 0:
+            return
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """退还（正数）或补扣（负数）令牌，用实际用量修正预估"""
+        if self.capacity <= 0:
+            return
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LLMGovernor:
+    """限速、自适应并发和重试"""
+
+    def __init__(
+        self,
+        rpm_limit: int = 0,
+        tpm_limit: int = 0,
+        min_concurrency: int = 1,
+        max_concurrency: int = 32,
+        initial_concurrency: int = 8,
+        latency_target: float = 20.0,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+    ):
+        self.requests = TokenBucket(rpm_limit)
+        self.tokens = TokenBucket(tpm_limit)
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self.latency_target = latency_target
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._latency_ewma: Optional[float] = None
+        self._last_decrease = 0.0
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    async def _acquire_slot(self) -> None:
+        while self._in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self._in_flight += 1
+
+    def _settle(self, latency: Optional[float], congested: bool, refund: float) -> None:
+        """
+        归还并发槽位、按结果调整窗口并结算 token
+
+        同步执行（不等待锁），请求被取消时在 finally 中调用也一定能完成
+        """
+        self._in_flight -= 1
+        if congested:
+            self._decrease()
+        elif latency is not None:
+            self._latency_ewma = (
+                latency if self._latency_ewma is None else 0.8 * self._latency_ewma + 0.2 * latency
+            )
+            if self.latency_target > 0 and latency > self.latency_target:
+                self._decrease()
+            else:
+                # 加性增大：每完成约 limit 个请求窗口加 1
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+        if refund:
+            self.tokens.adjust(refund)
+        # 唤醒全部等待者，各自重新检查窗口
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _decrease(self) -> None:
+        # 同一批在途请求同时失败只算一次拥塞：两次减小至少间隔一个平均延迟
+        now = time.monotonic()
+        if now - self._last_decrease < (self._latency_ewma or 1.0):
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_concurrency), self.limit / 2)
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after:
+            return min(float(retry_after), self.backoff_max)
+        # full jitter，避免同一时刻失败的请求同时重试
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def call(
+        self,
+        request: Callable[[], Awaitable[Tuple[Any, Optional[int]]]],
+        estimated_tokens: int = 0,
+    ) -> Any:
+        """
+        在限速和并发窗口内执行一次模型请求，可重试错误按退避重试
+
+        Args:
+            request: 无参协程函数，返回 (结果, 实际消耗 token 数或 None)
+            estimated_tokens: 预估 token 数（提示词 + 最大输出），用于每分钟 token 限速
+
+        Raises:
+            最后一次尝试的异常（不可重试的错误立即抛出）
+        """
+        self.calls += 1
+        for attempt in range(self.max_retries + 1):
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimated_tokens)
+            try:
+                await self._acquire_slot()
+            except BaseException:
+                # 排队等待槽位时被取消
+                self.tokens.adjust(estimated_tokens)
+                raise
+            start = time.monotonic()
+            # 无论成功、失败还是被取消都要归还并发槽位、结算 token，否则窗口会永久缩小
+            latency: Optional[float] = None
+            congested = False
+            # 被拒绝、失败或取消的请求不计入 token 用量
+            refund = float(estimated_tokens)
+            try:
+                result, used_tokens = await request()
+                latency = time.monotonic() - start
+                refund = estimated_tokens - used_tokens if used_tokens is not None else 0.0
+            except Exception as exc:
+                congested = _is_congestion(exc)
+                if isinstance(exc, LLMRequestError) and exc.status_code == 429:
+                    self.throttled += 1
+                elif isinstance(exc, httpx.TimeoutException):
+                    self.timeouts += 1
+                if not is_retryable(exc) or attempt >= self.max_retries:
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                backoff = self._backoff(attempt, exc)
+            else:
+                return result
+            finally:
+                self._settle(latency, congested, refund)
+
+            await asyncio.sleep(backoff)
+
+    def stats(self) -> Dict[str, Any]:
+        """调度统计（当前进程）"""
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self._in_flight,
+            "latency_ewma": round(self._latency_ewma, 3) if self._latency_ewma is not None else None,
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+        }
+
+
+# 全局 LLM 调度器实例
+llm_governor = LLMGovernor(
+    rpm_limit=settings.llm_rpm_limit,
+    tpm_limit=settings.llm_tpm_limit,
+    min_concurrency=settings.llm_min_concurrency,
+    max_concurrency=settings.llm_max_concurrency,
+    initial_concurrency=settings.llm_initial_concurrency,
+    latency_target=settings.llm_latency_target,
+    max_retries=settings.llm_max_retries,
+    backoff_base=settings.llm_backoff_base,
+    backoff_max=settings.llm_backoff_max,
+)
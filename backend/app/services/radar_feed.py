@@ -0,0 +1,212 @@
+"""
+机会雷达推送
+
+每个 API 进程运行一个后台任务监听事件写入：MongoDB 为副本集时使用 change stream，
+否则每 settings.radar_stream_poll_interval 秒按 updated_at 轮询一次
+（爬虫和分析脚本在独立进程中写库，进程内回调覆盖不到）。
+新写入或重新评分的事件只打分一次，再分发给所有订阅连接，
+各连接在本地按方向、板块、最小相关度过滤，不再各自轮询数据库。
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.config import settings
+from app.core.database import get_database
+from app.services.content_store import content_store
+from app.services.database_service import db_service
+from app.services.radar_snapshot import score_events
+from app.services.rollup_service import rollup_service
+
+OVERVIEW_FIELDS = (
+    "sample_size",
+    "market_index",
+    "avg_confidence",
+    "opportunity_count",
+    "risk_count",
+    "neutral_count",
+)
+
+# 单批处理的最大事件数
+BATCH_SIZE = 500
+
+# MongoDB 非副本集部署不支持 change stream 时的错误码
+_CHANGE_STREAM_UNSUPPORTED = 40573
+
+
+class RadarSubscription:
+    """一个推送连接的过滤条件与消息队列"""
+
+    def __init__(
+        self,
+        direction: Optional[str] = None,
+        sector: Optional[str] = None,
+        min_relevance: float = 0.0,
+        window_hours: int = 72,
+    ):
+        self.direction = direction
+        self.sector = sector
+        self.min_relevance = min_relevance
+        self.window_hours = window_hours
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.radar_stream_queue_size)
+        # 本连接最近一次收到的概览，增量相对它计算
+        self.last_overview: Optional[Dict[str, Any]] = None
+
+    def matches(self, card: Dict[str, Any], now: datetime) -> bool:
+        if self.direction and card["direction"] != self.direction:
+            return False
+        if self.sector and self.sector not in card["affected_sector_codes"]:
+            return False
+        date = card.get("announcement_date")
+        if isinstance(date, datetime) and date < now - timedelta(hours=self.window_hours):
+            return False
+        return card["relevance_score"] >= self.min_relevance
+
+    def put(self, event: str, data: Dict[str, Any]) -> None:
+        """放入一条消息，队列已满时丢弃最旧的消息，慢连接不会阻塞分发"""
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait((event, data))
+
+    def overview(self, summary: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """窗口概览及相对本连接上一次概览的增量（首次为 None）"""
+        previous = self.last_overview
+        self.last_overview = summary
+        delta = (
+            {field: round(summary[field] - previous[field], 2) for field in OVERVIEW_FIELDS}
+            if previous
+            else None
+        )
+        return {"window_hours": self.window_hours, **summary, "delta": delta, "updated_at": now}
+
+
+class RadarFeedService:
+    """机会雷达推送服务"""
+
+    def __init__(self):
+        self._subscriptions: Set[RadarSubscription] = set()
+
+    def subscribe(self, **filters: Any) -> RadarSubscription:
+        subscription = RadarSubscription(**filters)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: RadarSubscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    async def _window_summary(self, window_hours: int, now: datetime) -> Dict[str, Any]:
+        """窗口概览（同 /overview）"""
+        summary = await rollup_service.get_radar_window(now - timedelta(hours=window_hours))
+        summary["market_index"] = round(summary["market_index"], 2)
+        summary["avg_confidence"] = round(summary["avg_confidence"], 2)
+        return summary
+
+    async def overview(self, subscription: RadarSubscription, now: datetime) -> Dict[str, Any]:
+        """连接建立时的首个概览，作为该连接后续增量的基准，不影响其他连接"""
+        return subscription.overview(await self._window_summary(subscription.window_hours, now), now)
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        """为一批新写入或更新的事件打分并分发卡片，随后推送各订阅窗口的概览"""
+        if not events or not self._subscriptions:
+            return
+        now = datetime.utcnow()
+        cards, _ = score_events(events, now)
+        subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            for card in cards:
+                if subscription.matches(card, now):
+                    subscription.put("signal", card)
+
+        # 每个窗口只汇总一次，增量按各连接自己上一次收到的概览计算
+        for window_hours in {subscription.window_hours for subscription in subscriptions}:
+            summary = await self._window_summary(window_hours, now)
+            for subscription in subscriptions:
+                if subscription.window_hours == window_hours:
+                    subscription.put("overview", subscription.overview(summary, now))
+
+    async def run(self) -> None:
+        """后台任务：优先使用 change stream，部署不支持时退回轮询"""
+        try:
+            await self._watch()
+        except OperationFailure as e:
+            print(f"Radar feed: change stream unavailable, polling instead ({e})")
+            await self._poll()
+
+    async def _watch(self) -> None:
+        pipeline = [
+            {
+                "$match": {
+                    "$or": [
+                        {"operationType": {"$in": ["insert", "replace"]}},
+                        # 重新分析或评分相关字段变化时会重写 radar
+                        {"updateDescription.updatedFields.radar": {"$exists": True}},
+                    ]
+                }
+            },
+            # 只传输打分和卡片需要的字段（同 radar 视图），不带检索字段和长正文
+            db_service.change_stream_projection("radar"),
+        ]
+        resume_token = None
+        while True:
+            try:
+                async with get_database().events.watch(
+                    pipeline, full_document="updateLookup", resume_after=resume_token
+                ) as stream:
+                    while True:
+                        changes = [await stream.next()]
+                        while len(changes) < BATCH_SIZE:
+                            change = await stream.try_next()
+                            if change is None:
+                                break
+                            changes.append(change)
+                        resume_token = stream.resume_token
+
+                        events = []
+                        for change in changes:
+                            event = change.get("fullDocument")
+                            if event:
+                                events.append(event)
+                        # 单批处理失败只丢弃这一批推送，保留 resume_token 继续监听（同 _poll）
+                        try:
+                            # 无评分的事件需要完整正文做启发式打分（projection 只为这类事件保留 content_ref）
+                            await content_store.hydrate(events)
+                            for event in events:
+                                event["id"] = str(event.pop("_id"))
+                            await self.publish(events)
+                        except Exception as e:
+                            print(f"Radar feed: publish failed, skipping {len(events)} events: {e}")
+            except OperationFailure as e:
+                if e.code == _CHANGE_STREAM_UNSUPPORTED:
+                    raise
+                print(f"Radar feed: change stream error, reconnecting: {e}")
+                await asyncio.sleep(settings.radar_stream_poll_interval)
+            except PyMongoError as e:
+                print(f"Radar feed: change stream error, reconnecting: {e}")
+                await asyncio.sleep(settings.radar_stream_poll_interval)
+
+    async def _poll(self) -> None:
+        # 轮询游标 (updated_at, _id)；写入方时钟不一致时可能漏掉游标之前落库的更新
+        since = datetime.utcnow()
+        after_id: Optional[str] = None
+        while True:
+            await asyncio.sleep(settings.radar_stream_poll_interval)
+            try:
+                while True:
+                    events = await db_service.get_events_updated_since(
+                        since, after_id=after_id, limit=BATCH_SIZE
+                    )
+                    if not events:
+                        break
+                    since = events[-1]["updated_at"]
+                    after_id = events[-1]["id"]
+                    await self.publish(events)
+                    if len(events) < BATCH_SIZE:
+                        break
+            except Exception as e:
+                print(f"Radar feed: poll failed: {e}")
+
+
+# 全局雷达推送服务实例
+radar_feed_service = RadarFeedService()
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, NamedTuple, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.services.keyword_matcher import KeywordMatcher, load_lexicon
 
 
 SOURCE_CONFIDENCE_MAP = {
@@ -68,15 +73,33 @@ def _hours_since_now(dt: Any, now: datetime) -> float:
     return max(0.0, (now - dt).total_seconds() / 3600.0)
 
 
-def _freshness_score(dt: Any, now: datetime) -> float:
-    # 72h 线性衰减，越新分越高
+def analysis_method(ai: Dict[str, Any]) -> str:
+    """AI 分析结果的来源：规则判定的例行公告为 rule，其余（含未标记来源的旧结果）为 llm"""
+    return "rule" if ai.get("method") == "rule" else "llm"
+
+
+# freshness 线性衰减到 0 的时长（小时）；rollup_service 的热度聚合使用同一常数
+FRESHNESS_HOURS = 72.0
+
+
+def freshness_score(dt: Any, now: datetime) -> float:
+    """新鲜度（0~100）：FRESHNESS_HOURS 内线性衰减，越新分越高"""
     hours = _hours_since_now(dt, now)
-    if hours >= 72:
+    if hours >= FRESHNESS_HOURS:
         return 0.0
-    return 100.0 - (hours / 72.0) * 100.0
+    return 100.0 - (hours / FRESHNESS_HOURS) * 100.0
+
 
+def _content_length(event: Dict[str, Any]) -> int:
+    # 摘要视图中 content 已截断，优先使用数据库计算的原文长度
+    length = event.get("content_length")
+    if isinstance(length, int):
+        return length
+    return len(str(event.get("content") or ""))
 
-def _source_confidence(source: Any) -> float:
+
+def source_confidence(source: Any) -> float:
+    """来源可信度（0~1），按 SOURCE_CONFIDENCE_MAP 的关键词匹配，未知来源为 default"""
     if not source:
         return SOURCE_CONFIDENCE_MAP["default"]
     s = str(source).strip().lower()
@@ -88,10 +111,20 @@ def _source_confidence(source: Any) -> float:
     return SOURCE_CONFIDENCE_MAP["default"]
 
 
+def _sentiment_patterns() -> List[tuple]:
+    # 内置词权重为 ±1，另可通过 SENTIMENT_LEXICON_PATH 追加带权重的词典
+    patterns = [(word, 1.0) for word in POSITIVE_KEYWORDS]
+    patterns += [(word, -1.0) for word in NEGATIVE_KEYWORDS]
+    if settings.sentiment_lexicon_path:
+        patterns += load_lexicon(settings.sentiment_lexicon_path)
+    return patterns
+
+
+SENTIMENT_MATCHER = KeywordMatcher(_sentiment_patterns())
+
+
 def _keyword_sentiment(text: str) -> float:
-    t = text.lower()
-    pos = sum(t.count(word.lower()) for word in POSITIVE_KEYWORDS)
-    neg = sum(t.count(word.lower()) for word in NEGATIVE_KEYWORDS)
+    pos, neg = SENTIMENT_MATCHER.weighted_counts(text)
     if pos == 0 and neg == 0:
         return 0.0
     return _clamp((pos - neg) / (pos + neg + 1.0), -1.0, 1.0)
@@ -108,7 +141,7 @@ def _heuristic_sentiment(event: Dict[str, Any]) -> float:
 def _heuristic_impact(event: Dict[str, Any]) -> float:
     category = event.get("event_category") or "company"
     base = CATEGORY_IMPACT_BASE.get(category, 0.5)
-    text_len = len(str(event.get("content") or ""))
+    text_len = _content_length(event)
     len_boost = min(text_len / 2000.0, 1.0) * 0.15
     type_count = len(event.get("event_types") or [])
     type_boost = min(type_count, 3) * 0.05
@@ -116,45 +149,87 @@ def _heuristic_impact(event: Dict[str, Any]) -> float:
 
 
 def _heuristic_confidence(event: Dict[str, Any]) -> float:
-    source_score = _source_confidence(event.get("source"))
-    text_len = len(str(event.get("content") or ""))
+    source_score = source_confidence(event.get("source"))
+    text_len = _content_length(event)
     length_factor = min(text_len / 1200.0, 1.0) * 0.15
     return _clamp(source_score * 0.85 + length_factor, 0.0, 1.0)
 
 
-def compute_event_scores(event: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+# 静态评分版本，公式或启发式规则变化时递增，旧版本的持久化结果会被忽略
+RADAR_SCORE_VERSION = 1
+
+# freshness(0~100) * 0.10 对相关度的最大贡献
+MAX_FRESHNESS_BONUS = 10.0
+
+
+def has_ai_scores(event: Dict[str, Any]) -> bool:
+    """事件带有可用的 AI 评分（否则静态评分走启发式，需要完整正文）"""
+    ai = event.get("ai_analysis") or {}
+    return ai.get("impact_score") is not None and ai.get("sentiment_score") is not None
+
+
+def compute_static_scores(event: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Core formula:
-    - impact_score: LLM impact (0~1) or heuristic estimate
-    - sentiment_score: LLM sentiment (-1~1) or keyword-based estimate
-    - confidence_score: LLM confidence (0~1) or source+text estimate
-    - freshness_score: time decay in 72h (0~100)
-    - relevance_score:
-      impact*0.45 + abs(sentiment)*0.30 + confidence*0.15 + freshness*0.10
+    与 now 无关的评分部分，写入事件文档的 radar 字段
+
+    relevance_base = impact*0.45 + abs(sentiment)*0.30 + confidence*0.15，
+    查询时只需再加 freshness*0.10（最多 10 分）
     """
     ai = event.get("ai_analysis") or {}
-    has_ai = ai and ai.get("impact_score") is not None and ai.get("sentiment_score") is not None
 
-    if has_ai:
+    if has_ai_scores(event):
         impact_raw = _clamp(_safe_float(ai.get("impact_score")), 0.0, 1.0)
         sentiment_raw = _clamp(_safe_float(ai.get("sentiment_score")), -1.0, 1.0)
         confidence_raw = _clamp(_safe_float(ai.get("confidence_score"), 0.5), 0.0, 1.0)
-        method = "llm"
+        method = analysis_method(ai)
     else:
         impact_raw = _heuristic_impact(event)
         sentiment_raw = _heuristic_sentiment(event)
         confidence_raw = _heuristic_confidence(event)
         method = "heuristic"
 
-    freshness = _freshness_score(event.get("announcement_date"), now)
+    return {
+        "version": RADAR_SCORE_VERSION,
+        "method": method,
+        "impact_raw": impact_raw,
+        "sentiment_raw": sentiment_raw,
+        "confidence_raw": confidence_raw,
+        "relevance_base": impact_raw * 100.0 * 0.45
+        + abs(sentiment_raw * 100.0) * 0.30
+        + confidence_raw * 100.0 * 0.15,
+    }
+
+
+def static_scores(event: Dict[str, Any]) -> Dict[str, Any]:
+    """优先使用事件上持久化的静态评分，缺失或版本过期时现算"""
+    stored = event.get("radar")
+    if stored and stored.get("version") == RADAR_SCORE_VERSION:
+        return stored
+    return compute_static_scores(event)
+
+
+def compute_event_scores(event: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """
+    Core formula:
+    - impact_score: LLM impact (0~1) or heuristic estimate
+    - sentiment_score: LLM sentiment (-1~1) or keyword-based estimate
+    - confidence_score: LLM confidence (0~1) or source+text estimate
+    - freshness_score: time decay in 72h (0~100)
+    - relevance_score:
+      impact*0.45 + abs(sentiment)*0.30 + confidence*0.15 + freshness*0.10
+    """
+    static = static_scores(event)
+    impact_raw = static["impact_raw"]
+    sentiment_raw = static["sentiment_raw"]
+    confidence_raw = static["confidence_raw"]
+    method = static["method"]
+
+    freshness = freshness_score(event.get("announcement_date"), now)
     impact = impact_raw * 100.0
     sentiment = sentiment_raw * 100.0
     confidence = confidence_raw * 100.0
-    relevance = _clamp(
-        impact * 0.45 + abs(sentiment) * 0.30 + confidence * 0.15 + freshness * 0.10,
-        0.0,
-        100.0,
-    )
+    # relevance_base 与本式前三项的计算顺序一致，结果逐位相同
+    relevance = _clamp(static["relevance_base"] + freshness * 0.10, 0.0, 100.0)
 
     if sentiment >= 20:
         direction = "opportunity"
@@ -188,3 +263,261 @@ def compute_market_index(cards: List[Dict[str, Any]]) -> float:
         card["sentiment_score"] * (0.5 + card["confidence_score"] / 200.0) for card in cards
     ]
     return _clamp(sum(weighted) / len(weighted), -100.0, 100.0)
+
+
+# ===== 批量打分 =====
+# 与 compute_event_scores 逐项等价：按列组织输入，用 NumPy 一次算完整批事件。
+# 只有关键词情绪需要逐条扫描文本，且只对既无 AI 分析、也无持久化静态评分的事件计算。
+
+DIRECTIONS = np.array(["neutral", "opportunity", "risk"], dtype=object)
+
+
+class EventColumns(NamedTuple):
+    """批量打分的列式输入（长度均为事件数）"""
+
+    scored: np.ndarray  # bool，已有原始分（AI 分析或持久化的静态评分）
+    method: np.ndarray  # object，计算方式 llm / rule / heuristic
+    impact: np.ndarray  # 原始影响分（0~1，未截断，仅 scored 有效）
+    sentiment: np.ndarray  # 原始情绪分（-1~1，未截断，仅 scored 有效）
+    confidence: np.ndarray  # 原始置信度（AI 缺失为 0.5，仅 scored 有效）
+    hours: np.ndarray  # 距 now 的小时数（无日期为 9999）
+    category_base: np.ndarray  # 类别基础影响分
+    content_length: np.ndarray  # 原文长度
+    type_count: np.ndarray  # 事件类型数量
+    source_confidence: np.ndarray  # 来源可信度
+    keyword_sentiment: np.ndarray  # 启发式情绪（仅未 scored 的事件有效）
+
+
+# 无原始分的事件在 _raw_scores 中的占位（启发式分数在列上另算）
+_HEURISTIC_ROW = (False, "heuristic", 0.0, 0.0, 0.5)
+
+
+def _raw_scores(event: Dict[str, Any]) -> tuple:
+    """(scored, method, impact, sentiment, confidence)：持久化静态评分优先，其次 AI 分析"""
+    stored = event.get("radar")
+    if stored and stored.get("version") == RADAR_SCORE_VERSION:
+        # 持久化的原始分已截断，np.clip 不改变其值
+        return True, stored["method"], stored["impact_raw"], stored["sentiment_raw"], stored["confidence_raw"]
+    ai = event.get("ai_analysis")
+    if ai and ai.get("impact_score") is not None and ai.get("sentiment_score") is not None:
+        return (
+            True,
+            analysis_method(ai),
+            _safe_float(ai.get("impact_score")),
+            _safe_float(ai.get("sentiment_score")),
+            _safe_float(ai.get("confidence_score"), 0.5),
+        )
+    return _HEURISTIC_ROW
+
+
+def build_event_columns(events: Sequence[Dict[str, Any]], now: datetime) -> EventColumns:
+    """
+    把事件字典列表转换为列式输入
+
+    每个事件只做一次字段读取（_raw_scores），各列由元组一次性转换为数组，
+    不逐元素写 NumPy 数组；启发式字段只对无原始分的事件提取
+    """
+    n = len(events)
+    hours = np.full(n, 9999.0)
+    category_base = np.zeros(n)
+    content_length = np.zeros(n)
+    type_count = np.zeros(n)
+    source_confidences = np.zeros(n)
+    keyword_sentiment = np.zeros(n)
+    if n == 0:
+        empty = np.zeros(0)
+        return EventColumns(
+            np.zeros(0, dtype=bool), np.zeros(0, dtype=object), empty, empty, empty, hours,
+            category_base, content_length, type_count, source_confidences, keyword_sentiment,
+        )
+
+    # 公告时间按微秒整数差计算，与 timedelta.total_seconds 结果一致
+    dates = [event.get("announcement_date") for event in events]
+    dated = [i for i, date in enumerate(dates) if isinstance(date, datetime)]
+    if dated:
+        stamps = np.array([dates[i] for i in dated], dtype="datetime64[us]")
+        delta_us = (np.datetime64(now, "us") - stamps).astype(np.int64)
+        hours[dated] = np.maximum(0.0, delta_us / 1e6 / 3600.0)
+
+    scored, method, impact, sentiment, confidence = zip(*map(_raw_scores, events))
+    scored = np.array(scored, dtype=bool)
+
+    heuristic = np.flatnonzero(~scored)
+    if len(heuristic):
+        rows = [events[i] for i in heuristic]
+        category_base[heuristic] = [
+            CATEGORY_IMPACT_BASE.get(event.get("event_category") or "company", 0.5) for event in rows
+        ]
+        content_length[heuristic] = [_content_length(event) for event in rows]
+        type_count[heuristic] = [len(event.get("event_types") or []) for event in rows]
+        source_confidences[heuristic] = [source_confidence(event.get("source")) for event in rows]
+        keyword_sentiment[heuristic] = [_heuristic_sentiment(event) for event in rows]
+
+    return EventColumns(
+        scored,
+        np.array(method, dtype=object),
+        np.array(impact, dtype=float),
+        np.array(sentiment, dtype=float),
+        np.array(confidence, dtype=float),
+        hours, category_base, content_length, type_count, source_confidences, keyword_sentiment,
+    )
+
+
+def _round(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    与内置 round 逐元素一致的舍入
+
+    np.round 先乘 10^n 再取整，恰好落在 .5 附近时可能与 round 的十进制舍入不同，
+    这些元素退回内置 round
+    """
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    out = np.rint(scaled) / scale
+    near_half = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) < 1e-6
+    if near_half.any():
+        out[near_half] = [round(v, ndigits) for v in values[near_half].tolist()]
+    return out
+
+
+def compute_scores_batch(cols: EventColumns) -> Dict[str, np.ndarray]:
+    """
+    批量计算评分（公式同 compute_event_scores）
+
+    Returns:
+        列式结果: impact_score / sentiment_score / confidence_score / freshness_score /
+        relevance_score（已按两位小数舍入）, direction, *_raw（四位小数）, method
+    """
+    heuristic_impact = np.clip(
+        cols.category_base
+        + np.minimum(cols.content_length / 2000.0, 1.0) * 0.15
+        + np.minimum(cols.type_count, 3) * 0.05,
+        0.0,
+        1.0,
+    )
+    heuristic_confidence = np.clip(
+        cols.source_confidence * 0.85 + np.minimum(cols.content_length / 1200.0, 1.0) * 0.15,
+        0.0,
+        1.0,
+    )
+    impact_raw = np.where(cols.scored, np.clip(cols.impact, 0.0, 1.0), heuristic_impact)
+    sentiment_raw = np.where(cols.scored, np.clip(cols.sentiment, -1.0, 1.0), cols.keyword_sentiment)
+    confidence_raw = np.where(cols.scored, np.clip(cols.confidence, 0.0, 1.0), heuristic_confidence)
+
+    freshness = np.where(cols.hours >= FRESHNESS_HOURS, 0.0, 100.0 - (cols.hours / FRESHNESS_HOURS) * 100.0)
+    impact = impact_raw * 100.0
+    sentiment = sentiment_raw * 100.0
+    confidence = confidence_raw * 100.0
+    relevance = np.clip(
+        impact * 0.45 + np.abs(sentiment) * 0.30 + confidence * 0.15 + freshness * 0.10,
+        0.0,
+        100.0,
+    )
+    direction = DIRECTIONS[np.where(sentiment >= 20, 1, np.where(sentiment <= -20, 2, 0))]
+
+    return {
+        "impact_score": _round(impact, 2),
+        "sentiment_score": _round(sentiment, 2),
+        "confidence_score": _round(confidence, 2),
+        "freshness_score": _round(freshness, 2),
+        "relevance_score": _round(relevance, 2),
+        "direction": direction,
+        "impact_raw": _round(impact_raw, 4),
+        "sentiment_raw": _round(sentiment_raw, 4),
+        "confidence_raw": _round(confidence_raw, 4),
+        "method": cols.method,
+    }
+
+
+def score_dicts(scores: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """把 compute_scores_batch 的列式结果展开为逐事件的评分字典（结构同 compute_event_scores）"""
+    formula = "relevance=impact*0.45+abs(sentiment)*0.30+confidence*0.15+freshness*0.10"
+    rows = zip(
+        scores["impact_score"].tolist(),
+        scores["sentiment_score"].tolist(),
+        scores["confidence_score"].tolist(),
+        scores["freshness_score"].tolist(),
+        scores["relevance_score"].tolist(),
+        scores["direction"].tolist(),
+        scores["method"].tolist(),
+        scores["impact_raw"].tolist(),
+        scores["sentiment_raw"].tolist(),
+        scores["confidence_raw"].tolist(),
+    )
+    return [
+        {
+            "impact_score": impact,
+            "sentiment_score": sentiment,
+            "confidence_score": confidence,
+            "freshness_score": freshness,
+            "relevance_score": relevance,
+            "direction": direction,
+            "calculation": {
+                "method": method,
+                "impact_raw": impact_raw,
+                "sentiment_raw": sentiment_raw,
+                "confidence_raw": confidence_raw,
+                "formula": formula,
+            },
+        }
+        for (
+            impact, sentiment, confidence, freshness, relevance, direction,
+            method, impact_raw, sentiment_raw, confidence_raw,
+        ) in rows
+    ]
+
+
+def compute_event_scores_batch(events: Sequence[Dict[str, Any]], now: datetime) -> List[Dict[str, Any]]:
+    """批量版 compute_event_scores，返回结构与逐条调用相同"""
+    if not events:
+        return []
+    return score_dicts(compute_scores_batch(build_event_columns(events, now)))
+
+
+def compute_market_index_batch(sentiment_scores: np.ndarray, confidence_scores: np.ndarray) -> float:
+    """批量版 compute_market_index，输入为已舍入的卡片分数列"""
+    if len(sentiment_scores) == 0:
+        return 0.0
+    weighted = sentiment_scores * (0.5 + confidence_scores / 200.0)
+    return float(np.clip(weighted.mean(), -100.0, 100.0))
+
+
+# ===== 聚合管道排序 =====
+# 与 compute_event_scores 相同的公式写成 MongoDB 表达式，基于持久化的 radar 字段在服务端排序，
+# 只把前 limit 名取回 Python 生成卡片。浮点运算顺序与 Python 一致。
+
+
+def mongo_rank_fields(now: datetime) -> Dict[str, Any]:
+    """
+    $addFields 阶段：_sentiment（情绪分，未舍入）、_strength（abs(情绪分)，两位小数）
+    和 _relevance（相关度，两位小数）
+
+    now 需截断到毫秒，与 MongoDB 日期精度一致；
+    两个日期相减得到毫秒差（与 $dateDiff 的毫秒单位相同，且兼容 MongoDB 5.0 以下版本）
+    """
+    hours = {
+        "$max": [
+            0.0,
+            {"$divide": [{"$divide": [{"$subtract": [now, "$announcement_date"]}, 1000.0]}, 3600.0]},
+        ]
+    }
+    freshness = {
+        "$let": {
+            "vars": {"hours": hours},
+            "in": {
+                "$cond": [
+                    {"$gte": ["$$hours", FRESHNESS_HOURS]},
+                    0.0,
+                    {"$subtract": [100.0, {"$multiply": [{"$divide": ["$$hours", FRESHNESS_HOURS]}, 100.0]}]},
+                ]
+            },
+        }
+    }
+    relevance = {
+        "$min": [100.0, {"$max": [0.0, {"$add": ["$radar.relevance_base", {"$multiply": [freshness, 0.10]}]}]}]
+    }
+    sentiment = {"$multiply": ["$radar.sentiment_raw", 100.0]}
+    return {
+        "_sentiment": sentiment,
+        "_strength": {"$round": [{"$abs": sentiment}, 2]},
+        "_relevance": {"$round": [relevance, 2]},
+    }
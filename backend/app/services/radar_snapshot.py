@@ -0,0 +1,184 @@
+"""
+机会雷达排名快照
+
+两个 /signals（机会、风险）和 /top-events 在页面加载时被同时调用。
+每个时间窗口只做一次 MongoDB 聚合（见 db_service.rank_radar_window），同时得到相关度、
+机会、风险三种排名的前 RANKING_MAX_LIMIT 名，作为该窗口的快照缓存 settings.radar_snapshot_ttl 秒；
+各接口从快照中截取 limit 条并按 min_relevance 过滤。同一个窗口的并发请求共享一次进行中的计算
+（single-flight），因此峰值负载取决于不同窗口的数量，而不是用户数或 limit 等参数组合。
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, NamedTuple, Tuple
+
+from app.config import settings
+from app.services.database_service import db_service
+from app.services.radar_scoring import build_event_columns, compute_scores_batch, score_dicts
+
+# 单次排名请求的最大返回数量
+RANKING_MAX_LIMIT = 100
+
+
+class RadarSnapshot(NamedTuple):
+    """一次排名的结果"""
+
+    cards: List[Dict[str, Any]]
+    total: int  # 满足条件的事件总数
+    computed_at: datetime
+
+
+class WindowSnapshot(NamedTuple):
+    """一个时间窗口的全部排名"""
+
+    rankings: Dict[str, List[Dict[str, Any]]]  # {排名: 前 RANKING_MAX_LIMIT 名卡片}
+    totals: Dict[str, int]
+    start_date: datetime
+    computed_at: datetime
+
+
+# 卡片排序键（与聚合管道的 $sort 一致），按精确舍入后的分数在 Python 中再稳定排序一次
+RANKING_SORT_KEYS = {
+    "relevance": lambda card: card["relevance_score"],
+    "opportunity": lambda card: (abs(card["sentiment_score"]), card["relevance_score"]),
+    "risk": lambda card: (abs(card["sentiment_score"]), card["relevance_score"]),
+}
+
+
+def build_event_card(event: Dict[str, Any], scores: Dict[str, Any]) -> Dict[str, Any]:
+    ai = event.get("ai_analysis") or {}
+    sectors = ai.get("affected_sectors") or []
+    stocks = ai.get("affected_stocks") or []
+    return {
+        "id": event.get("id"),
+        "title": event.get("title"),
+        # 卡片只携带摘要，完整正文通过详情接口获取
+        "content": (event.get("content") or "")[: settings.event_snippet_chars],
+        "event_category": event.get("event_category"),
+        "event_types": event.get("event_types") or [],
+        "announcement_date": event.get("announcement_date"),
+        "source": event.get("source"),
+        "original_url": event.get("original_url"),
+        "impact_reason": ai.get("impact_reason"),
+        "is_hype": bool(ai.get("is_hype", False)),
+        "affected_sector_codes": [item.get("code") for item in sectors if item.get("code")],
+        "affected_stock_codes": [item.get("code") for item in stocks if item.get("code")],
+        **scores,
+    }
+
+
+def score_events(events: List[Dict[str, Any]], now: datetime) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """批量打分，返回 (卡片列表, 列式评分)"""
+    if not events:
+        return [], {}
+    scores = compute_scores_batch(build_event_columns(events, now))
+    cards = [build_event_card(event, score) for event, score in zip(events, score_dicts(scores))]
+    return cards, scores
+
+
+class SnapshotCache:
+    """带 TTL 的单飞（single-flight）缓存"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        读取缓存，未命中时计算
+
+        同一个键同时只有一个计算在进行，其余请求等待其结果。
+        计算在独立任务中运行，发起请求被取消不会中断其它等待者。
+        """
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute(key, compute))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+            now = time.monotonic()
+            if len(self._entries) >= self.max_entries:
+                # 淘汰已过期项，仍然满则清空
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (now + self.ttl, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+
+class RadarSnapshotService:
+    """机会雷达快照服务"""
+
+    def __init__(self):
+        self._cache = SnapshotCache(settings.radar_snapshot_ttl, settings.radar_snapshot_max_entries)
+
+    async def window(self, window_hours: int) -> WindowSnapshot:
+        """最近 window_hours 小时的排名快照（按窗口缓存）"""
+
+        async def compute() -> WindowSnapshot:
+            now = datetime.utcnow()
+            # MongoDB 日期精度为毫秒，截断后服务端与 Python 的 freshness 计算一致
+            now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+            start_date = now - timedelta(hours=window_hours)
+            ranked = await db_service.rank_radar_window(start_date, now, RANKING_MAX_LIMIT)
+            # 同一事件可能出现在多个排名中，合并后只打分一次
+            events = {event["id"]: event for items in ranked["items"].values() for event in items}
+            cards, _ = score_events(list(events.values()), now)
+            by_id = {card["id"]: card for card in cards}
+            rankings = {}
+            for rank_by, items in ranked["items"].items():
+                ranking = [by_id[event["id"]] for event in items]
+                ranking.sort(key=RANKING_SORT_KEYS[rank_by], reverse=True)
+                rankings[rank_by] = ranking
+            return WindowSnapshot(rankings, ranked["totals"], start_date, now)
+
+        return await self._cache.get(("window", window_hours), compute)
+
+    async def ranking(
+        self, rank_by: str, window_hours: int, limit: int, min_relevance: float = 0.0
+    ) -> RadarSnapshot:
+        """
+        最近 window_hours 小时内排名前 limit 的卡片（从窗口快照中截取）
+
+        Args:
+            rank_by: relevance（/top-events）或 opportunity / risk（/signals）
+            min_relevance: 最小相关度，只用于 relevance 排名
+        """
+        if rank_by not in RANKING_SORT_KEYS:
+            raise ValueError(f"Unknown radar ranking: {rank_by}")
+        if min_relevance and rank_by != "relevance":
+            raise ValueError("min_relevance only applies to the relevance ranking")
+        limit = min(limit, RANKING_MAX_LIMIT)
+        snapshot = await self.window(window_hours)
+        cards = snapshot.rankings[rank_by]
+        total = snapshot.totals[rank_by]
+        if min_relevance:
+            # 快照按相关度降序，满足条件的卡片是前缀
+            passing = [card for card in cards if card["relevance_score"] >= min_relevance]
+            if len(passing) < len(cards) or len(cards) == total:
+                total = len(passing)
+            else:
+                # 前 RANKING_MAX_LIMIT 名全部满足时总数需另行统计（与快照使用同一时刻）
+                total = await self._cache.get(
+                    ("count", window_hours, min_relevance, snapshot.computed_at),
+                    lambda: db_service.count_radar_events(
+                        snapshot.start_date, snapshot.computed_at, min_relevance
+                    ),
+                )
+            cards = passing
+        return RadarSnapshot(cards[:limit], total, snapshot.computed_at)
+
+
+# 全局雷达快照服务实例
+radar_snapshot_service = RadarSnapshotService()
@@ -0,0 +1,424 @@
+"""
+事件时间序列汇总服务
+
+event_rollups 集合按小时/天分桶，对每个维度（全部、类别、事件类型、板块、股票）
+保存事件数以及影响分/情绪分/置信度的累加值与计数。
+事件写入、重新分析和删除时通过 $inc 增量维护，趋势查询只需一次按索引的范围读取。
+
+每个桶另外累加机会雷达分量（radar_*）：滑动窗口内的市场指数、方向计数和平均置信度
+由 "all" 维度覆盖窗口的小时桶求和得到，板块/股票热度由对应维度的小时桶按键分组求和得到。
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.core.database import get_database
+from app.services.radar_scoring import FRESHNESS_HOURS, RADAR_SCORE_VERSION, freshness_score
+
+GRANULARITIES = ("hour", "day")
+DIMENSIONS = ("all", "category", "event_type", "sector", "stock")
+SCORE_FIELDS = ("impact", "sentiment", "confidence")
+RADAR_FIELDS = (
+    "radar_n",
+    "radar_index_sum",
+    "radar_confidence_sum",
+    "radar_opportunity",
+    "radar_risk",
+    "radar_relevance_base_sum",
+    "radar_sentiment_sum",
+    "radar_hour_sum",
+)
+HEAT_DIMENSIONS = ("sector", "stock")
+HEAT_SORTS = ("relevance_sum", "relevance_avg", "sentiment_sum", "sentiment_avg", "event_count")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _value(item: Any) -> str:
+    return str(getattr(item, "value", item))
+
+
+def _epoch_hours(date: datetime) -> float:
+    return (date - _EPOCH).total_seconds() / 3600.0
+
+
+def _bucket(date: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return date.replace(minute=0, second=0, microsecond=0)
+    return date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _dimension_keys(event: Dict[str, Any]) -> List[tuple[str, str]]:
+    """事件所属的 (维度, 键) 列表"""
+    keys = [("all", "all")]
+    if event.get("event_category"):
+        keys.append(("category", _value(event["event_category"])))
+    for event_type in set(_value(t) for t in event.get("event_types") or []):
+        keys.append(("event_type", event_type))
+
+    ai_analysis = event.get("ai_analysis") or {}
+    sectors = {s.get("code") for s in ai_analysis.get("affected_sectors") or [] if s.get("code")}
+    stocks = {s.get("code") for s in ai_analysis.get("affected_stocks") or [] if s.get("code")}
+    if event.get("stock_code"):
+        stocks.add(event["stock_code"])
+    keys.extend(("sector", code) for code in sectors)
+    keys.extend(("stock", code) for code in stocks)
+    return keys
+
+
+def _score_increments(event: Dict[str, Any], sign: int) -> Dict[str, float]:
+    ai_analysis = event.get("ai_analysis") or {}
+    inc: Dict[str, float] = {"count": sign}
+    for field in SCORE_FIELDS:
+        score = ai_analysis.get(f"{field}_score")
+        if isinstance(score, (int, float)):
+            inc[f"{field}_sum"] = sign * float(score)
+            inc[f"{field}_n"] = sign
+    return inc
+
+
+def _radar_increments(event: Dict[str, Any], sign: int) -> Dict[str, float]:
+    """
+    事件对雷达汇总的贡献（与雷达卡片一致：分数先舍入到两位小数）
+
+    radar_hour_sum 为公告时间（自 1970 年起的小时数）的累加值，用于按窗口解析计算 freshness。
+    没有当前版本静态评分的事件不计入，需先运行 scripts/backfill_radar_scores.py
+    """
+    radar = event.get("radar")
+    if not radar or radar.get("version") != RADAR_SCORE_VERSION:
+        return {}
+    sentiment = radar["sentiment_raw"] * 100.0
+    sentiment_score = round(sentiment, 2)
+    confidence_score = round(radar["confidence_raw"] * 100.0, 2)
+    inc: Dict[str, float] = {
+        "radar_n": sign,
+        "radar_index_sum": sign * sentiment_score * (0.5 + confidence_score / 200.0),
+        "radar_confidence_sum": sign * confidence_score,
+        "radar_relevance_base_sum": sign * radar["relevance_base"],
+        "radar_sentiment_sum": sign * sentiment_score,
+        "radar_hour_sum": sign * _epoch_hours(event["announcement_date"]),
+    }
+    if sentiment >= 20:
+        inc["radar_opportunity"] = sign
+    elif sentiment <= -20:
+        inc["radar_risk"] = sign
+    return inc
+
+
+def rollup_id(granularity: str, dimension: str, key: str, bucket: datetime) -> str:
+    return f"{granularity}|{dimension}|{key}|{bucket.strftime('%Y-%m-%dT%H')}"
+
+
+class RollupService:
+    """时间序列汇总服务"""
+
+    def _get_db(self) -> AsyncIOMotorDatabase:
+        """获取数据库实例（延迟加载）"""
+        return get_database()
+
+    def _increments(
+        self, events: Iterable[Dict[str, Any]], sign: int
+    ) -> Dict[tuple, Dict[str, float]]:
+        """{(粒度, 维度, 键, 桶): {字段: 增量}}"""
+        incs: Dict[tuple, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for event in events:
+            date = event.get("announcement_date")
+            if not isinstance(date, datetime):
+                continue
+            scores = {**_score_increments(event, sign), **_radar_increments(event, sign)}
+            for granularity in GRANULARITIES:
+                bucket = _bucket(date, granularity)
+                for dimension, key in _dimension_keys(event):
+                    target = incs[(granularity, dimension, key, bucket)]
+                    for field, value in scores.items():
+                        target[field] += value
+        return incs
+
+    async def _apply(self, incs: Dict[tuple, Dict[str, float]]) -> None:
+        now = datetime.utcnow()
+        operations = []
+        for (granularity, dimension, key, bucket), inc in incs.items():
+            # 计数字段保持整数，累加值为浮点
+            inc = {
+                field: value if field.endswith("_sum") else int(value)
+                for field, value in inc.items()
+                if value
+            }
+            if not inc:
+                continue
+            operations.append(UpdateOne(
+                {"_id": rollup_id(granularity, dimension, key, bucket)},
+                {
+                    "$inc": inc,
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {
+                        "granularity": granularity,
+                        "dimension": dimension,
+                        "key": key,
+                        "bucket": bucket,
+                    },
+                },
+                upsert=True,
+            ))
+        if operations:
+            await self._get_db().event_rollups.bulk_write(operations, ordered=False)
+
+    async def record(self, events: Iterable[Dict[str, Any]], sign: int = 1) -> None:
+        """
+        记录事件新增（sign=1）或删除（sign=-1）
+
+        Args:
+            events: 包含 announcement_date、event_category、event_types、
+                stock_code、ai_analysis、radar 的事件字典
+        """
+        await self._apply(self._increments(events, sign))
+
+    async def move(self, old: Dict[str, Any], new: Dict[str, Any]) -> None:
+        """事件重新分析或字段变化时，撤销旧贡献并写入新贡献（单次 bulk_write）"""
+        incs = self._increments([old], -1)
+        for bucket_key, inc in self._increments([new], 1).items():
+            target = incs.setdefault(bucket_key, defaultdict(float))
+            for field, value in inc.items():
+                target[field] += value
+        await self._apply(incs)
+
+    async def reset(self) -> None:
+        """清空汇总（删除全部事件时使用）"""
+        await self._get_db().event_rollups.delete_many({})
+
+    async def rebuild(self, batch_size: int = 1000) -> int:
+        """从 events 全量重算汇总，返回处理的事件数"""
+        await self.reset()
+        projection = {
+            "announcement_date": 1,
+            "event_category": 1,
+            "event_types": 1,
+            "stock_code": 1,
+            "ai_analysis.impact_score": 1,
+            "ai_analysis.sentiment_score": 1,
+            "ai_analysis.confidence_score": 1,
+            "ai_analysis.affected_sectors.code": 1,
+            "ai_analysis.affected_stocks.code": 1,
+            "radar": 1,
+        }
+        processed = 0
+        batch = []
+        async for event in self._get_db().events.find({}, projection):
+            batch.append(event)
+            if len(batch) >= batch_size:
+                await self.record(batch)
+                processed += len(batch)
+                batch = []
+        if batch:
+            await self.record(batch)
+            processed += len(batch)
+        return processed
+
+    async def get_series(
+        self,
+        dimension: str,
+        key: str,
+        granularity: str = "day",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        读取时间序列（按桶升序）
+
+        Returns:
+            [{bucket, count, avg_impact, avg_sentiment, avg_confidence}]，没有事件的桶不返回
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}")
+
+        query: Dict[str, Any] = {"granularity": granularity, "dimension": dimension, "key": key}
+        if start or end:
+            bucket_query = {}
+            if start:
+                bucket_query["$gte"] = _bucket(start, granularity)
+            if end:
+                bucket_query["$lte"] = end
+            query["bucket"] = bucket_query
+
+        series = []
+        cursor = self._get_db().event_rollups.find(query).sort("bucket", 1)
+        async for doc in cursor:
+            if doc.get("count", 0) <= 0:
+                continue
+            point = {"bucket": doc["bucket"], "count": doc["count"]}
+            for field in SCORE_FIELDS:
+                n = doc.get(f"{field}_n", 0)
+                point[f"avg_{field}"] = round(doc.get(f"{field}_sum", 0.0) / n, 4) if n > 0 else None
+            series.append(point)
+        return series
+
+    async def get_radar_window(self, start: datetime) -> Dict[str, Any]:
+        """
+        公告日不早于 start 的事件的市场指数汇总
+
+        完整覆盖的小时桶直接求和；start 所在的不完整小时按事件逐条补算，保证窗口边界精确。
+
+        Returns:
+            {sample_size, market_index, avg_confidence, opportunity_count, risk_count, neutral_count}
+        """
+        first_full = _bucket(start, "hour")
+        if first_full < start:
+            first_full += timedelta(hours=1)
+
+        totals: Dict[str, float] = defaultdict(float)
+        cursor = self._get_db().event_rollups.find(
+            {"granularity": "hour", "dimension": "all", "key": "all", "bucket": {"$gte": first_full}},
+            {field: 1 for field in RADAR_FIELDS},
+        )
+        async for doc in cursor:
+            for field in RADAR_FIELDS:
+                totals[field] += doc.get(field, 0)
+        if first_full > start:
+            cursor = self._get_db().events.find(
+                {"announcement_date": {"$gte": start, "$lt": first_full}},
+                {"announcement_date": 1, "radar": 1},
+            )
+            async for event in cursor:
+                for field, value in _radar_increments(event, 1).items():
+                    totals[field] += value
+
+        n = int(totals["radar_n"])
+        if n <= 0:
+            return {
+                "sample_size": 0,
+                "market_index": 0.0,
+                "avg_confidence": 0.0,
+                "opportunity_count": 0,
+                "risk_count": 0,
+                "neutral_count": 0,
+            }
+        opportunity_count = int(totals["radar_opportunity"])
+        risk_count = int(totals["radar_risk"])
+        return {
+            "sample_size": n,
+            "market_index": min(max(totals["radar_index_sum"] / n, -100.0), 100.0),
+            "avg_confidence": totals["radar_confidence_sum"] / n,
+            "opportunity_count": opportunity_count,
+            "risk_count": risk_count,
+            "neutral_count": n - opportunity_count - risk_count,
+        }
+
+    async def get_radar_heat(
+        self,
+        dimension: str,
+        start: datetime,
+        now: datetime,
+        sort_by: str = "relevance_sum",
+        ascending: bool = False,
+        limit: int = 20,
+    ) -> tuple[List[Dict[str, Any]], int]:
+        """
+        板块/股票热度：公告日不早于 start 的事件按实体汇总的相关度与情绪分
+
+        相关度 = relevance_base + freshness*0.10，freshness 在 72 小时内线性衰减。
+        完全处于衰减期内的小时桶可由事件数 n 和公告时间累加值 Σt 直接算出
+        Σfreshness = 100n - (n*now - Σt) / 72 * 100，更早的桶为 0；
+        窗口起点所在小时、衰减边界所在小时以及当前小时起的事件逐条计算。
+
+        Returns:
+            (按 sort_by 排序的前 limit 个实体, 窗口内有事件的实体总数)
+        """
+        if dimension not in HEAT_DIMENSIONS:
+            raise ValueError(f"Unknown heat dimension: {dimension}")
+        if sort_by not in HEAT_SORTS:
+            raise ValueError(f"Unknown heat sort: {sort_by}")
+
+        hour = timedelta(hours=1)
+        fresh_start = now - timedelta(hours=FRESHNESS_HOURS)
+        current = _bucket(now, "hour")
+        irregular = sorted({_bucket(start, "hour"), _bucket(fresh_start, "hour")})
+        totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+        fresh = {"$gt": ["$bucket", fresh_start]}
+        pipeline = [
+            {"$match": {
+                "granularity": "hour",
+                "dimension": dimension,
+                "bucket": {"$gte": _bucket(start, "hour"), "$lt": current, "$nin": irregular},
+            }},
+            {"$group": {
+                "_id": "$key",
+                "n": {"$sum": "$radar_n"},
+                "relevance_base_sum": {"$sum": "$radar_relevance_base_sum"},
+                "sentiment_sum": {"$sum": "$radar_sentiment_sum"},
+                "opportunity": {"$sum": "$radar_opportunity"},
+                "risk": {"$sum": "$radar_risk"},
+                "fresh_n": {"$sum": {"$cond": [fresh, "$radar_n", 0]}},
+                "fresh_hour_sum": {"$sum": {"$cond": [fresh, "$radar_hour_sum", 0]}},
+            }},
+        ]
+        now_hours = _epoch_hours(now)
+        async for doc in self._get_db().event_rollups.aggregate(pipeline):
+            target = totals[doc["_id"]]
+            freshness_sum = (
+                100.0 * doc["fresh_n"]
+                - (doc["fresh_n"] * now_hours - doc["fresh_hour_sum"]) / FRESHNESS_HOURS * 100.0
+            )
+            target["n"] += doc["n"]
+            target["relevance_sum"] += doc["relevance_base_sum"] + freshness_sum * 0.10
+            target["sentiment_sum"] += doc["sentiment_sum"]
+            target["opportunity"] += doc["opportunity"]
+            target["risk"] += doc["risk"]
+
+        ranges = [
+            {"announcement_date": {"$gte": max(bucket, start), "$lt": bucket + hour}}
+            for bucket in irregular
+            if bucket + hour > start
+        ]
+        ranges.append({"announcement_date": {"$gte": max(current, start)}})
+        cursor = self._get_db().events.find(
+            {"$or": ranges},
+            {
+                "announcement_date": 1,
+                "radar": 1,
+                "stock_code": 1,
+                "ai_analysis.affected_sectors.code": 1,
+                "ai_analysis.affected_stocks.code": 1,
+            },
+        )
+        async for event in cursor:
+            inc = _radar_increments(event, 1)
+            if not inc:
+                continue
+            relevance = inc["radar_relevance_base_sum"] + freshness_score(event["announcement_date"], now) * 0.10
+            for event_dimension, key in _dimension_keys(event):
+                if event_dimension != dimension:
+                    continue
+                target = totals[key]
+                target["n"] += 1
+                target["relevance_sum"] += relevance
+                target["sentiment_sum"] += inc["radar_sentiment_sum"]
+                target["opportunity"] += inc.get("radar_opportunity", 0)
+                target["risk"] += inc.get("radar_risk", 0)
+
+        items = []
+        for key, target in totals.items():
+            n = int(target["n"])
+            if n <= 0:
+                continue
+            items.append({
+                "code": key,
+                "event_count": n,
+                "relevance_sum": round(target["relevance_sum"], 2),
+                "relevance_avg": round(target["relevance_sum"] / n, 2),
+                "sentiment_sum": round(target["sentiment_sum"], 2),
+                "sentiment_avg": round(target["sentiment_sum"] / n, 2),
+                "opportunity_count": int(target["opportunity"]),
+                "risk_count": int(target["risk"]),
+            })
+        items.sort(key=lambda item: (item[sort_by], item["code"]), reverse=not ascending)
+        return items[:limit], len(items)
+
+
+# 全局汇总服务实例
+rollup_service = RollupService()
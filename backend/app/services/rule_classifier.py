@@ -0,0 +1,169 @@
+"""
+例行公告规则分类（tier-0）
+
+交易所公告中相当一部分是程序性公告：股东大会通知/决议、董事会/监事会决议、
+法律意见书、中介机构核查意见、制度文件、更正公告、人事变动等。
+这类公告按公告类型表和标题模板即可判定，直接生成低影响的 AIAnalysis（method="rule"），
+只有其余公告才调用模型。
+
+为保证精度，标题或正文出现重大事项词（并购重组、控制权变更、回购增减持、业绩、诉讼处罚、
+担保、关联交易等）的公告一律交给模型——例如审议回购方案的董事会决议。
+"""
+import re
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from app.models import AIAnalysis
+from app.services.content_condenser import clean_content
+
+
+class RoutineRule(NamedTuple):
+    """标题模板规则"""
+    name: str
+    pattern: "re.Pattern[str]"
+    event_type: str
+    impact_score: float
+    # 为 False 时不检查正文中的重大事项词（正文是制度条文、意见书引述等，词频没有意义）
+    check_content: bool = True
+
+
+TITLE_RULES: List[RoutineRule] = [
+    RoutineRule("shareholder_meeting", re.compile(r"(召开|延期召开|取消).{0,20}(股东大会|股东会)|(股东大会|股东会).{0,10}(通知|提示性公告|会议资料)"), "ops_info", 0.05),
+    RoutineRule("shareholder_resolution", re.compile(r"(股东大会|股东会).{0,6}决议公告"), "ops_info", 0.05),
+    RoutineRule("board_resolution", re.compile(r"(董事会|监事会).{0,20}决议公告"), "ops_info", 0.05),
+    RoutineRule("legal_opinion", re.compile(r"法律意见书?$|的法律意见"), "ops_info", 0.03),
+    RoutineRule("independent_director", re.compile(r"独立董事.{0,20}(意见|述职报告|提名人声明|候选人声明)"), "ops_info", 0.03, False),
+    RoutineRule("sponsor_verification", re.compile(r"(保荐机构|保荐人|财务顾问|会计师事务所|独立财务顾问).{0,40}(核查意见|专项说明|持续督导)"), "ops_info", 0.03, False),
+    RoutineRule("governance_rules", re.compile(r"公司章程|议事规则|工作细则|(管理|工作|实施)(制度|办法)"), "ops_info", 0.03, False),
+    RoutineRule("investor_briefing", re.compile(r"(召开|举行).{0,20}(业绩说明会|投资者交流会|网上说明会)|投资者关系活动记录"), "ops_info", 0.05),
+    RoutineRule("correction", re.compile(r"(更正|补充)(公告|说明)|更正后"), "info_change", 0.05),
+    RoutineRule("personnel_change", re.compile(r"(选举|聘任|辞职|换届|补选|离任|变更).{0,15}(董事|监事|高级管理人员|董事长|总经理|董事会秘书|证券事务代表|财务总监|职工代表)|(董事|监事|高级管理人员|董事长|总经理|董事会秘书|证券事务代表|财务总监).{0,6}(辞职|离任|换届)"), "info_change", 0.1),
+    RoutineRule("registration_change", re.compile(r"变更(注册|办公)地址|(续聘|变更|改聘)(会计师事务所|审计机构)|完成工商(变更)?登记|变更联系方式|(投资者)?热线电话"), "info_change", 0.05),
+    RoutineRule("bond_servicing", re.compile(r"(付息|兑付|跟踪评级|转股结果暨股份变动|转股价格不向下修正|赎回.{0,6}提示)"), "capital_action", 0.05),
+    RoutineRule("fund_usage_report", re.compile(r"募集资金(年度)?(存放|存放与)?(实际)?使用情况的?(专项)?报告"), "ops_info", 0.05, False),
+    RoutineRule("pledge_release", re.compile(r"解除质押(?!.*(并|及).{0,4}质押)"), "holder_change", 0.05),
+]
+
+# 只凭公告类型即可判定为例行公告的类型（标题未命中模板时使用），值为事件类型
+ROUTINE_BULLETIN_TYPES: Dict[str, Dict[str, str]] = {
+    "上海证券交易所": {
+        "规范运作": "ops_info",
+        "中介机构报告": "ops_info",
+        "补充更正公告": "info_change",
+        "境内外同步披露": "ops_info",
+    },
+    "深圳证券交易所": {
+        "中介机构报告": "ops_info",
+        "上市公司制度": "ops_info",
+        "补充及更正": "info_change",
+    },
+    "北京证券交易所": {
+        "董事会决议": "ops_info",
+        "监事会决议": "ops_info",
+        "股东大会决议": "ops_info",
+    },
+}
+_BULLETIN_TYPE_IMPACT = 0.05
+
+# 出现任一词即视为可能包含重大事项，交给模型分析
+MATERIAL_KEYWORDS = [
+    "收购", "并购", "重组", "重大资产", "吸收合并", "控制权", "要约",
+    "回购", "增持", "减持", "股权激励", "员工持股",
+    "业绩预告", "业绩快报", "预增", "预减", "预亏", "扭亏", "亏损", "利润分配", "权益分派", "转增",
+    "中标", "重大合同", "框架协议",
+    "诉讼", "仲裁", "立案", "处罚", "监管函", "问询函", "警示函", "调查",
+    "退市", "风险警示", "停牌", "复牌", "破产", "重整", "违约", "逾期", "冻结", "司法拍卖",
+    "定增", "非公开发行", "向特定对象发行", "可转换公司债券发行", "配股",
+    "担保", "关联交易", "对外投资", "出售资产", "异常波动", "澄清", "留置",
+]
+# 词表难以枚举的重大事项写法：实际控制人/控股股东变更（常与董事、高管辞职合并在一篇公告中）
+MATERIAL_PATTERNS = [
+    r"(实际控制人|控股股东).{0,6}变更",
+    r"变更.{0,6}(实际控制人|控股股东)",
+]
+_MATERIAL_RE = re.compile("|".join([re.escape(word) for word in MATERIAL_KEYWORDS] + MATERIAL_PATTERNS))
+
+# 正文只检查清理后的前若干字符：套话已去掉，议案列表都在前部
+_CONTENT_SCAN_CHARS = 8000
+
+
+class RuleClassifier:
+    """例行公告规则分类器"""
+
+    def __init__(
+        self,
+        title_rules: Optional[List[RoutineRule]] = None,
+        bulletin_types: Optional[Dict[str, Dict[str, str]]] = None,
+    ):
+        self.title_rules = TITLE_RULES if title_rules is None else title_rules
+        self.bulletin_types = ROUTINE_BULLETIN_TYPES if bulletin_types is None else bulletin_types
+
+    def _material(self, text: str) -> Optional[str]:
+        match = _MATERIAL_RE.search(text or "")
+        return match.group() if match else None
+
+    def match(
+        self,
+        title: str,
+        content: str = "",
+        source: Optional[str] = None,
+        bulletin_type: Optional[str] = None,
+    ) -> Optional[RoutineRule]:
+        """返回命中的规则；不是例行公告（或可能含重大事项）时返回 None"""
+        title = (title or "").strip()
+        if not title or self._material(title):
+            return None
+
+        rule = next((rule for rule in self.title_rules if rule.pattern.search(title)), None)
+        if rule is None and bulletin_type:
+            event_type = self.bulletin_types.get(source or "", {}).get(bulletin_type)
+            if event_type:
+                rule = RoutineRule(f"bulletin:{bulletin_type}", re.compile(""), event_type, _BULLETIN_TYPE_IMPACT)
+        if rule is None:
+            return None
+
+        if rule.check_content and content:
+            body = "\n".join(clean_content(content[: _CONTENT_SCAN_CHARS * 2]))[:_CONTENT_SCAN_CHARS]
+            if self._material(body):
+                return None
+        return rule
+
+    def classify(
+        self,
+        title: str,
+        content: str = "",
+        source: Optional[str] = None,
+        bulletin_type: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        规则判定例行公告
+
+        Returns:
+            与 AIService.analyze_and_classify 相同结构的结果（另附 rule 规则名），
+            不是例行公告时返回 None
+        """
+        rule = self.match(title, content, source, bulletin_type)
+        if rule is None:
+            return None
+        ai_analysis = AIAnalysis(
+            impact_score=rule.impact_score,
+            sentiment_score=0.0,
+            confidence_score=0.9,
+            is_hype=False,
+            impact_reason=f"例行公告（规则 {rule.name}），无实质性经营或资本事项",
+            method="rule",
+            affected_sectors=[],
+            affected_stocks=[],
+            affected_materials=[],
+            analyzed_at=datetime.utcnow(),
+        )
+        return {
+            "ai_analysis": ai_analysis,
+            "event_category": "company",
+            "event_types": [rule.event_type],
+            "rule": rule.name,
+        }
+
+
+# 全局规则分类器实例
+rule_classifier = RuleClassifier()
@@ -0,0 +1,244 @@
+"""
+事件全文检索服务
+
+中文按字切分为单字 + 相邻二元组（bigram），英文/数字按词切分。
+每个事件在写入时预先计算：
+- search_terms: 去重后的词项数组（多键索引，用于候选召回）
+- search_tf: {词项: 词频}（用于 BM25 打分）
+- search_len: 文档长度（词项总数）
+
+search_terms 覆盖标题和完整正文，任何正文词项都能召回事件；
+search_tf 只保留词频最高的 settings.search_max_content_terms 个正文词项（标题词项全部保留），
+BM25 统计的体积不随正文长度增长（search_len 仍按完整的统计窗口计算）。
+
+全局文档频率保存在 search_term_stats 集合中，随事件写入/删除增量维护。
+"""
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.core.database import get_database
+
+# 标题词频加权倍数（简化的 BM25F）
+TITLE_WEIGHT = 2
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 统计集合中的全局元数据文档
+META_ID = "__meta__"
+
+# 事件文档中的检索字段，默认不返回给客户端
+SEARCH_FIELDS = ("search_terms", "search_tf", "search_len")
+
+_TOKEN_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff]+|[a-z0-9]+")
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff]")
+
+
+def _cjk_tokens(run: str, with_unigrams: bool) -> List[str]:
+    if len(run) == 1:
+        return [run]
+    bigrams = [run[i : i + 2] for i in range(len(run) - 1)]
+    if with_unigrams:
+        return list(run) + bigrams
+    return bigrams
+
+
+def tokenize(text: str, for_query: bool = False) -> List[str]:
+    """
+    切分文本为检索词项
+
+    文档侧同时输出单字和 bigram，保证单字查询也能命中；
+    查询侧对长度 >= 2 的中文串只输出 bigram，相当于短语匹配。
+    """
+    tokens: List[str] = []
+    for match in _TOKEN_RE.finditer((text or "").lower()):
+        run = match.group(0)
+        if _CJK_RE.match(run):
+            tokens.extend(_cjk_tokens(run, with_unigrams=not for_query))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def query_terms(search: str) -> List[str]:
+    """将查询字符串切分为去重后的词项（保持顺序）"""
+    return list(dict.fromkeys(tokenize(search, for_query=True)))
+
+
+def _content_term_key(item: Tuple[str, int]) -> Tuple[bool, int]:
+    # 中文单字只用于单字查询，排在二元组和英文/数字词之后；同组内词频高的优先
+    term, freq = item
+    return len(term) == 1 and bool(_CJK_RE.match(term)), -freq
+
+
+def build_search_fields(title: str, content: str) -> Dict[str, Any]:
+    """
+    计算事件文档的检索字段
+
+    search_terms 包含标题和完整正文的全部词项，召回与正文长度无关；
+    search_tf 只统计前 settings.search_index_content_chars 字，且正文词项超过
+    settings.search_max_content_terms 时只保留排在前面的部分（同分按首次出现顺序），
+    被舍弃的词项仍可召回，只是不参与 BM25 打分
+    """
+    content = content or ""
+    body = content[: settings.search_index_content_chars]
+    tf = Counter(tokenize(body))
+    doc_len = sum(tf.values())
+    terms = dict.fromkeys(tokenize(content) if len(content) > len(body) else tf)
+    if len(tf) > settings.search_max_content_terms:
+        tf = Counter(dict(sorted(tf.items(), key=_content_term_key)[: settings.search_max_content_terms]))
+    title_tokens = tokenize(title)
+    for token in title_tokens:
+        tf[token] += TITLE_WEIGHT
+        terms[token] = None
+    return {
+        "search_terms": list(terms),
+        "search_tf": dict(tf),
+        "search_len": doc_len + TITLE_WEIGHT * len(title_tokens),
+    }
+
+
+def bm25_score(
+    tf: Dict[str, int],
+    doc_len: int,
+    terms: List[str],
+    df: Dict[str, int],
+    doc_count: int,
+    avg_len: float,
+) -> float:
+    """计算单个文档的 BM25 分数"""
+    score = 0.0
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / max(avg_len, 1.0))
+    for term in terms:
+        freq = tf.get(term, 0)
+        if not freq:
+            continue
+        n = df.get(term, 0)
+        idf = math.log(1 + (doc_count - n + 0.5) / (n + 0.5))
+        score += idf * freq * (BM25_K1 + 1) / (freq + norm)
+    return score
+
+
+class SearchService:
+    """事件检索服务"""
+
+    def _get_db(self) -> AsyncIOMotorDatabase:
+        """获取数据库实例（延迟加载）"""
+        return get_database()
+
+    async def register(self, fields_list: List[Dict[str, Any]], sign: int = 1) -> None:
+        """
+        增量更新全局统计
+
+        Args:
+            fields_list: build_search_fields 的结果列表
+            sign: 1 表示新增文档，-1 表示移除文档
+        """
+        fields_list = [f for f in fields_list if f and f.get("search_terms") is not None]
+        if not fields_list:
+            return
+
+        df_delta: Counter = Counter()
+        total_len = 0
+        for fields in fields_list:
+            df_delta.update(fields["search_terms"])
+            total_len += fields.get("search_len", 0)
+
+        operations = [
+            UpdateOne({"_id": term}, {"$inc": {"df": sign * count}}, upsert=True)
+            for term, count in df_delta.items()
+        ]
+        operations.append(
+            UpdateOne(
+                {"_id": META_ID},
+                {"$inc": {"doc_count": sign * len(fields_list), "total_len": sign * total_len}},
+                upsert=True,
+            )
+        )
+        await self._get_db().search_term_stats.bulk_write(operations, ordered=False)
+
+    async def reset(self) -> None:
+        """清空全局统计"""
+        await self._get_db().search_term_stats.delete_many({})
+
+    async def _load_stats(self, terms: List[str]) -> Tuple[Dict[str, int], int, float]:
+        df: Dict[str, int] = {}
+        doc_count = 0
+        avg_len = 1.0
+        cursor = self._get_db().search_term_stats.find({"_id": {"$in": terms + [META_ID]}})
+        async for doc in cursor:
+            if doc["_id"] == META_ID:
+                doc_count = max(doc.get("doc_count", 0), 0)
+                if doc_count:
+                    avg_len = max(doc.get("total_len", 0), 0) / doc_count
+            else:
+                df[doc["_id"]] = max(doc.get("df", 0), 0)
+        return df, doc_count, avg_len
+
+    async def rank(
+        self,
+        query: Dict[str, Any],
+        terms: List[str],
+        skip: int,
+        limit: int,
+    ) -> List[Tuple[Any, float]]:
+        """
+        在已过滤的候选集上按 BM25 排序
+
+        Args:
+            query: 已包含 search_terms 条件的查询（可叠加分类/日期/影响分等过滤）
+            terms: 查询词项
+            skip: 跳过数量
+            limit: 返回数量
+
+        Returns:
+            [(_id, score)]，按分数降序、公告日期降序
+        """
+        projection = {"search_len": 1, "announcement_date": 1}
+        for term in terms:
+            projection[f"search_tf.{term}"] = 1
+
+        # 候选集按时间倒序截断，超大结果集下优先保留较新的文档
+        cursor = (
+            self._get_db().events.find(query, projection)
+            .sort([("announcement_date", -1), ("_id", -1)])
+            .limit(settings.search_max_candidates)
+        )
+        candidates = [doc async for doc in cursor]
+        if not candidates:
+            return []
+
+        df, doc_count, avg_len = await self._load_stats(terms)
+        doc_count = max(doc_count, len(candidates))
+
+        scored = []
+        for position, doc in enumerate(candidates):
+            score = bm25_score(
+                doc.get("search_tf") or {},
+                doc.get("search_len") or 0,
+                terms,
+                df,
+                doc_count,
+                avg_len,
+            )
+            # position 越小越新，作为同分时的次排序键
+            scored.append((-score, position, doc["_id"], score))
+        scored.sort()
+        return [(item[2], item[3]) for item in scored[skip : skip + limit]]
+
+
+def search_filter(terms: List[str]) -> Optional[Dict[str, Any]]:
+    """构造候选召回条件：所有查询词项都必须出现"""
+    if not terms:
+        return None
+    return {"search_terms": {"$all": terms}}
+
+
+# 全局检索服务实例
+search_service = SearchService()
@@ -0,0 +1,167 @@
+"""
+仪表板统计物化服务
+
+stats 集合中的 "events" 文档保存事件总数、按类别计数和按公告日计数，
+由事件写入/更新/删除路径通过 $inc 增量维护，读取为 O(1)。
+reconcile 通过全量聚合重算并覆盖，用于修正增量维护产生的漂移。
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.database import get_database
+
+STATS_ID = "events"
+
+# 类别为空的事件在计数字典中的键
+_NONE_CATEGORY = "_none"
+
+
+def _category_key(category: Any) -> str:
+    if category is None:
+        return _NONE_CATEGORY
+    return str(getattr(category, "value", category))
+
+
+def _day_key(date: Any) -> Optional[str]:
+    if not isinstance(date, datetime):
+        return None
+    return date.strftime("%Y-%m-%d")
+
+
+class StatsService:
+    """统计物化服务"""
+
+    def _get_db(self) -> AsyncIOMotorDatabase:
+        """获取数据库实例（延迟加载）"""
+        return get_database()
+
+    def _increments(self, events: Iterable[Dict[str, Any]], sign: int) -> Dict[str, int]:
+        inc: Counter = Counter()
+        for event in events:
+            inc["total_events"] += sign
+            inc[f"categories.{_category_key(event.get('event_category'))}"] += sign
+            day = _day_key(event.get("announcement_date"))
+            if day:
+                inc[f"days.{day}"] += sign
+        return {key: value for key, value in inc.items() if value}
+
+    async def _apply(self, inc: Dict[str, int]) -> None:
+        if not inc:
+            return
+        await self._get_db().stats.update_one(
+            {"_id": STATS_ID},
+            {"$inc": inc, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+
+    async def record(self, events: Iterable[Dict[str, Any]], sign: int = 1) -> None:
+        """
+        记录事件新增（sign=1）或删除（sign=-1）
+
+        Args:
+            events: 至少包含 event_category 和 announcement_date 的事件字典
+        """
+        await self._apply(self._increments(events, sign))
+
+    async def move(self, old: Dict[str, Any], new: Dict[str, Any]) -> None:
+        """事件类别或公告日期变化时，把计数从旧桶移到新桶"""
+        inc = Counter(self._increments([old], -1))
+        inc.update(self._increments([new], 1))
+        await self._apply({key: value for key, value in inc.items() if value})
+
+    async def reset(self) -> None:
+        """清空统计（删除全部事件时使用）"""
+        await self._get_db().stats.delete_one({"_id": STATS_ID})
+
+    async def get_event_stats(self) -> Dict[str, Any]:
+        """读取物化统计，不存在时先全量重算"""
+        doc = await self._get_db().stats.find_one({"_id": STATS_ID})
+        if doc is None:
+            await self.reconcile()
+            doc = await self._get_db().stats.find_one({"_id": STATS_ID}) or {}
+        return doc
+
+    async def reconcile(self) -> Dict[str, int]:
+        """
+        全量重算统计并覆盖物化文档
+
+        Returns:
+            重算前后差异 {字段: 重算值 - 物化值}，为空表示没有漂移
+        """
+        events = self._get_db().events
+        total = await events.count_documents({})
+
+        categories: Dict[str, int] = {}
+        async for doc in events.aggregate([{"$group": {"_id": "$event_category", "count": {"$sum": 1}}}]):
+            categories[_category_key(doc["_id"])] = doc["count"]
+
+        days: Dict[str, int] = {}
+        day_pipeline = [
+            {"$match": {"announcement_date": {"$type": "date"}}},
+            {
+                "$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$announcement_date"}},
+                    "count": {"$sum": 1},
+                }
+            },
+        ]
+        async for doc in events.aggregate(day_pipeline):
+            days[doc["_id"]] = doc["count"]
+
+        fresh = {
+            "total_events": total,
+            "categories": categories,
+            "days": days,
+            "updated_at": datetime.utcnow(),
+            "reconciled_at": datetime.utcnow(),
+        }
+        old = await self._get_db().stats.find_one_and_replace(
+            {"_id": STATS_ID}, fresh, upsert=True
+        ) or {}
+
+        drift: Dict[str, int] = {}
+        if old.get("total_events", 0) != total:
+            drift["total_events"] = total - old.get("total_events", 0)
+        for field, values in (("categories", categories), ("days", days)):
+            previous = old.get(field) or {}
+            for key in set(values) | set(previous):
+                diff = values.get(key, 0) - previous.get(key, 0)
+                if diff:
+                    drift[f"{field}.{key}"] = diff
+        return drift
+
+    async def run_reconcile_loop(self, interval: int) -> None:
+        """后台任务：每 interval 秒重算一次统计"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                drift = await self.reconcile()
+                if drift:
+                    print(f"Stats reconciled, drift corrected: {drift}")
+            except Exception as e:
+                print(f"Stats reconcile failed: {e}")
+
+    @staticmethod
+    def category_stats(doc: Dict[str, Any]) -> list:
+        """按数量降序输出类别统计"""
+        items = [
+            {"category": None if key == _NONE_CATEGORY else key, "count": count}
+            for key, count in (doc.get("categories") or {}).items()
+            if count > 0
+        ]
+        items.sort(key=lambda item: item["count"], reverse=True)
+        return items
+
+    @staticmethod
+    def recent_count(doc: Dict[str, Any], days: int, now: datetime) -> int:
+        """最近 N 天的事件数（按公告日分桶，包含起始日整天）"""
+        start = _day_key(now - timedelta(days=days))
+        return sum(count for day, count in (doc.get("days") or {}).items() if day >= start)
+
+
+# 全局统计服务实例
+stats_service = StatsService()
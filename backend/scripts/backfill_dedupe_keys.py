@@ -0,0 +1,82 @@
+"""
+事件去重键回填工具
+为缺少 dedupe_key 的历史事件计算去重键，并创建唯一索引
+"""
+import sys
+import os
+import asyncio
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+from pymongo import UpdateOne
+
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.core.indexes import ensure_indexes
+from app.services.database_service import make_dedupe_key
+
+
+async def backfill_dedupe_keys(batch_size: int = 1000):
+    """回填去重键，重复事件保留最早的一条，其余不写入去重键"""
+    db = get_database()
+
+    seen = set()
+    async for doc in db.events.find({"dedupe_key": {"$exists": True}}, {"dedupe_key": 1}):
+        seen.add(doc["dedupe_key"])
+
+    query = {"dedupe_key": {"$exists": False}}
+    total = await db.events.count_documents(query)
+    print(f"需要回填 {total} 条事件")
+    print(f"{'='*60}")
+
+    updated = 0
+    duplicates = 0
+    operations = []
+    cursor = db.events.find(
+        query, {"title": 1, "announcement_date": 1, "stock_code": 1}
+    ).sort("_id", 1)
+    async for event in cursor:
+        if not event.get("announcement_date"):
+            continue
+        key = make_dedupe_key(event.get("title", ""), event["announcement_date"], event.get("stock_code"))
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        operations.append(UpdateOne({"_id": event["_id"]}, {"$set": {"dedupe_key": key}}))
+
+        if len(operations) >= batch_size:
+            await db.events.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+            print(f"  已回填 {updated}/{total}")
+
+    if operations:
+        await db.events.bulk_write(operations, ordered=False)
+        updated += len(operations)
+
+    await ensure_indexes(db)
+
+    print(f"{'='*60}")
+    print(f"回填完成:")
+    print(f"  写入去重键: {updated}")
+    print(f"  重复事件: {duplicates} (未写入去重键)")
+
+
+async def main(batch_size: int):
+    await connect_to_mongo()
+    try:
+        await backfill_dedupe_keys(batch_size=batch_size)
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="事件去重键回填工具")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批写入数量")
+
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
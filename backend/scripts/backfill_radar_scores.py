@@ -0,0 +1,98 @@
+"""
+雷达静态评分回填工具
+为缺少或版本过期的事件计算 radar 静态评分（impact/sentiment/confidence 与 relevance_base）
+"""
+import sys
+import os
+import asyncio
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+from pymongo import UpdateOne
+
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.core.indexes import ensure_indexes
+from app.services.content_store import content_store
+from app.services.radar_scoring import RADAR_SCORE_VERSION, compute_static_scores
+from app.services.rollup_service import rollup_service
+
+
+def _needs_text(event) -> bool:
+    """没有 AI 评分的事件走启发式，需要完整正文"""
+    ai = event.get("ai_analysis") or {}
+    return ai.get("impact_score") is None or ai.get("sentiment_score") is None
+
+
+async def backfill_radar_scores(batch_size: int = 500, force: bool = False):
+    """回填静态评分，force 时重算全部事件（如更换了情绪词典）"""
+    db = get_database()
+    await ensure_indexes(db)
+
+    query = {} if force else {"radar.version": {"$ne": RADAR_SCORE_VERSION}}
+    total = await db.events.count_documents(query)
+    print(f"需要回填 {total} 条事件（评分版本 {RADAR_SCORE_VERSION}）")
+    print(f"{'='*60}")
+
+    projection = {
+        "title": 1,
+        "content": 1,
+        "content_length": 1,
+        "content_ref": 1,
+        "event_category": 1,
+        "event_types": 1,
+        "source": 1,
+        "ai_analysis.impact_score": 1,
+        "ai_analysis.sentiment_score": 1,
+        "ai_analysis.confidence_score": 1,
+    }
+
+    processed = 0
+
+    async def flush(events):
+        await content_store.hydrate([event for event in events if _needs_text(event)])
+        operations = [
+            UpdateOne({"_id": event["_id"]}, {"$set": {"radar": compute_static_scores(event)}})
+            for event in events
+        ]
+        await db.events.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    batch = []
+    async for event in db.events.find(query, projection):
+        batch.append(event)
+        if len(batch) >= batch_size:
+            processed += await flush(batch)
+            batch = []
+            print(f"  已回填 {processed}/{total}")
+
+    if batch:
+        processed += await flush(batch)
+
+    print(f"{'='*60}")
+    print(f"回填完成: {processed} 条")
+
+    if processed:
+        # event_rollups 中的市场指数分量来自静态评分，需随之重算
+        rebuilt = await rollup_service.rebuild()
+        print(f"已重建趋势汇总: {rebuilt} 条事件")
+
+
+async def main(batch_size: int, force: bool):
+    await connect_to_mongo()
+    try:
+        await backfill_radar_scores(batch_size=batch_size, force=force)
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="雷达静态评分回填工具")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批写入数量")
+    parser.add_argument("--force", action="store_true", help="重算全部事件（更换情绪词典后使用）")
+
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.force))
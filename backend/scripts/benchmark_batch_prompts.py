@@ -0,0 +1,143 @@
+"""
+多事件批量提示词基准
+在本进程内启动模拟服务（scripts/mock_llm_server.py），用合成的短电报分别以
+单事件提示词和不同 batch size 的批量提示词完成分析，输出每事件的提示词/回复字符数、
+请求数和折算到每千事件的耗时。模拟服务按回复长度追加延迟，近似模型生成耗时。
+不读写数据库（不经过 LLM 缓存），批量回复中缺失的事件按单事件补调并计入耗时。
+
+用法:
+    python scripts/benchmark_batch_prompts.py --events 400 --concurrency 20 --batch-sizes 1 4 8 16
+"""
+import sys
+import os
+import asyncio
+import random
+import socket
+import time
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+import httpx
+import uvicorn
+
+from app.config import settings
+from app.services.ai_service import AIService, _extract_json
+from mock_llm_server import create_app
+
+SUBJECTS = ["央行", "工信部", "宁德时代", "比亚迪", "中芯国际", "贵州茅台", "光伏板块", "半导体板块", "锂电池", "稀土"]
+ACTIONS = ["宣布", "发布", "披露", "获得", "签订", "回购", "减持", "预增", "下调", "启动"]
+OBJECTS = ["降准0.25个百分点", "新能源汽车下乡方案", "一季度业绩预告", "20亿元订单", "股份回购计划",
+           "产能扩张项目", "价格上调通知", "重大资产重组", "行业支持政策", "海外合作协议"]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_telegraphs(n: int, seed: int) -> list:
+    """生成 n 条财联社电报风格的短事件"""
+    rng = random.Random(seed)
+    events = []
+    for i in range(n):
+        subject, action, obj = rng.choice(SUBJECTS), rng.choice(ACTIONS), rng.choice(OBJECTS)
+        title = f"{subject}{action}{obj}"
+        content = f"【{title}】财联社电报，{subject}今日{action}{obj}，编号{i}，" + "市场关注后续进展。" * rng.randint(1, 6)
+        events.append({"title": title, "content": content})
+    return events
+
+
+async def _run(service: AIService, events: list, batch_size: int, concurrency: int, base_url: str) -> None:
+    async with httpx.AsyncClient(base_url=base_url) as admin:
+        await admin.post("/stats/reset")
+    semaphore = asyncio.Semaphore(concurrency)
+    fallbacks = 0
+
+    async def single(event: dict) -> None:
+        prompt = service._build_prompt(event["title"], event["content"], True)
+        _extract_json(await service._call_model(prompt))
+
+    async def batch(group: list) -> None:
+        nonlocal fallbacks
+        replies = await service._complete_batch(group, True)
+        for event, raw in zip(group, replies):
+            if raw is None:
+                fallbacks += 1
+                await single(event)
+
+    async def one(group: list) -> None:
+        async with semaphore:
+            if len(group) == 1:
+                await single(group[0])
+            else:
+                await batch(group)
+
+    groups = [events[i:i + batch_size] for i in range(0, len(events), batch_size)]
+    start = time.perf_counter()
+    await asyncio.gather(*(one(group) for group in groups))
+    elapsed = time.perf_counter() - start
+
+    async with httpx.AsyncClient(base_url=base_url) as admin:
+        stats = (await admin.get("/stats")).json()
+    n = len(events)
+    print(
+        f"batch={batch_size:<4} requests {stats['requests']:>5}  "
+        f"prompt {stats['prompt_chars'] / n:>7.0f} chars/event  "
+        f"reply {stats['completion_chars'] / n:>5.0f} chars/event  "
+        f"{elapsed * 1000 / n:>7.2f}s per 1k events  fallbacks {fallbacks}"
+    )
+
+
+async def main(n_events: int, concurrency: int, batch_sizes: list, latency: float, latency_per_char: float, seed: int):
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_app(latency, latency_per_char=latency_per_char),
+            host="127.0.0.1",
+            port=port,
+            log_level="warning",
+            timeout_keep_alive=30,
+        )
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    settings.zhipu_api_key = settings.zhipu_api_key or "mock"
+    settings.ai_base_url = base_url
+    service = AIService()
+    events = build_telegraphs(n_events, seed)
+
+    print(f"{'='*60}")
+    print(
+        f"events={n_events} concurrency={concurrency} "
+        f"latency={latency}s + {latency_per_char}s/char"
+    )
+    print(f"{'='*60}")
+    try:
+        for batch_size in batch_sizes:
+            await _run(service, events, batch_size, concurrency, base_url)
+    finally:
+        await service.client.aclose()
+        server.should_exit = True
+        await server_task
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="多事件批量提示词基准")
+    parser.add_argument("--events", type=int, default=400, help="合成短事件数")
+    parser.add_argument("--concurrency", type=int, default=20, help="同时在途请求上限")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16], help="对比的 batch size")
+    parser.add_argument("--latency", type=float, default=0.3, help="模拟服务固定延迟（秒）")
+    parser.add_argument("--latency-per-char", type=float, default=0.001, help="按回复字符数追加的延迟（秒/字符）")
+    parser.add_argument("--seed", type=int, default=7)
+
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.concurrency, args.batch_sizes, args.latency, args.latency_per_char, args.seed))
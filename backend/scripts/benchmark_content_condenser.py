@@ -0,0 +1,185 @@
+"""
+LLM 输入正文压缩基准
+在公告语料上比较三种送入模型的正文：
+1. 原入库路径的盲截断 content[:3000]
+2. 与压缩预算相同 token 数的前缀截断
+3. content_condenser 压缩结果
+输出每次调用的平均 token 数、保留的信号量（财务关键词 + 带单位数字命中）、
+每千 token 信号量、带单位数字召回率（原文中不同的金额/比例有多少保留下来）以及压缩耗时。
+
+语料可以是一个目录（*.pdf 用 pdf_service 解析，*.txt 直接读取），
+也可以从数据库读取正文最长的交易所公告。不指定语料时使用 scripts/fixtures/notices 下
+随仓库附带的匿名化公告节选。
+
+目录中的 key_facts.json（{文件名: [关键事实]}）列出各公告必须保留的金额、比例、日期和交易对方，
+压缩结果（忽略空白）缺少任何一项时列出缺失项并以非零状态退出。
+
+用法:
+    python scripts/benchmark_content_condenser.py
+    python scripts/benchmark_content_condenser.py --fixtures ./notice_pdfs
+    python scripts/benchmark_content_condenser.py --from-db 200 --budget 1500
+"""
+import sys
+import os
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+from app.config import settings
+from app.services.content_condenser import (
+    FINANCE_MATCHER,
+    _FIGURE_RE,
+    condense_content,
+    estimate_tokens,
+    truncate_to_budget,
+)
+
+# 原入库路径送入模型的字符数
+LEGACY_CHARS = 3000
+
+EXCHANGE_SOURCES = ["上海证券交易所", "深圳证券交易所", "北京证券交易所"]
+
+# 随仓库附带的匿名化公告节选
+FIXTURES_DIR = os.path.join(backend_dir, "scripts", "fixtures", "notices")
+KEY_FACTS_FILE = "key_facts.json"
+
+
+def load_fixtures(directory: str) -> List[Tuple[str, str]]:
+    """读取目录下的 *.pdf / *.txt，返回 (文件名, 正文)"""
+    docs = []
+    for path in sorted(Path(directory).iterdir()):
+        if path.suffix.lower() == ".pdf":
+            from app.services.pdf_service import pdf_service
+
+            text = pdf_service.parse_pdf_text(path)
+        elif path.suffix.lower() == ".txt":
+            text = path.read_text(encoding="utf-8")
+        else:
+            continue
+        if text.strip():
+            docs.append((path.name, text))
+    return docs
+
+
+def load_key_facts(directory: str) -> Dict[str, List[str]]:
+    """读取目录下的 key_facts.json，不存在时为空"""
+    path = Path(directory) / KEY_FACTS_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+async def load_from_db(limit: int) -> List[Tuple[str, str]]:
+    """读取正文最长的交易所公告"""
+    from app.core.database import close_mongo_connection, connect_to_mongo, get_database
+    from app.services.content_store import content_store
+
+    await connect_to_mongo()
+    try:
+        # 只有外置正文的长公告记录 content_length，按它倒序即先取最长的
+        events = await get_database().events.find(
+            {"source": {"$in": EXCHANGE_SOURCES}},
+            {"title": 1, "content": 1, "content_ref": 1, "content_length": 1},
+        ).sort("content_length", -1).limit(limit).to_list(limit)
+        await content_store.hydrate(events)
+        return [(event.get("title", str(event["_id"]))[:30], event.get("content") or "") for event in events]
+    finally:
+        await close_mongo_connection()
+
+
+def signal(text: str) -> float:
+    return sum(FINANCE_MATCHER.counts(text)) + len(_FIGURE_RE.findall(text))
+
+
+def figures(text: str) -> set:
+    # 去掉空白再匹配，避免 PDF 折行把 "4.\n4亿元" 拆成两个数字
+    return set(_FIGURE_RE.findall("".join(text.split())))
+
+
+def report(name: str, docs: List[Tuple[str, str]], outputs: List[str], elapsed: float = None) -> None:
+    n = len(docs)
+    tokens = sum(estimate_tokens(out) for out in outputs)
+    sig = sum(signal(out) for out in outputs)
+    recalls = []
+    for (_, full), out in zip(docs, outputs):
+        full_figures = figures(full)
+        if full_figures:
+            recalls.append(len(full_figures & figures(out)) / len(full_figures))
+    recall = sum(recalls) / len(recalls) if recalls else 0.0
+    timing = f"  {elapsed * 1000 / n:>6.2f} ms/doc" if elapsed is not None else ""
+    print(
+        f"{name:<26} {tokens / n:>7.0f} tok/call  signal {sig / n:>6.1f}  "
+        f"{sig * 1000 / max(tokens, 1):>6.1f} /1k tok  figure recall {recall:>6.1%}{timing}"
+    )
+
+
+def check_key_facts(docs: List[Tuple[str, str]], outputs: List[str], key_facts: Dict[str, List[str]]) -> bool:
+    """逐篇检查关键事实是否保留在压缩结果中，返回是否全部保留"""
+    ok = True
+    checked = 0
+    for (name, _), out in zip(docs, outputs):
+        facts = key_facts.get(name)
+        if not facts:
+            continue
+        checked += len(facts)
+        text = "".join(out.split())
+        missing = [fact for fact in facts if "".join(fact.split()) not in text]
+        if missing:
+            ok = False
+            print(f"  {name}: 缺失 {', '.join(missing)}")
+    if checked:
+        print(f"key facts: {'全部保留' if ok else '存在缺失'}（共检查 {checked} 项）")
+    return ok
+
+
+def main(docs: List[Tuple[str, str]], budget: int, key_facts: Dict[str, List[str]]) -> bool:
+    if not docs:
+        print("语料为空：请通过 --fixtures 指定公告 PDF/TXT 目录，或使用 --from-db")
+        sys.exit(1)
+
+    full_tokens = sum(estimate_tokens(text) for _, text in docs) / len(docs)
+    print(f"{'='*60}")
+    print(f"documents={len(docs)} avg full text={full_tokens:.0f} tok budget={budget} tok")
+    print(f"{'='*60}")
+
+    report(f"content[:{LEGACY_CHARS}]", docs, [text[:LEGACY_CHARS] for _, text in docs])
+    report("prefix within budget", docs, [truncate_to_budget(text, budget) for _, text in docs])
+    start = time.perf_counter()
+    condensed = [condense_content(text, budget) for _, text in docs]
+    elapsed = time.perf_counter() - start
+    report("condense_content", docs, condensed, elapsed)
+    print(f"{'='*60}")
+    ok = check_key_facts(docs, condensed, key_facts)
+    if key_facts:
+        print(f"{'='*60}")
+    return ok
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="LLM 输入正文压缩基准")
+    parser.add_argument(
+        "--fixtures",
+        type=str,
+        default=None,
+        help="公告语料目录（*.pdf / *.txt，可附 key_facts.json）；未指定且不读数据库时使用 scripts/fixtures/notices",
+    )
+    parser.add_argument("--from-db", type=int, default=0, help="从数据库读取正文最长的 N 条交易所公告")
+    parser.add_argument(
+        "--budget", type=int, default=settings.ai_content_token_budget, help="压缩 token 预算"
+    )
+
+    args = parser.parse_args()
+    fixtures = args.fixtures or (None if args.from_db else FIXTURES_DIR)
+    corpus = load_fixtures(fixtures) if fixtures else []
+    if args.from_db:
+        corpus += asyncio.run(load_from_db(args.from_db))
+    if not main(corpus, args.budget, load_key_facts(fixtures) if fixtures else {}):
+        sys.exit(1)
@@ -0,0 +1,283 @@
+"""
+索引覆盖基准测试
+向本地 MongoDB 的独立测试库写入合成数据，创建索引后对每一类热点查询执行 explain()，
+断言获胜执行计划中不存在 COLLSCAN，并输出各查询的耗时与扫描量。
+
+用法:
+    python scripts/benchmark_indexes.py --events 200000
+"""
+import sys
+import os
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.config import settings
+from app.core.indexes import ensure_indexes
+from app.services.database_service import make_dedupe_key
+from app.services.radar_scoring import MAX_FRESHNESS_BONUS, RADAR_SCORE_VERSION, compute_static_scores
+from app.services.search_service import build_search_fields, query_terms, search_filter
+
+CATEGORIES = ["global_macro", "policy", "industry", "company"]
+EVENT_TYPES = ["fin_perf", "order_contract", "buyback", "holder_change", "risk_crisis", "ops_info", "other"]
+TITLE_WORDS = ["回购", "业绩预增", "重大合同", "股东减持", "诉讼", "董事会决议", "降息", "中标", "产能扩张", "立案调查"]
+
+
+def _synthetic_event(i: int, now: datetime) -> dict:
+    date = now - timedelta(minutes=random.randint(0, 60 * 24 * 365))
+    title = f"{random.choice(TITLE_WORDS)}公告{i}"
+    content = "".join(random.choice(TITLE_WORDS) for _ in range(20))
+    stock_code = f"{600000 + i % 3000}"
+    doc = {
+        "title": title,
+        "content": content,
+        "event_category": random.choice(CATEGORIES),
+        "event_types": random.sample(EVENT_TYPES, k=random.randint(1, 2)),
+        "announcement_date": date,
+        "source": "上海证券交易所",
+        "stock_code": stock_code,
+        "dedupe_key": make_dedupe_key(title, date, stock_code),
+        "created_at": now,
+        "updated_at": now,
+    }
+    if random.random() < 0.8:
+        doc["ai_analysis"] = {
+            "impact_score": round(random.random(), 3),
+            "sentiment_score": round(random.uniform(-1, 1), 3),
+            "confidence_score": round(random.random(), 3),
+            "affected_sectors": [{"name": "板块", "code": f"BK{random.randint(1, 300):04d}"}],
+            "affected_stocks": [{"name": "股票", "code": stock_code}],
+        }
+    doc.update(build_search_fields(title, content))
+    doc["radar"] = compute_static_scores(doc)
+    return doc
+
+
+async def seed(db, n_events: int, batch_size: int = 5000):
+    """写入合成数据"""
+    now = datetime.utcnow()
+    print(f"写入 {n_events} 条合成事件...")
+    for start in range(0, n_events, batch_size):
+        docs = [_synthetic_event(i, now) for i in range(start, min(start + batch_size, n_events))]
+        await db.events.insert_many(docs, ordered=False)
+
+    users = [
+        {
+            "username": f"user{i}",
+            "email": f"user{i}@example.com",
+            "phone": f"138{i:08d}" if i % 2 else None,
+            "wechat_openid": f"openid{i}" if i % 3 == 0 else None,
+            "created_at": now,
+        }
+        for i in range(20000)
+    ]
+    await db.users.insert_many(users)
+    await db.sms_codes.insert_many([
+        {"phone": f"138{i % 5000:08d}", "code": "000000", "created_at": now - timedelta(seconds=i), "used": False}
+        for i in range(20000)
+    ])
+    await db.payment_orders.insert_many([
+        {"out_trade_no": f"T{i:012d}", "user_id": ObjectId(), "status": "pending", "created_at": now}
+        for i in range(20000)
+    ])
+    await db.wechat_login_states.insert_many([
+        {"state": f"state{i}", "created_at": now, "used": False} for i in range(20000)
+    ])
+    await db.sectors.insert_many([{"code": f"BK{i:04d}", "name": f"板块{i}"} for i in range(1, 301)])
+    await db.event_rollups.insert_many([
+        {
+            "_id": f"day|sector|BK{i % 300 + 1:04d}|{i}",
+            "granularity": "day",
+            "dimension": "sector",
+            "key": f"BK{i % 300 + 1:04d}",
+            "bucket": now - timedelta(days=i // 300),
+            "count": 1,
+        }
+        for i in range(300 * 365)
+    ])
+    await db.stocks.insert_many([{"code": f"{600000 + i}", "name": f"股票{i}"} for i in range(3000)])
+    await db.llm_cache.insert_many([
+        {
+            "_id": f"{i:040x}",
+            "model": settings.ai_model,
+            "result": {},
+            "created_at": now - timedelta(seconds=random.randint(0, 30 * 86400)),
+        }
+        for i in range(min(n_events, 100000))
+    ])
+    await db.analysis_jobs.insert_many([
+        {
+            "status": random.choice(["queued", "leased", "done", "done", "done"]),
+            "priority": random.uniform(400000, 500000),
+            "batchable": random.random() < 0.5,
+            "attempts": 1,
+            "available_at": now - timedelta(seconds=random.randint(0, 86400)),
+            "lease_expires_at": now + timedelta(seconds=random.randint(-600, 600)),
+        }
+        for _ in range(min(n_events, 100000))
+    ])
+
+
+def _hot_queries(now: datetime):
+    """与 services/routers 中真实查询形状一致的查询列表: (名称, 集合, 过滤, 排序)"""
+    recent = now - timedelta(days=3)
+    date_sort = [("announcement_date", -1), ("_id", -1)]
+    terms = query_terms("回购")
+    return [
+        ("get_events 默认", "events", {}, date_sort),
+        ("get_events 日期范围", "events", {"announcement_date": {"$gte": recent}}, date_sort),
+        ("get_events 分类", "events", {"event_category": "policy"}, date_sort),
+        ("get_events 事件类型", "events", {"event_types": {"$in": ["buyback"]}}, date_sort),
+        ("get_events 影响分", "events", {"ai_analysis.impact_score": {"$gte": 0.9}}, None),
+        ("get_events 游标", "events", {
+            "$or": [
+                {"announcement_date": {"$lt": recent}},
+                {"announcement_date": recent, "_id": {"$lt": ObjectId()}},
+            ]
+        }, date_sort),
+        ("get_events 检索", "events", search_filter(terms), date_sort),
+        # 雷达排名聚合管道的首个 $match（排序字段在管道中计算，无法走索引排序）：
+        # 每个窗口一次的快照扫描，以及 top-events 带 min_relevance 时的计数
+        ("radar snapshot $match", "events", {
+            "radar.version": RADAR_SCORE_VERSION,
+            "announcement_date": {"$gte": now - timedelta(hours=72)},
+        }, None),
+        ("radar top-events count $match", "events", {
+            "radar.version": RADAR_SCORE_VERSION,
+            "radar.relevance_base": {"$gte": 50 - MAX_FRESHNESS_BONUS - 0.01},
+            "announcement_date": {"$gte": now - timedelta(days=30)},
+        }, None),
+        # get_events_updated_since: 雷达推送轮询游标
+        ("radar feed updated_at poll", "events", {
+            "$or": [
+                {"updated_at": {"$gt": now - timedelta(seconds=5)}},
+                {"updated_at": now - timedelta(seconds=5), "_id": {"$gt": ObjectId()}},
+            ]
+        }, [("updated_at", 1), ("_id", 1)]),
+        # analysis_queue.enqueue_backlog: 待分析事件（带 --days 和不带）
+        ("enqueue_backlog", "events", {
+            "ai_analysis": None, "ai_status": {"$ne": "failed"},
+            "announcement_date": {"$gte": now - timedelta(days=7)},
+        }, date_sort),
+        ("enqueue_backlog 全量", "events", {"ai_analysis": None, "ai_status": {"$ne": "failed"}}, date_sort),
+        ("get_events_by_sector", "events", {"ai_analysis.affected_sectors.code": "BK0001"}, [("announcement_date", -1)]),
+        ("get_events_by_stock", "events", {"ai_analysis.affected_stocks.code": "600001"}, [("announcement_date", -1)]),
+        ("get_event_by_title_date", "events", {
+            "title": "回购公告1",
+            "announcement_date": {"$gte": recent, "$lte": now},
+        }, None),
+        ("dedupe_key 批量查重", "events", {"dedupe_key": {"$in": ["a" * 40, "b" * 40]}}, None),
+        ("trend series", "event_rollups", {
+            "granularity": "day", "dimension": "sector", "key": "BK0001",
+            "bucket": {"$gte": now - timedelta(days=365)},
+        }, [("bucket", 1)]),
+        ("radar heat", "event_rollups", {
+            "granularity": "hour", "dimension": "sector",
+            "bucket": {"$gte": now - timedelta(hours=72), "$lt": now},
+        }, None),
+        ("sector by code", "sectors", {"code": "BK0001"}, None),
+        ("stock by code", "stocks", {"code": "600001"}, None),
+        ("user by email", "users", {"email": "user1@example.com"}, None),
+        ("user by username", "users", {"username": "user1"}, None),
+        ("user by phone", "users", {"phone": "13800000001"}, None),
+        ("user by wechat_openid", "users", {"wechat_openid": "openid3"}, None),
+        ("sms code latest", "sms_codes", {"phone": "13800000001"}, [("created_at", -1)]),
+        ("wechat login state", "wechat_login_states", {"state": "state1"}, None),
+        ("order by out_trade_no", "payment_orders", {"out_trade_no": "T000000000001"}, None),
+        # llm_cache.prune: 过期淘汰与超量时定位第 N 旧的条目
+        ("llm_cache prune expired", "llm_cache", {"created_at": {"$lt": now - timedelta(days=7)}}, None),
+        ("llm_cache prune oldest", "llm_cache", {}, [("created_at", 1)]),
+        ("analysis job lease", "analysis_jobs", {
+            "status": "queued", "available_at": {"$lte": now},
+        }, [("priority", -1)]),
+        ("analysis job lease (batchable)", "analysis_jobs", {
+            "status": "queued", "available_at": {"$lte": now}, "batchable": True,
+        }, [("priority", -1)]),
+        ("analysis job reclaim", "analysis_jobs", {
+            "status": "leased", "lease_expires_at": {"$lte": now},
+        }, None),
+        ("analysis queue oldest wait", "analysis_jobs", {
+            "status": "queued", "available_at": {"$lte": now},
+        }, [("available_at", 1)]),
+    ]
+
+
+def _stages(plan: dict):
+    """递归收集执行计划中的所有 stage"""
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        if "stage" in node:
+            yield node["stage"]
+        for key in ("inputStage", "queryPlan"):
+            if key in node:
+                stack.append(node[key])
+        stack.extend(node.get("inputStages", []))
+
+
+async def run_benchmark(db) -> bool:
+    """执行 explain 检查，返回是否全部命中索引"""
+    now = datetime.utcnow()
+    ok = True
+    print(f"{'='*80}")
+    print(f"{'查询':<28} {'计划':<10} {'docsExamined':>12} {'keysExamined':>12} {'ms':>8}")
+    print(f"{'='*80}")
+    for name, collection, query, sort in _hot_queries(now):
+        cursor = db[collection].find(query).limit(20)
+        if sort:
+            cursor = cursor.sort(sort)
+        start = time.perf_counter()
+        explain = await cursor.explain()
+        elapsed = (time.perf_counter() - start) * 1000
+
+        stages = set(_stages(explain["queryPlanner"]["winningPlan"]))
+        stats = explain.get("executionStats", {})
+        collscan = "COLLSCAN" in stages
+        ok = ok and not collscan
+        plan = "COLLSCAN" if collscan else "IXSCAN"
+        print(
+            f"{name:<28} {plan:<10} {stats.get('totalDocsExamined', '-'):>12} "
+            f"{stats.get('totalKeysExamined', '-'):>12} {elapsed:>8.1f}"
+        )
+    print(f"{'='*80}")
+    return ok
+
+
+async def main(n_events: int, keep: bool):
+    client = AsyncIOMotorClient(settings.mongodb_url)
+    db = client[f"{settings.database_name}_index_bench"]
+    try:
+        await client.drop_database(db.name)
+        await seed(db, n_events)
+        await ensure_indexes(db)
+        ok = await run_benchmark(db)
+    finally:
+        if not keep:
+            await client.drop_database(db.name)
+        client.close()
+
+    if not ok:
+        print("存在未命中索引的热点查询 (COLLSCAN)")
+        sys.exit(1)
+    print("所有热点查询均命中索引")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="索引覆盖基准测试")
+    parser.add_argument("--events", type=int, default=100000, help="合成事件数量")
+    parser.add_argument("--keep", action="store_true", help="保留测试库")
+
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.keep))
@@ -0,0 +1,148 @@
+"""
+关键词匹配回归与基准测试
+1. 回归：在合成语料（可选追加数据库中的真实事件）上校验 KeywordMatcher 的两种计数方式
+   与原实现（逐词 str.count）结果完全一致，不一致时以非零状态退出
+2. 基准：不同文本长度与词典规模下逐词 str.count 与自动机扫描的耗时，
+   用于确定 AUTOMATON_MIN_TERMS
+
+用法:
+    python scripts/benchmark_keyword_matcher.py
+    python scripts/benchmark_keyword_matcher.py --db-events 2000
+"""
+import sys
+import os
+import asyncio
+import random
+import time
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+from app.services.keyword_matcher import AUTOMATON_MIN_TERMS, KeywordMatcher
+from app.services.radar_scoring import (
+    NEGATIVE_KEYWORDS,
+    POSITIVE_KEYWORDS,
+    SENTIMENT_MATCHER,
+    _keyword_sentiment,
+)
+
+FILLER = "公司本报告期内营业收入同比主要原因系市场需求变化及成本上涨所致，。；风险提示 investors Note: "
+
+
+def legacy_counts(text: str, terms) -> list:
+    """原实现：整体小写后逐词 str.count"""
+    t = text.lower()
+    return [t.count(word.lower()) for word in terms]
+
+
+def legacy_sentiment(text: str) -> float:
+    t = text.lower()
+    pos = sum(t.count(word.lower()) for word in POSITIVE_KEYWORDS)
+    neg = sum(t.count(word.lower()) for word in NEGATIVE_KEYWORDS)
+    if pos == 0 and neg == 0:
+        return 0.0
+    return max(-1.0, min(1.0, (pos - neg) / (pos + neg + 1.0)))
+
+
+def synthetic_corpus(size: int) -> list:
+    keywords = POSITIVE_KEYWORDS + NEGATIVE_KEYWORDS
+    variants = keywords + [word.upper() for word in keywords] + [word.capitalize() for word in keywords]
+    pieces = variants + list(FILLER) + ["低于预期低于", "增长增长", "riskrisk", "upgradedowngrade"]
+    corpus = ["", "风险", "RISK", "İstanbul risk"]
+    for _ in range(size):
+        corpus.append("".join(random.choices(pieces, k=random.randint(1, 200))))
+    return corpus
+
+
+async def db_corpus(limit: int) -> list:
+    from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+    from app.services.content_store import content_store
+
+    await connect_to_mongo()
+    try:
+        events = [
+            event async for event in get_database().events.find(
+                {}, {"title": 1, "content": 1, "content_ref": 1, "event_types": 1}
+            ).sort("_id", -1).limit(limit)
+        ]
+        await content_store.hydrate(events)
+    finally:
+        await close_mongo_connection()
+    corpus = []
+    for event in events:
+        corpus.append(f"{event.get('title', '')}\n{event.get('content', '')}")
+        corpus.append(" ".join(event.get("event_types") or []))
+    return corpus
+
+
+def check_regression(corpus) -> bool:
+    terms = POSITIVE_KEYWORDS + NEGATIVE_KEYWORDS
+    mismatches = 0
+    for text in corpus:
+        expected = legacy_counts(text, terms)
+        counted = SENTIMENT_MATCHER.counts(text)[: len(terms)]
+        scanned = SENTIMENT_MATCHER.scan(text)[: len(terms)]
+        if counted != expected or scanned != expected:
+            mismatches += 1
+        elif _keyword_sentiment(text) != legacy_sentiment(text):
+            mismatches += 1
+    print(f"回归校验: {len(corpus)} 条文本, 不一致 {mismatches} 条")
+    return mismatches == 0
+
+
+def _timeit(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(lengths, lexicon_sizes):
+    chars = FILLER[:30] + "重大合同中标回购减持诉讼亏损增长"
+    base_text = "".join(random.choices(list(FILLER) + POSITIVE_KEYWORDS + NEGATIVE_KEYWORDS, k=max(lengths)))
+    print(f"{'='*72}")
+    print(f"{'文本长度':>10} {'词条数':>8} {'str.count ms':>14} {'自动机 ms':>12} {'较快方式':>10}")
+    print(f"{'='*72}")
+    for size in lexicon_sizes:
+        extra = max(0, size - len(POSITIVE_KEYWORDS) - len(NEGATIVE_KEYWORDS))
+        patterns = [(word, 1.0) for word in POSITIVE_KEYWORDS] + [(word, -1.0) for word in NEGATIVE_KEYWORDS]
+        patterns += [
+            ("".join(random.choices(chars, k=random.randint(2, 4))), random.choice([1.0, -1.0]))
+            for _ in range(extra)
+        ]
+        matcher = KeywordMatcher(patterns)
+        for length in lengths:
+            text = base_text[:length]
+            counted = _timeit(lambda: legacy_counts(text, matcher.terms))
+            scanned = _timeit(lambda: matcher.scan(text))
+            faster = "自动机" if scanned < counted else "str.count"
+            print(f"{length:>10} {len(matcher.terms):>8} {counted * 1000:>14.3f} {scanned * 1000:>12.3f} {faster:>10}")
+    print(f"{'='*72}")
+    print(f"当前 AUTOMATON_MIN_TERMS = {AUTOMATON_MIN_TERMS}")
+
+
+def main(args):
+    random.seed(args.seed)
+    corpus = synthetic_corpus(args.corpus_size)
+    if args.db_events:
+        corpus += asyncio.run(db_corpus(args.db_events))
+    ok = check_regression(corpus)
+    run_benchmark(args.lengths, args.lexicon_sizes)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="关键词匹配回归与基准测试")
+    parser.add_argument("--corpus-size", type=int, default=5000, help="合成回归语料数量")
+    parser.add_argument("--db-events", type=int, default=0, help="追加数据库中最近 N 条事件作为回归语料")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1000, 10000, 100000], help="基准文本长度")
+    parser.add_argument("--lexicon-sizes", type=int, nargs="+", default=[20, 64, 200, 2000], help="基准词典规模")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+
+    main(parser.parse_args())
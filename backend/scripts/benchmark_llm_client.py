@@ -0,0 +1,109 @@
+"""
+LLM 客户端并发基准
+在本进程内启动模拟服务（scripts/mock_llm_server.py），分别用
+1. 原方式：zai SDK 同步调用 + asyncio.to_thread
+2. ZhipuChatClient：共享连接池的原生异步请求
+发出相同数量的请求，比较总耗时和服务端观测到的最大同时在途请求数
+
+用法:
+    python scripts/benchmark_llm_client.py --requests 400 --concurrency 200 --latency 0.5
+"""
+import sys
+import os
+import asyncio
+import socket
+import time
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+import httpx
+import uvicorn
+
+from app.services.llm_client import ZhipuChatClient
+from mock_llm_server import create_app
+
+MODEL = "glm-4.7-flash"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _run(name: str, call, n_requests: int, concurrency: int, base_url: str) -> None:
+    async with httpx.AsyncClient(base_url=base_url) as admin:
+        await admin.post("/stats/reset")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            await call(f"公告 {name} {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    elapsed = time.perf_counter() - start
+
+    async with httpx.AsyncClient(base_url=base_url) as admin:
+        after = (await admin.get("/stats")).json()
+    print(
+        f"{name:<28} {elapsed:>8.2f}s  {n_requests / elapsed:>8.1f} req/s  "
+        f"max in-flight {after['max_in_flight']:>4}  errors {after['errors']}"
+    )
+
+
+async def main(n_requests: int, concurrency: int, latency: float):
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = uvicorn.Server(
+        uvicorn.Config(create_app(latency), host="127.0.0.1", port=port, log_level="warning", timeout_keep_alive=30)
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    print(f"{'='*60}")
+    print(f"requests={n_requests} concurrency={concurrency} latency={latency}s")
+    print(f"{'='*60}")
+    try:
+        from zai import ZhipuAiClient
+
+        sdk = ZhipuAiClient(api_key="mock", base_url=base_url)
+
+        def sdk_call(prompt: str) -> str:
+            response = sdk.chat.completions.create(
+                model=MODEL, messages=[{"role": "user", "content": prompt}], temperature=0.1
+            )
+            return response.choices[0].message.content
+
+        async def threaded(prompt: str) -> str:
+            return await asyncio.to_thread(sdk_call, prompt)
+
+        await _run("zai SDK + to_thread", threaded, n_requests, concurrency, base_url)
+
+        client = ZhipuChatClient(api_key="mock", base_url=base_url, max_connections=concurrency)
+
+        async def native(prompt: str) -> str:
+            return await client.chat([{"role": "user", "content": prompt}], model=MODEL, temperature=0.1)
+
+        await _run("ZhipuChatClient (async)", native, n_requests, concurrency, base_url)
+        await client.aclose()
+    finally:
+        server.should_exit = True
+        await server_task
+    print(f"{'='*60}")
+    print("SDK 方式的同时在途请求数受默认线程池大小限制")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="LLM 客户端并发基准")
+    parser.add_argument("--requests", type=int, default=400, help="请求总数")
+    parser.add_argument("--concurrency", type=int, default=200, help="同时在途请求上限")
+    parser.add_argument("--latency", type=float, default=0.5, help="模拟服务延迟（秒）")
+
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.latency))
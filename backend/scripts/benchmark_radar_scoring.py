@@ -0,0 +1,158 @@
+"""
+雷达批量打分基准测试
+用合成事件校验 compute_event_scores_batch 与逐条 compute_event_scores 结果完全一致，
+并输出 1k / 10k / 100k 事件下的单事件耗时：逐条实现、批量实现，以及批量实现中
+列提取、NumPy 核心计算和结果展开各自的耗时。分别测量未持久化静态评分的事件
+和带 radar 字段的事件（雷达接口的实际读取路径）。校验失败时以非零状态退出。
+
+用法:
+    python scripts/benchmark_radar_scoring.py
+    python scripts/benchmark_radar_scoring.py --sizes 1000 10000 100000 --seed 7
+"""
+import sys
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+import numpy as np
+
+from app.services.radar_scoring import (
+    CATEGORY_IMPACT_BASE,
+    NEGATIVE_KEYWORDS,
+    POSITIVE_KEYWORDS,
+    build_event_columns,
+    compute_event_scores,
+    compute_event_scores_batch,
+    compute_market_index,
+    compute_market_index_batch,
+    compute_scores_batch,
+    compute_static_scores,
+    score_dicts,
+)
+
+SOURCES = ["上海证券交易所", "深交所", "北交所", "证监会", "财联社电报", "Reuters", "unknown", None]
+EVENT_TYPES = ["fin_perf", "order_contract", "buyback", "holder_change", "risk_crisis", "ops_info", "other"]
+FILLER = ["公司", "公告", "董事会", "经营", "项目", "股东", "市场"]
+
+
+def _synthetic_event(now: datetime) -> dict:
+    words = random.choices(POSITIVE_KEYWORDS + NEGATIVE_KEYWORDS + FILLER * 3, k=random.randint(0, 40))
+    event = {
+        "title": "".join(random.choices(FILLER + POSITIVE_KEYWORDS, k=3)),
+        "content": "".join(words),
+        "event_category": random.choice(list(CATEGORY_IMPACT_BASE) + [None, "unknown"]),
+        "event_types": random.sample(EVENT_TYPES, k=random.randint(0, 4)),
+        "source": random.choice(SOURCES),
+        "announcement_date": (
+            now - timedelta(seconds=random.randint(-3600, 200 * 3600), microseconds=random.randint(0, 999999))
+            if random.random() < 0.97 else None
+        ),
+    }
+    if random.random() < 0.5:
+        event["content_length"] = random.randint(0, 50000)
+    roll = random.random()
+    if roll < 0.7:
+        event["ai_analysis"] = {
+            # 有意包含越界值、缺失置信度和整数分
+            "impact_score": round(random.uniform(-0.1, 1.1), random.choice([1, 2, 3, 6])),
+            "sentiment_score": random.choice([round(random.uniform(-1.2, 1.2), 3), 0, 1, -1, 0.2, -0.2]),
+            "confidence_score": random.choice([round(random.random(), 3), None]),
+        }
+    elif roll < 0.8:
+        event["ai_analysis"] = {"impact_score": None, "sentiment_score": 0.5}
+    return event
+
+
+def check_parity(events, now) -> bool:
+    """逐条结果与批量结果逐字段比较"""
+    scalar = [compute_event_scores(event, now) for event in events]
+    batch = compute_event_scores_batch(events, now)
+    mismatches = [i for i, (a, b) in enumerate(zip(scalar, batch)) if a != b]
+    for i in mismatches[:5]:
+        print(f"  不一致 #{i}:\n    scalar={scalar[i]}\n    batch ={batch[i]}")
+
+    index_scalar = compute_market_index(scalar)
+    index_batch = compute_market_index_batch(
+        np.array([item["sentiment_score"] for item in batch]),
+        np.array([item["confidence_score"] for item in batch]),
+    )
+    index_ok = round(index_scalar, 2) == round(index_batch, 2) and abs(index_scalar - index_batch) < 1e-9
+    if not index_ok:
+        print(f"  市场指数不一致: scalar={index_scalar!r} batch={index_batch!r}")
+    print(f"一致性校验: {len(events)} 条事件, 不一致 {len(mismatches)} 条, 市场指数{'一致' if index_ok else '不一致'}")
+
+    # 持久化的静态评分（radar 字段）必须得到与现算完全相同的结果
+    stored = [{**event, "radar": compute_static_scores(event)} for event in events]
+    stored_scalar = [compute_event_scores(event, now) for event in stored]
+    stored_batch = compute_event_scores_batch(stored, now)
+    stored_mismatches = sum(
+        1 for a, b, c in zip(scalar, stored_scalar, stored_batch) if not (a == b == c)
+    )
+    print(f"静态评分校验: 不一致 {stored_mismatches} 条")
+    return not mismatches and index_ok and not stored_mismatches
+
+
+def _timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(sizes, now):
+    # 两种输入：未持久化静态评分（启发式事件需逐条扫描关键词）与带 radar 字段（雷达接口的实际读取路径）
+    print(f"{'='*96}")
+    print(
+        f"{'输入':<8} {'事件数':>8} {'逐条 us':>10} {'批量 us':>10} {'列提取 us':>11} {'核心 us':>9} "
+        f"{'展开 us':>9} {'加速比':>8}"
+    )
+    print(f"{'='*96}")
+    for size in sizes:
+        raw = [_synthetic_event(now) for _ in range(size)]
+        stored = [{**event, "radar": compute_static_scores(event)} for event in raw]
+        repeat = 5 if size <= 10000 else 2
+        for label, events in (("原始", raw), ("radar", stored)):
+            scalar = _timeit(lambda: [compute_event_scores(event, now) for event in events], repeat)
+            batch = _timeit(lambda: compute_event_scores_batch(events, now), repeat)
+            build = _timeit(lambda: build_event_columns(events, now), repeat)
+            columns = build_event_columns(events, now)
+            core = _timeit(lambda: compute_scores_batch(columns), repeat)
+            scores = compute_scores_batch(columns)
+            expand = _timeit(lambda: score_dicts(scores), repeat)
+            print(
+                f"{label:<8} {size:>8} {scalar / size * 1e6:>10.2f} {batch / size * 1e6:>10.2f} "
+                f"{build / size * 1e6:>11.2f} {core / size * 1e6:>9.3f} {expand / size * 1e6:>9.2f} "
+                f"{scalar / batch:>7.1f}x"
+            )
+    print(f"{'='*96}")
+    print("us 均为单事件耗时；批量 = 列提取 + 核心 + 展开。原始输入的列提取以无分析事件的关键词扫描为主，")
+    print("核心计算远快于逐条实现，但端到端加速受限于逐事件读取字段和生成结果字典")
+
+
+def main(sizes, seed: int, parity_size: int):
+    random.seed(seed)
+    now = datetime.utcnow()
+    events = [_synthetic_event(now) for _ in range(parity_size)]
+    ok = check_parity(events, now)
+    run_benchmark(sizes, now)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="雷达批量打分基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="基准事件数量")
+    parser.add_argument("--parity-size", type=int, default=50000, help="一致性校验事件数量")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+
+    args = parser.parse_args()
+    main(args.sizes, args.seed, args.parity_size)
@@ -0,0 +1,81 @@
+"""
+事件检索索引重建工具
+为已有事件计算检索字段（search_terms / search_tf / search_len），并重建全局词频统计
+"""
+import sys
+import os
+import asyncio
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+from pymongo import UpdateOne
+
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.core.indexes import ensure_indexes
+from app.services.content_store import content_store
+from app.services.search_service import build_search_fields, search_service
+
+
+async def rebuild_search_index(batch_size: int = 500, only_missing: bool = False):
+    """重建检索字段与统计"""
+    db = get_database()
+    await ensure_indexes(db)
+
+    query = {"search_terms": {"$exists": False}} if only_missing else {}
+    if not only_missing:
+        await search_service.reset()
+
+    total = await db.events.count_documents(query)
+    print(f"需要处理 {total} 条事件")
+    print(f"{'='*60}")
+
+    processed = 0
+
+    async def flush(events):
+        # 外置正文的事件需先加载完整正文
+        await content_store.hydrate(events)
+        operations = []
+        fields_batch = []
+        for event in events:
+            fields = build_search_fields(event.get("title", ""), event.get("content", ""))
+            operations.append(UpdateOne({"_id": event["_id"]}, {"$set": fields}))
+            fields_batch.append(fields)
+        await db.events.bulk_write(operations, ordered=False)
+        await search_service.register(fields_batch)
+        return len(operations)
+
+    batch = []
+    cursor = db.events.find(query, {"title": 1, "content": 1, "content_ref": 1})
+    async for event in cursor:
+        batch.append(event)
+        if len(batch) >= batch_size:
+            processed += await flush(batch)
+            batch = []
+            print(f"  已处理 {processed}/{total}")
+
+    if batch:
+        processed += await flush(batch)
+
+    print(f"{'='*60}")
+    print(f"重建完成: {processed} 条")
+
+
+async def main(batch_size: int, only_missing: bool):
+    await connect_to_mongo()
+    try:
+        await rebuild_search_index(batch_size=batch_size, only_missing=only_missing)
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="事件检索索引重建工具")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批写入数量")
+    parser.add_argument("--only-missing", action="store_true", help="只处理缺少检索字段的事件")
+
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.only_missing))
@@ -0,0 +1,63 @@
+"""
+长公告全文检索召回检查
+把 scripts/fixtures/notices 中的每篇公告节选接在其余节选拼成的长正文之后
+（超过 SEARCH_INDEX_CONTENT_CHARS，也远超 SEARCH_MAX_CONTENT_TERMS 个词项），
+检查 key_facts.json 中的每项关键事实按 get_events 的检索条件（search_terms $all）仍能召回该事件。
+同时统计这些词项中有多少不在 search_tf 中（只能靠完整的 search_terms 召回）。
+不需要数据库；有事实召回不到时列出缺失项并以非零状态退出。
+
+用法:
+    python scripts/check_search_recall.py
+"""
+import sys
+import os
+import json
+from pathlib import Path
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+from app.config import settings
+from app.services.search_service import build_search_fields, query_terms, search_filter
+
+FIXTURES_DIR = os.path.join(backend_dir, "scripts", "fixtures", "notices")
+
+
+def main(directory: str) -> bool:
+    key_facts = json.loads((Path(directory) / "key_facts.json").read_text(encoding="utf-8"))
+    notices = {name: (Path(directory) / name).read_text(encoding="utf-8") for name in key_facts}
+
+    print(f"{'='*60}")
+    print(
+        f"index window={settings.search_index_content_chars} chars "
+        f"tf terms={settings.search_max_content_terms}"
+    )
+    print(f"{'='*60}")
+    ok = True
+    for name, facts in key_facts.items():
+        filler = "\n".join(text for other, text in notices.items() if other != name)
+        padding = filler * (settings.search_index_content_chars // max(len(filler), 1) + 1)
+        content = f"{padding}\n{notices[name]}"
+        fields = build_search_fields("公告", content)
+        indexed = set(fields["search_terms"])
+
+        missing = []
+        deep = 0
+        for fact in facts:
+            terms = query_terms(fact)
+            if not set(search_filter(terms)["search_terms"]["$all"]) <= indexed:
+                missing.append(fact)
+            deep += sum(term not in fields["search_tf"] for term in terms)
+        ok = ok and not missing
+        status = "OK" if not missing else f"缺失 {', '.join(missing)}"
+        print(f"{name:<32} chars={len(content):>6} terms={len(indexed):>6} deep-only terms={deep:>3}  {status}")
+    print(f"{'='*60}")
+    return ok
+
+
+if __name__ == "__main__":
+    if not main(FIXTURES_DIR):
+        print("存在召回不到的关键事实")
+        sys.exit(1)
+    print("长正文末尾的关键事实均可召回")
@@ -0,0 +1,157 @@
+"""
+例行公告规则分类评估
+在交易所公告样本上统计 rule_classifier 的覆盖率，并以模型分析结果为标注检验规则判定：
+1. 覆盖率：规则命中的公告占比（即可省下的模型调用比例）
+2. 类型一致率：规则给出的事件类型出现在模型给出的 event_types 中的比例
+3. 低影响率：命中公告中模型打分 impact_score 不超过阈值的比例（低于该值说明规则过宽）
+按规则分别输出，并列出模型评分最高的命中公告供人工复核。
+
+样本可以从数据库读取最新的交易所公告（ai_analysis.method 不为 rule 的作为标注），
+也可以读取 JSONL 标注文件，每行包含 title、content、source、bulletin_type、
+event_types 和 impact_score。不指定样本时使用 scripts/fixtures/rule_classifier 下
+人工标注的公告标题与正文节选（例行公告与重大事项各半，含董事、高管辞职暨实际控制人变更等易误判样本）。
+
+用法:
+    python scripts/evaluate_rule_classifier.py
+    python scripts/evaluate_rule_classifier.py --from-db 5000
+    python scripts/evaluate_rule_classifier.py --labels ./labelled_notices.jsonl --threshold 0.3
+"""
+import sys
+import os
+import asyncio
+import json
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+from app.services.rule_classifier import rule_classifier
+
+EXCHANGE_SOURCES = ["上海证券交易所", "深圳证券交易所", "北京证券交易所"]
+FIXTURE_LABELS = os.path.join(backend_dir, "scripts", "fixtures", "rule_classifier", "labelled_notices.jsonl")
+
+
+def _label(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """模型分析结果作为标注；规则结果和旧版零分失败记录不算"""
+    analysis = event.get("ai_analysis") or {}
+    if analysis.get("method") == "rule" or analysis.get("impact_score") is None:
+        return None
+    if str(analysis.get("impact_reason") or "").startswith("AI analysis failed"):
+        return None
+    return {"impact_score": analysis["impact_score"], "event_types": event.get("event_types") or []}
+
+
+def load_labels(path: str) -> List[Dict[str, Any]]:
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            label = None
+            if row.get("impact_score") is not None:
+                label = {"impact_score": row["impact_score"], "event_types": row.get("event_types") or []}
+            samples.append({**row, "label": label})
+    return samples
+
+
+async def load_from_db(limit: int) -> List[Dict[str, Any]]:
+    """读取最新的交易所公告"""
+    from app.core.database import close_mongo_connection, connect_to_mongo, get_database
+    from app.services.content_store import content_store
+
+    await connect_to_mongo()
+    try:
+        events = await get_database().events.find(
+            {"source": {"$in": EXCHANGE_SOURCES}},
+            {
+                "title": 1, "content": 1, "content_ref": 1, "source": 1,
+                "bulletin_type": 1, "event_types": 1, "ai_analysis": 1,
+            },
+        ).sort("announcement_date", -1).limit(limit).to_list(limit)
+        await content_store.hydrate(events)
+        return [{**event, "label": _label(event)} for event in events]
+    finally:
+        await close_mongo_connection()
+
+
+def main(samples: List[Dict[str, Any]], threshold: float, show: int) -> None:
+    if not samples:
+        print("样本为空：请通过 --labels 指定标注文件，或使用 --from-db")
+        sys.exit(1)
+
+    per_rule: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"hits": 0, "labelled": 0, "agree": 0, "low": 0})
+    reviewed = []
+    hits = 0
+    labelled_total = sum(1 for sample in samples if sample["label"])
+    for sample in samples:
+        rule = rule_classifier.match(
+            sample.get("title") or "",
+            sample.get("content") or "",
+            source=sample.get("source"),
+            bulletin_type=sample.get("bulletin_type"),
+        )
+        if rule is None:
+            continue
+        hits += 1
+        stats = per_rule[rule.name]
+        stats["hits"] += 1
+        label = sample["label"]
+        if not label:
+            continue
+        stats["labelled"] += 1
+        stats["agree"] += rule.event_type in label["event_types"]
+        stats["low"] += label["impact_score"] <= threshold
+        reviewed.append((label["impact_score"], rule.name, sample.get("title") or ""))
+
+    labelled_hits = sum(stats["labelled"] for stats in per_rule.values())
+    agree = sum(stats["agree"] for stats in per_rule.values())
+    low = sum(stats["low"] for stats in per_rule.values())
+
+    print(f"{'='*60}")
+    print(f"samples={len(samples)} labelled={labelled_total} low-impact threshold={threshold}")
+    print(f"{'='*60}")
+    print(f"coverage            {hits}/{len(samples)} = {hits / len(samples):.1%}")
+    if labelled_hits:
+        print(f"type agreement      {agree}/{labelled_hits} = {agree / labelled_hits:.1%}")
+        print(f"LLM low-impact      {low}/{labelled_hits} = {low / labelled_hits:.1%}")
+    else:
+        print("没有带模型标注的命中公告，无法计算一致率")
+    print(f"{'-'*60}")
+    print(f"{'rule':<28} {'hits':>6} {'labelled':>9} {'agree':>7} {'low':>7}")
+    for name, stats in sorted(per_rule.items(), key=lambda item: -item[1]["hits"]):
+        n = stats["labelled"]
+        agree_rate = f"{stats['agree'] / n:.0%}" if n else "-"
+        low_rate = f"{stats['low'] / n:.0%}" if n else "-"
+        print(f"{name:<28} {stats['hits']:>6} {n:>9} {agree_rate:>7} {low_rate:>7}")
+
+    if show and reviewed:
+        print(f"{'-'*60}")
+        print("模型评分最高的规则命中公告（人工复核）:")
+        for score, name, title in sorted(reviewed, reverse=True)[:show]:
+            print(f"  {score:.2f}  [{name}] {title[:50]}")
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="例行公告规则分类评估")
+    parser.add_argument(
+        "--labels",
+        type=str,
+        default=None,
+        help="JSONL 标注文件；未指定且不读数据库时使用 scripts/fixtures/rule_classifier/labelled_notices.jsonl",
+    )
+    parser.add_argument("--from-db", type=int, default=0, help="从数据库读取最新的 N 条交易所公告")
+    parser.add_argument("--threshold", type=float, default=0.3, help="低影响 impact_score 阈值")
+    parser.add_argument("--show", type=int, default=10, help="列出模型评分最高的 N 条命中公告")
+
+    args = parser.parse_args()
+    labels = args.labels or (None if args.from_db else FIXTURE_LABELS)
+    corpus = load_labels(labels) if labels else []
+    if args.from_db:
+        corpus += asyncio.run(load_from_db(args.from_db))
+    main(corpus, args.threshold, args.show)
@@ -0,0 +1,87 @@
+"""
+事件正文外置迁移工具
+将历史事件中超过内联阈值的正文压缩写入 event_contents，events 中只保留摘要和引用
+"""
+import sys
+import os
+import asyncio
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.content_store import content_store, split_content
+
+
+async def migrate_event_contents(batch_size: int = 200):
+    """迁移尚未处理的事件（没有 content_ref 字段）"""
+    db = get_database()
+
+    query = {"content_ref": {"$exists": False}}
+    total = await db.events.count_documents(query)
+    print(f"需要处理 {total} 条事件（内联阈值 {settings.content_inline_chars} 字）")
+    print(f"{'='*60}")
+
+    processed = 0
+    externalized = 0
+    raw_bytes = 0
+    stored_bytes = 0
+
+    async def flush(events):
+        nonlocal externalized, raw_bytes, stored_bytes
+        content_docs = {}
+        operations = []
+        for event in events:
+            original = event.get("content") or ""
+            fields = {"content": original}
+            content_doc = split_content(fields)
+            if content_doc:
+                content_docs[event["_id"]] = content_doc
+                raw_bytes += len(original.encode("utf-8"))
+                stored_bytes += len(content_doc["data"])
+            operations.append(UpdateOne({"_id": event["_id"]}, {"$set": fields}))
+        # 先写正文，再让事件指向它
+        await content_store.save_many(content_docs)
+        await db.events.bulk_write(operations, ordered=False)
+        externalized += len(content_docs)
+        return len(operations)
+
+    batch = []
+    async for event in db.events.find(query, {"content": 1}):
+        batch.append(event)
+        if len(batch) >= batch_size:
+            processed += await flush(batch)
+            batch = []
+            print(f"  已处理 {processed}/{total}")
+
+    if batch:
+        processed += await flush(batch)
+
+    print(f"{'='*60}")
+    print(f"迁移完成:")
+    print(f"  处理事件: {processed}")
+    print(f"  外置正文: {externalized}")
+    if raw_bytes:
+        print(f"  正文体积: {raw_bytes / 1024 / 1024:.1f} MB -> {stored_bytes / 1024 / 1024:.1f} MB")
+
+
+async def main(batch_size: int):
+    await connect_to_mongo()
+    try:
+        await migrate_event_contents(batch_size=batch_size)
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="事件正文外置迁移工具")
+    parser.add_argument("--batch-size", type=int, default=200, help="每批写入数量")
+
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,152 @@
+"""
+智谱 chat-completions 本地模拟服务
+按提示词内容确定性地生成分析 JSON（多事件批量提示词返回 JSON 数组），可配置延迟、错误率和限流率，
+用于测试 LLM 客户端、压测并发分析，不消耗真实配额
+
+用法:
+    python scripts/mock_llm_server.py --port 8900 --latency 0.5
+    AI_BASE_URL=http://127.0.0.1:8900 ZHIPU_API_KEY=mock python spider/analyze/analyze_events.py
+
+GET /stats 返回请求数、错误数、最大同时在途请求数和提示词/回复字符数，POST /stats/reset 清零
+"""
+import sys
+import os
+import asyncio
+import hashlib
+import json
+import random
+import re
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.services.ai_service import VALID_EVENT_CATEGORIES, VALID_EVENT_TYPES
+
+
+def mock_analysis(text: str) -> dict:
+    """由文本哈希确定性地生成一条分析结果"""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    categories = sorted(VALID_EVENT_CATEGORIES)
+    event_types = sorted(VALID_EVENT_TYPES)
+    return {
+        "event_category": categories[digest[0] % len(categories)],
+        "event_types": [event_types[digest[1] % len(event_types)]],
+        "impact_score": round(digest[2] / 255, 2),
+        "sentiment_score": round(digest[3] / 127.5 - 1, 2),
+        "confidence_score": round(0.5 + digest[4] / 510, 2),
+        "impact_reason": "mock analysis",
+        "is_hype": digest[5] % 10 == 0,
+        "entities": {
+            "affected_stocks": [{"name": f"股票{digest[6] % 50}", "code": f"{600000 + digest[6] % 50}", "reason": "mock"}],
+            "affected_sectors": [{"name": f"板块{digest[7] % 20}", "code": f"BK{digest[7] % 20:04d}", "reason": "mock"}],
+            "affected_materials": [],
+        },
+    }
+
+
+# 批量提示词中每个事件块的标题行（见 AIService._build_batch_prompt）
+_BATCH_EVENT_PATTERN = re.compile(r"^### Event (\d+)$", re.MULTILINE)
+
+
+def mock_reply(prompt: str) -> str:
+    """单事件提示词返回一个对象，批量提示词按事件块返回带 index 的数组"""
+    markers = list(_BATCH_EVENT_PATTERN.finditer(prompt))
+    if not markers:
+        return json.dumps(mock_analysis(prompt), ensure_ascii=False)
+    items = []
+    for position, marker in enumerate(markers):
+        end = markers[position + 1].start() if position + 1 < len(markers) else len(prompt)
+        block = prompt[marker.end():end].split("\n\nStrict JSON", 1)[0].strip()
+        items.append({"index": int(marker.group(1)), **mock_analysis(block)})
+    return json.dumps(items, ensure_ascii=False)
+
+
+def create_app(
+    latency: float = 0.2,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    latency_per_char: float = 0.0,
+) -> FastAPI:
+    """latency 为固定延迟；latency_per_char 按回复长度追加延迟，模拟生成耗时"""
+    app = FastAPI(title="Mock Zhipu chat-completions")
+    stats = {
+        "requests": 0,
+        "errors": 0,
+        "rate_limited": 0,
+        "in_flight": 0,
+        "max_in_flight": 0,
+        "prompt_chars": 0,
+        "completion_chars": 0,
+    }
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            prompt = body["messages"][-1]["content"]
+            content = "```json\n" + mock_reply(prompt) + "\n```"
+            await asyncio.sleep(latency + latency_per_char * len(content))
+            roll = random.random()
+            if roll < rate_limit_rate:
+                stats["rate_limited"] += 1
+                return JSONResponse(
+                    {"error": {"code": "1302", "message": "rate limited"}},
+                    status_code=429,
+                    headers={"Retry-After": "1"},
+                )
+            if roll < rate_limit_rate + error_rate:
+                stats["errors"] += 1
+                return JSONResponse({"error": {"code": "500", "message": "mock error"}}, status_code=500)
+
+            stats["prompt_chars"] += len(prompt)
+            stats["completion_chars"] += len(content)
+            return {
+                "id": hashlib.md5(prompt.encode("utf-8")).hexdigest(),
+                "model": body.get("model"),
+                "choices": [
+                    {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}
+                ],
+                "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(content)},
+            }
+        finally:
+            stats["in_flight"] -= 1
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        stats.update({key: 0 for key in stats if key != "in_flight"})
+        return stats
+
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="智谱 chat-completions 本地模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.2, help="每个请求的模拟延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回 429 的比例")
+    parser.add_argument("--latency-per-char", type=float, default=0.0, help="按回复字符数追加的延迟（秒/字符）")
+
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(args.latency, args.error_rate, args.rate_limit_rate, args.latency_per_char),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+        timeout_keep_alive=30,
+    )
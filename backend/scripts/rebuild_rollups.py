@@ -0,0 +1,37 @@
+"""
+事件时间序列汇总重建工具
+从 events 全量重算 event_rollups（按小时/天、类别/事件类型/板块/股票分桶）
+"""
+import sys
+import os
+import asyncio
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.core.indexes import ensure_indexes
+from app.services.rollup_service import rollup_service
+
+
+async def main(batch_size: int):
+    await connect_to_mongo()
+    try:
+        await ensure_indexes(get_database())
+        print(f"{'='*60}")
+        processed = await rollup_service.rebuild(batch_size=batch_size)
+        print(f"重建完成: {processed} 条事件")
+        print(f"{'='*60}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="事件时间序列汇总重建工具")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批写入数量")
+
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,99 @@
+"""
+机会雷达市场指数对账工具
+比较 event_rollups 增量维护的窗口汇总与从 events 全量重算的结果，--fix 时不一致则重建汇总
+"""
+import sys
+import os
+import asyncio
+from datetime import datetime, timedelta
+
+# 添加 backend 目录到 Python 路径
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_dir)
+
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.radar_scoring import RADAR_SCORE_VERSION
+from app.services.rollup_service import rollup_service
+
+FIELDS = ("sample_size", "market_index", "avg_confidence", "opportunity_count", "risk_count", "neutral_count")
+
+
+async def recompute(start: datetime) -> dict:
+    """按窗口逐条重算（与 get_radar_window 统计口径相同）"""
+    sentiment_scores = []
+    confidence_scores = []
+    opportunity_count = risk_count = 0
+    cursor = get_database().events.find(
+        {"announcement_date": {"$gte": start}, "radar.version": RADAR_SCORE_VERSION}, {"radar": 1}
+    )
+    async for event in cursor:
+        sentiment = event["radar"]["sentiment_raw"] * 100.0
+        sentiment_scores.append(round(sentiment, 2))
+        confidence_scores.append(round(event["radar"]["confidence_raw"] * 100.0, 2))
+        if sentiment >= 20:
+            opportunity_count += 1
+        elif sentiment <= -20:
+            risk_count += 1
+
+    n = len(sentiment_scores)
+    if n == 0:
+        return {field: 0 for field in FIELDS}
+    weighted = [s * (0.5 + c / 200.0) for s, c in zip(sentiment_scores, confidence_scores)]
+    return {
+        "sample_size": n,
+        "market_index": min(max(sum(weighted) / n, -100.0), 100.0),
+        "avg_confidence": sum(confidence_scores) / n,
+        "opportunity_count": opportunity_count,
+        "risk_count": risk_count,
+        "neutral_count": n - opportunity_count - risk_count,
+    }
+
+
+async def reconcile(windows: list[int], fix: bool) -> bool:
+    now = datetime.utcnow()
+    consistent = True
+    for window_hours in windows:
+        start = now - timedelta(hours=window_hours)
+        maintained = await rollup_service.get_radar_window(start)
+        expected = await recompute(start)
+        diffs = [
+            field for field in FIELDS
+            if round(maintained[field], 2) != round(expected[field], 2)
+        ]
+        status = "一致" if not diffs else "不一致"
+        print(f"窗口 {window_hours:>4}h: {status}  事件数 {expected['sample_size']}")
+        for field in diffs:
+            print(f"  {field}: 汇总 {maintained[field]} / 重算 {expected[field]}")
+        consistent = consistent and not diffs
+
+    untracked = await get_database().events.count_documents({"radar.version": {"$ne": RADAR_SCORE_VERSION}})
+    if untracked:
+        print(f"有 {untracked} 条事件缺少当前版本静态评分，未计入市场指数，请运行 backfill_radar_scores.py")
+
+    if not consistent and fix:
+        processed = await rollup_service.rebuild()
+        print(f"已重建趋势汇总: {processed} 条事件")
+    return consistent
+
+
+async def main(windows: list[int], fix: bool):
+    await connect_to_mongo()
+    try:
+        print(f"{'='*60}")
+        await reconcile(windows, fix)
+        print(f"{'='*60}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="机会雷达市场指数对账工具")
+    parser.add_argument(
+        "--windows", type=int, nargs="+", default=[24, 72, 168, 720], help="对账的窗口（小时）"
+    )
+    parser.add_argument("--fix", action="store_true", help="不一致时重建 event_rollups")
+
+    args = parser.parse_args()
+    asyncio.run(main(args.windows, args.fix))
@@ -0,0 +1,95 @@
+"""
+AI analysis queue workers.
+
+Consumes the analysis_jobs queue (see app/services/analysis_queue.py). Run as many
+worker processes as needed, on any host; leases are atomic, so workers never share a job.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, backend_dir)
+
+from app.config import settings
+from app.core.database import close_mongo_connection, connect_to_mongo
+from app.services.ai_service import close_ai_service
+from app.services.analysis_queue import analysis_queue
+from app.services.analysis_worker import AnalysisWorkerPool
+from app.services.database_service import db_service
+from app.services.llm_cache import llm_cache
+from app.services.llm_governor import llm_governor
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Consume the AI analysis job queue")
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=settings.llm_max_concurrency,
+        help=f"worker coroutines in this process (default: LLM_MAX_CONCURRENCY={settings.llm_max_concurrency}); "
+        "in-flight requests adapt below this",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help=f"short events per prompt (default: AI_BATCH_SIZE={settings.ai_batch_size}; 1 disables batching)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="ignore cached LLM replies (fresh replies are still cached)"
+    )
+    parser.add_argument(
+        "--no-rules",
+        action="store_true",
+        help="send routine notices to the LLM too instead of the rule-based fast path (AI_RULE_TIER)",
+    )
+    parser.add_argument(
+        "--enqueue-backlog",
+        type=int,
+        default=0,
+        help="first enqueue up to N stored events that still lack ai_analysis",
+    )
+    parser.add_argument("--days", type=int, default=None, help="with --enqueue-backlog: only latest N days")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="with --enqueue-backlog: requeue events even when ai_analysis exists",
+    )
+    parser.add_argument("--drain", action="store_true", help="exit once no job is runnable")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    await db_service.create_indexes()
+    pool = AnalysisWorkerPool(
+        workers=args.workers,
+        batch_size=args.batch_size,
+        use_cache=not args.no_cache,
+        use_rules=False if args.no_rules else None,
+    )
+    try:
+        if args.enqueue_backlog:
+            start_date = datetime.utcnow() - timedelta(days=args.days) if args.days else None
+            queued = await analysis_queue.enqueue_backlog(args.enqueue_backlog, start_date, force=args.force)
+            print(f"Enqueued {queued} events")
+        print(f"Analysis queue: {await analysis_queue.stats()}")
+        print(f"Workers: {pool.workers}, batch size: {pool.batch_size}, drain: {args.drain}")
+        await pool.run(drain=args.drain)
+    finally:
+        print(f"Done. {pool.stats()}")
+        print(f"Analysis queue: {await analysis_queue.stats()}")
+        print(f"LLM cache: {llm_cache.stats()}")
+        print(f"LLM governor: {llm_governor.stats()}")
+        await close_ai_service()
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
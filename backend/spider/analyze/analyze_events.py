@@ -13,18 +13,47 @@ from typing import Any, Dict, List, Optional
 backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 sys.path.insert(0, backend_dir)
 
+from app.config import settings
 from app.core.database import close_mongo_connection, connect_to_mongo
 from app.models import EventUpdate
-from app.services.ai_service import get_ai_service
-from app.services.database_service import db_service
+from app.services.ai_service import AIAnalysisError, close_ai_service, get_ai_service
+from app.services.database_service import EntityBatch, db_service
+from app.services.llm_cache import llm_cache
+from app.services.llm_governor import llm_governor
+from app.services.rule_classifier import rule_classifier
+
+
+def _needs_analysis(event: Dict[str, Any]) -> bool:
+    """没有分析结果的事件（含待重试的）和旧版本写入的零分失败记录需要分析"""
+    if event.get("ai_status") == "failed":
+        return False
+    analysis = event.get("ai_analysis")
+    if not analysis:
+        return True
+    return str(analysis.get("impact_reason") or "").startswith("AI analysis failed")
 
 
 class EventAnalyzer:
-    def __init__(self, concurrency: int = 10):
-        self.concurrency = max(1, concurrency)
+    scan_page_size = 200
+    entity_flush_size = 200
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        use_cache: bool = True,
+        batch_size: Optional[int] = None,
+        use_rules: Optional[bool] = None,
+    ):
+        # 只限制同时处理的事件组数，实际在途请求数由全局 llm_governor 自适应调整
+        self.concurrency = max(1, settings.llm_max_concurrency if concurrency is None else concurrency)
+        self.use_cache = use_cache
+        self.batch_size = max(1, settings.ai_batch_size if batch_size is None else batch_size)
+        self.use_rules = settings.ai_rule_tier if use_rules is None else use_rules
         self.ai_service = None
+        self.entities = EntityBatch(db_service)
         self.ok = 0
         self.fail = 0
+        self.rule_hits = 0
         self.start_ts = 0.0
         self.lock = asyncio.Lock()
 
@@ -40,17 +69,63 @@ class EventAnalyzer:
         if days is not None:
             start_date = datetime.utcnow() - timedelta(days=days)
 
-        events, _ = await db_service.get_events(
-            skip=0,
-            limit=limit,
-            category=category,
-            event_type=event_type,
-            start_date=start_date,
-        )
+        # 按游标分页扫描，避免一次性 skip/limit 大窗口
+        events: List[Dict[str, Any]] = []
+        cursor = None
+        while len(events) < limit:
+            page_size = min(self.scan_page_size, limit - len(events))
+            page, _ = await db_service.get_events(
+                limit=page_size,
+                category=category,
+                event_type=event_type,
+                start_date=start_date,
+                cursor=cursor,
+                count_mode="none",
+                view="full",
+            )
+            events.extend(page)
+            if len(page) < page_size:
+                break
+            cursor = db_service.encode_event_cursor(page[-1])
 
         if force:
             return events
-        return [evt for evt in events if not evt.get("ai_analysis")]
+        return [evt for evt in events if _needs_analysis(evt)]
+
+    async def _save_result(self, event: Dict[str, Any], result: Dict[str, Any]) -> None:
+        ai_analysis = result["ai_analysis"]
+        update = EventUpdate(
+            ai_analysis=ai_analysis,
+            event_category=result.get("event_category"),
+            event_types=result.get("event_types"),
+        )
+        await db_service.update_event(event["id"], update, view="summary")
+
+        # 板块/股票在内存中合并，攒够一批再统一写入
+        self.entities.add_analysis(ai_analysis)
+        if len(self.entities) >= self.entity_flush_size:
+            await self.entities.flush()
+
+    async def _apply_rules(self, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """例行公告直接按规则写入结果，返回仍需模型分析的事件"""
+        remaining = []
+        for evt in candidates:
+            result = rule_classifier.classify(
+                evt.get("title") or "",
+                evt.get("content") or "",
+                source=evt.get("source"),
+                bulletin_type=evt.get("bulletin_type"),
+            )
+            if result is None:
+                remaining.append(evt)
+                continue
+            try:
+                await self._save_result(evt, result)
+                self.rule_hits += 1
+            except Exception as exc:
+                print(f"\nFailed to save rule analysis for event {evt.get('id')}: {exc}")
+                self.fail += 1
+        return remaining
 
     async def _analyze_one(self, event: Dict[str, Any]) -> bool:
         try:
@@ -58,39 +133,73 @@ class EventAnalyzer:
                 event_title=event["title"],
                 event_content=event["content"],
                 needs_classification=True,
+                use_cache=self.use_cache,
             )
-            ai_analysis = result["ai_analysis"]
-
-            update = EventUpdate(
-                ai_analysis=ai_analysis,
-                event_category=result.get("event_category"),
-                event_types=result.get("event_types"),
-            )
-            await db_service.update_event(event["id"], update)
-
-            for sector in ai_analysis.affected_sectors or []:
-                await db_service.create_or_update_sector(
-                    name=sector.name,
-                    code=sector.code or f"SECTOR_{sector.name}",
-                )
-            for stock in ai_analysis.affected_stocks or []:
-                await db_service.create_or_update_stock(
-                    name=stock.name,
-                    code=stock.code or f"STOCK_{stock.name}",
-                )
+            await self._save_result(event, result)
             return True
+        except AIAnalysisError as exc:
+            await self._record_failure(event, exc)
+            return False
         except Exception as exc:
             print(f"\nFailed to analyze event {event.get('id')}: {exc}")
             return False
 
-    async def _run_one(self, semaphore: asyncio.Semaphore, event: Dict[str, Any], total: int) -> None:
+    async def _record_failure(self, event: Dict[str, Any], exc: AIAnalysisError) -> None:
+        print(f"\nFailed to analyze event {event.get('id')}: {exc}")
+        await db_service.mark_analysis_failed(event["id"], str(exc), retryable=exc.retryable)
+
+    async def _analyze_batch(self, events: List[Dict[str, Any]]) -> List[bool]:
+        try:
+            results = await self.ai_service.analyze_batch(
+                [{"title": evt["title"], "content": evt["content"]} for evt in events],
+                needs_classification=True,
+                use_cache=self.use_cache,
+            )
+        except Exception as exc:
+            print(f"\nFailed to analyze batch of {len(events)} events: {exc}")
+            return [False] * len(events)
+
+        outcomes: List[bool] = []
+        for event, result in zip(events, results):
+            if isinstance(result, AIAnalysisError):
+                await self._record_failure(event, result)
+                outcomes.append(False)
+                continue
+            try:
+                await self._save_result(event, result)
+                outcomes.append(True)
+            except Exception as exc:
+                print(f"\nFailed to save analysis for event {event.get('id')}: {exc}")
+                outcomes.append(False)
+        return outcomes
+
+    def _group_candidates(self, candidates: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """短事件（标题+正文不超过 ai_batch_max_chars）按 batch_size 打包，长事件单独分析"""
+        if self.batch_size <= 1:
+            return [[evt] for evt in candidates]
+        groups: List[List[Dict[str, Any]]] = []
+        short: List[Dict[str, Any]] = []
+        for evt in candidates:
+            if len(evt.get("title") or "") + len(evt.get("content") or "") > settings.ai_batch_max_chars:
+                groups.append([evt])
+                continue
+            short.append(evt)
+            if len(short) >= self.batch_size:
+                groups.append(short)
+                short = []
+        if short:
+            groups.append(short)
+        return groups
+
+    async def _run_group(self, semaphore: asyncio.Semaphore, group: List[Dict[str, Any]], total: int) -> None:
         async with semaphore:
-            success = await self._analyze_one(event)
+            if len(group) == 1:
+                outcomes = [await self._analyze_one(group[0])]
+            else:
+                outcomes = await self._analyze_batch(group)
             async with self.lock:
-                if success:
-                    self.ok += 1
-                else:
-                    self.fail += 1
+                self.ok += sum(outcomes)
+                self.fail += len(outcomes) - sum(outcomes)
                 done = self.ok + self.fail
                 elapsed = max(time.time() - self.start_ts, 0.001)
                 speed = done / elapsed
@@ -119,12 +228,28 @@ class EventAnalyzer:
             print("No events require analysis.")
             return
 
-        print(f"Events to analyze: {total}, concurrency: {self.concurrency}")
+        if self.use_rules:
+            candidates = await self._apply_rules(candidates)
+            self.ok += self.rule_hits
+            print(f"Routine notices classified by rules: {self.rule_hits}/{total}")
+
+        groups = self._group_candidates(candidates)
+        print(
+            f"Events to analyze: {len(candidates)}, prompts: {len(groups)}, "
+            f"batch size: {self.batch_size}, concurrency: {self.concurrency}"
+        )
         self.start_ts = time.time()
         sem = asyncio.Semaphore(self.concurrency)
-        await asyncio.gather(*(self._run_one(sem, evt, total) for evt in candidates))
+        try:
+            await asyncio.gather(*(self._run_group(sem, group, total) for group in groups))
+        finally:
+            await self.entities.flush()
         print()
-        print(f"Done. ok={self.ok}, fail={self.fail}, total={total}")
+        print(f"Done. ok={self.ok} (rules={self.rule_hits}), fail={self.fail}, total={total}")
+        print(f"LLM cache: {llm_cache.stats()}")
+        print(f"LLM governor: {llm_governor.stats()}")
+        if self.batch_size > 1:
+            print(f"Batched prompts: {self.ai_service.batch_stats}")
 
 
 async def _main() -> None:
@@ -138,13 +263,44 @@ async def _main() -> None:
         choices=["global_macro", "policy", "industry", "company"],
     )
     parser.add_argument("--event-type", type=str, default=None)
-    parser.add_argument("--concurrency", "-c", type=int, default=10)
-    parser.add_argument("--force", action="store_true", help="reanalyze even when ai_analysis exists")
+    parser.add_argument(
+        "--concurrency",
+        "-c",
+        type=int,
+        default=None,
+        help=f"max event groups in progress (default: LLM_MAX_CONCURRENCY={settings.llm_max_concurrency}); "
+        "in-flight requests adapt below this",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="reanalyze even when ai_analysis exists or the provider rejected the event before",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="ignore cached LLM replies (fresh replies are still cached)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help=f"short events per prompt (default: AI_BATCH_SIZE={settings.ai_batch_size}; 1 disables batching)",
+    )
+    parser.add_argument(
+        "--no-rules",
+        action="store_true",
+        help="send routine notices to the LLM too instead of the rule-based fast path (AI_RULE_TIER)",
+    )
     args = parser.parse_args()
 
     await connect_to_mongo()
+    await db_service.create_indexes()
     try:
-        analyzer = EventAnalyzer(concurrency=args.concurrency)
+        analyzer = EventAnalyzer(
+            concurrency=args.concurrency,
+            use_cache=not args.no_cache,
+            batch_size=args.batch_size,
+            use_rules=False if args.no_rules else None,
+        )
         await analyzer.run(
             limit=args.limit,
             days=args.days,
@@ -153,6 +309,7 @@ async def _main() -> None:
             force=args.force,
         )
     finally:
+        await close_ai_service()
         await close_mongo_connection()
 
 
@@ -15,10 +15,13 @@ from typing import List, Dict, Any
 from collections import defaultdict
 from tqdm import tqdm
 
+from app.config import settings
 from app.models import EventCreate, EventCategory, EventType
-from app.services.database_service import db_service
+from app.services.database_service import db_service, make_dedupe_key
 from app.core.database import connect_to_mongo, close_mongo_connection
 from app.services.pdf_service import pdf_service
+from app.services.ai_service import close_ai_service
+from app.services.rule_classifier import rule_classifier
 
 # 导入三大交易所爬虫
 from spider.common.sse_notice_fetcher import SSENoticeFetcher
@@ -343,36 +346,82 @@ class EventUpdater:
     async def check_event_exists(self, title: str, announcement_date: datetime, stock_code: str = None) -> bool:
         """检查事件是否已存在"""
         try:
-            existing = await db_service.get_event_by_title_date(title, announcement_date, stock_code)
-            return existing is not None
+            key = make_dedupe_key(title, announcement_date, stock_code)
+            return bool(await db_service.get_existing_dedupe_keys([key]))
         except:
             return False
 
-    async def process_and_save_events(self, events_data: List[dict]) -> int:
+    async def filter_new_events(self, items: List[dict], default_date: datetime = None) -> List[dict]:
+        """
+        批量过滤已存在的事件/公告
+
+        整页数据只做一次 $in 查询，同时去掉页内重复项
+
+        Args:
+            items: 公告或事件数据列表
+            default_date: 缺少 announcement_date 时使用的日期
+
+        Returns:
+            数据库中不存在的数据列表
+        """
+        default_date = default_date or datetime.now()
+        keyed = [
+            (
+                make_dedupe_key(
+                    item.get("title", ""),
+                    item.get("announcement_date") or default_date,
+                    item.get("stock_code"),
+                ),
+                item,
+            )
+            for item in items
+        ]
+        try:
+            existing = await db_service.get_existing_dedupe_keys([key for key, _ in keyed])
+        except Exception as e:
+            print(f"  去重查询失败: {e}")
+            existing = set()
+
+        new_items = []
+        for key, item in keyed:
+            if key in existing:
+                continue
+            existing.add(key)
+            new_items.append(item)
+        return new_items
+
+    async def _flush_events(self, pending: List[EventCreate]) -> int:
+        """批量写入待保存事件，重复事件由唯一索引跳过"""
+        if not pending:
+            return 0
+        inserted = await db_service.create_events_bulk(pending)
+        pending.clear()
+        return inserted
+
+    async def process_and_save_events(self, events_data: List[dict], save_batch_size: int = 50) -> int:
         """
         处理并保存事件到数据库
 
         Args:
             events_data: 事件数据列表
+            save_batch_size: 每批写入数据库的事件数
 
         Returns:
             保存的事件数量
         """
         saved_count = 0
-        skipped_count = 0
 
-        pbar = tqdm(events_data, desc="保存事件", unit="条")
+        new_events = await self.filter_new_events(events_data)
+        skipped_count = len(events_data) - len(new_events)
+        pending: List[EventCreate] = []
+
+        pbar = tqdm(new_events, desc="保存事件", unit="条")
 
         for event_data in pbar:
             try:
                 title = event_data.get("title", "")
                 announcement_date = event_data.get("announcement_date", datetime.now())
 
-                # 检查是否已存在
-                if await self.check_event_exists(title, announcement_date, stock_code=event_data.get("stock_code")):
-                    skipped_count += 1
-                    continue
-
                 event_type = event_data.get("event_type", EventType.OTHER)
                 event_category = event_data.get("event_category")
 
@@ -391,42 +440,49 @@ class EventUpdater:
                 
                 try:
                     from app.services.ai_service import get_ai_service
-                    ai_svc = get_ai_service()
+                    # 例行公告由规则直接判定，不调用模型
+                    analysis_result = rule_classifier.classify(
+                        title,
+                        event_data.get('content', ''),
+                        source=event_data.get("source"),
+                        bulletin_type=event_data.get("bulletin_type"),
+                    ) if settings.ai_rule_tier else None
+                    # 启用分析队列时模型分析由 worker 异步完成，入库只写任务（见 analysis_queue）
+                    ai_svc = None if analysis_result or settings.analysis_queue_enabled else get_ai_service()
                     if ai_svc:
                         print(f"  AI Analyzing: {title[:20]}...")
-                        # 组合标题和内容供分析
-                        analysis_text = f"标题: {title}\n内容: {event_data.get('content', '')[:1000]}"
-                        
+                        # 传入完整正文，由 AI 服务按 token 预算压缩（见 content_condenser）
                         analysis_result = await ai_svc.analyze_and_classify(
-                            title, 
-                            event_data.get('content', '')[:3000], # 限制长度避免过长
+                            title,
+                            event_data.get('content', ''),
                             needs_classification=True
                         )
-                        
-                        if analysis_result:
-                            ai_analysis = analysis_result.get("ai_analysis")
-                            # 如果 AI 返回了分类，优先使用 AI 的分类
-                            ai_category = analysis_result.get("event_category")
-                            if ai_category:
+
+                    if analysis_result:
+                        ai_analysis = analysis_result.get("ai_analysis")
+                        # 如果 AI 返回了分类，优先使用 AI 的分类
+                        ai_category = analysis_result.get("event_category")
+                        if ai_category:
+                            try:
+                                # 尝试匹配枚举
+                                event_category = EventCategory(ai_category)
+                            except ValueError:
+                                print(f"  Warning: AI returned unknown category {ai_category}, using default")
+
+                        ai_types = analysis_result.get("event_types", [])
+                        if ai_types:
+                            # 尝试转换类型
+                            clean_types = []
+                            for t in ai_types:
                                 try:
-                                    # 尝试匹配枚举
-                                    event_category = EventCategory(ai_category)
+                                    clean_types.append(EventType(t))
                                 except ValueError:
-                                    print(f"  Warning: AI returned unknown category {ai_category}, using default")
-                                    
-                            ai_types = analysis_result.get("event_types", [])
-                            if ai_types:
-                                # 尝试转换类型
-                                clean_types = []
-                                for t in ai_types:
-                                    try:
-                                        clean_types.append(EventType(t))
-                                    except ValueError:
-                                        continue
-                                if clean_types:
-                                    event_types = clean_types
+                                    continue
+                            if clean_types:
+                                event_types = clean_types
 
                 except Exception as e:
+                    # 不写入零分结果，事件以无 ai_analysis 入库，由 analyze_events.py 重试
                     print(f"  AI Analysis failed: {e}")
 
                 # 如果 AI 没有返回类型，尝试使用映射的类型作为默认值
@@ -445,20 +501,26 @@ class EventUpdater:
                     announcement_date=announcement_date,
                     source=event_data.get("source", ""),
                     original_url=original_url,
+                    stock_code=event_data.get("stock_code") or None,
+                    bulletin_type=event_data.get("bulletin_type"),
                     ai_analysis=ai_analysis # 新增
                 )
 
-                await db_service.create_event(event_create)
-                saved_count += 1
-
-                if saved_count % 10 == 0:
+                pending.append(event_create)
+                if len(pending) >= save_batch_size:
+                    saved_count += await self._flush_events(pending)
                     pbar.set_description(f"已保存 {saved_count}, 跳过 {skipped_count}")
 
             except Exception as e:
                 print(f"\n保存事件失败: {e}")
                 continue
 
-        print(f"\n统计: 新增 {saved_count} 条, 跳过 {skipped_count} 条")
+        try:
+            saved_count += await self._flush_events(pending)
+        except Exception as e:
+            print(f"\n保存事件失败: {e}")
+
+        print(f"\n统计: 新增 {saved_count} 条, 跳过 {len(events_data) - saved_count} 条")
         return saved_count
 
     async def monitor_exchanges(self):
@@ -509,19 +571,10 @@ class EventUpdater:
                     if not notices:
                         continue
                         
-                    new_notices = []
-                    for notice in notices:
-                        title = notice.get("title", "")
-                        notice_date = notice.get("announcement_date", date)
-                        stock_code = notice.get("stock_code")
-                        
-                        # 检查数据库
-                        if await self.check_event_exists(title, notice_date, stock_code):
-                            skipped_total += 1
-                            continue
-                            
-                        new_notices.append(notice)
-                    
+                    # 整页批量查重
+                    new_notices = await self.filter_new_events(notices, default_date=date)
+                    skipped_total += len(notices) - len(new_notices)
+
                     if new_notices:
                         new_exchange_notices[exchange_name] = new_notices
                         print(f"  {exchange_name}: 发现 {len(new_notices)} 条新公告 (跳过 {len(notices) - len(new_notices)} 条重复)")
@@ -556,6 +609,8 @@ class EventUpdater:
                                 "content": notice.get("content", notice.get("title", "")),
                                 "announcement_date": notice.get("announcement_date", date),
                                 "source": exchange_name,
+                                "stock_code": notice.get("stock_code"),
+                                "bulletin_type": notice.get("bulletin_type") or None,
                                 "original_url": notice.get("url", ""),
                                 "local_pdf_url": notice.get("local_pdf_url", ""),
                                 "event_types": [], # 默认空，由AI填充
@@ -612,6 +667,7 @@ async def main():
     
     # 连接数据库 (全局只需一次)
     await connect_to_mongo()
+    await db_service.create_indexes()
     
     try:
         # 并发运行两个监控任务
@@ -624,6 +680,7 @@ async def main():
     except KeyboardInterrupt:
         print("用户中断")
     finally:
+        await close_ai_service()
         await close_mongo_connection()
         print("数据库连接已关闭")
 
@@ -129,9 +129,13 @@ export interface EventsQuery {
   end_date?: string
   min_impact?: number
   max_impact?: number
+  cursor?: string
+  count_mode?: 'exact' | 'estimated' | 'capped' | 'cached'
 }
 
 export interface PaginatedResponse<T> {
   items: T[]
   total: number
+  next_cursor?: string | null
+  total_capped?: boolean
 }